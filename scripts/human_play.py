@@ -1,10 +1,12 @@
 import pygame
-from src.core.assets import (BG_IMG, GAMEOVER_IMG, SCORE_FONT, FINAL_SCORE_FONT,
-                   SCORE_ORANGE, SCORE_OUTLINE, SCORE_FILL)
+from src.core.assets import (BG_IMG, SCORE_FONT, FINAL_SCORE_FONT,
+                   SCORE_ORANGE, SCORE_OUTLINE, SCORE_FILL, get_font, image)
 from src.core.pipe import Pipe
 from src.core.bird import Bird
 from src.utils.best_score import load_best_score, save_best_score
 from src.ui.button import Button, render_outlined_text
+from src.ui.dirty_rects import DirtyRenderer
+from src.utils.frame_profiler import FrameProfiler
 
 pygame.init()
 
@@ -13,6 +15,12 @@ WIN_HEIGHT = 800
 win = pygame.display.set_mode((WIN_WIDTH, WIN_HEIGHT))
 clock = pygame.time.Clock()
 
+# Gameplay frames only redraw and update what moved
+screen = DirtyRenderer(BG_IMG)
+
+# F3: frame-time overlay, F4: dump the timings
+PROFILER = FrameProfiler("human_play")
+
 # Pause menu settings
 PAUSE_OVERLAY_COLOR = (0, 0, 0, 180)  # Semi-transparent black
 PAUSE_BUTTON_WIDTH = 200
@@ -21,7 +29,7 @@ PAUSE_BUTTON_MARGIN = 20
 
 def draw_pause_menu(surface):
     # Use background image instead of semi-transparent overlay
-    surface.blit(BG_IMG, (0, 0))
+    surface.blit(image("bg"), (0, 0))
     
     # Create a semi-transparent overlay on top of the background
     overlay = pygame.Surface((WIN_WIDTH, WIN_HEIGHT), pygame.SRCALPHA)
@@ -29,7 +37,7 @@ def draw_pause_menu(surface):
     surface.blit(overlay, (0, 0))
     
     # Create pause title text
-    title_font = pygame.font.Font(None, 72)
+    title_font = get_font(72)
     render_outlined_text(
         surface,
         "PAUSED",
@@ -73,7 +81,8 @@ def draw_pause_menu(surface):
     return resume_button, menu_button
 
 def draw_window(win, bird, pipes, score, game_over=False, best_score=0):
-    win.blit(BG_IMG, (0, 0))
+    # win: the DirtyRenderer; it restores the background under the last frame
+    win.begin()
     for pipe in pipes:
         pipe.draw(win)
     bird.draw(win)
@@ -91,16 +100,17 @@ def draw_window(win, bird, pipes, score, game_over=False, best_score=0):
     
     if game_over:
         # Center the game over image
-        game_over_x = (WIN_WIDTH - GAMEOVER_IMG.get_width()) // 2
-        game_over_y = (WIN_HEIGHT - GAMEOVER_IMG.get_height()) // 2
-        win.blit(GAMEOVER_IMG, (game_over_x, game_over_y))
+        gameover_img = image("gameover")
+        game_over_x = (WIN_WIDTH - gameover_img.get_width()) // 2
+        game_over_y = (WIN_HEIGHT - gameover_img.get_height()) // 2
+        win.blit(gameover_img, (game_over_x, game_over_y))
         
         # Draw final score with game over style
         render_outlined_text(
             win,
             f"Final Score: {score}",
             FINAL_SCORE_FONT,
-            (WIN_WIDTH // 2, game_over_y + GAMEOVER_IMG.get_height() + 50),
+            (WIN_WIDTH // 2, game_over_y + gameover_img.get_height() + 50),
             SCORE_ORANGE,
             SCORE_OUTLINE,
             SCORE_FILL
@@ -111,7 +121,7 @@ def draw_window(win, bird, pipes, score, game_over=False, best_score=0):
             win,
             f"Best Score: {best_score}",
             FINAL_SCORE_FONT,
-            (WIN_WIDTH // 2, game_over_y + GAMEOVER_IMG.get_height() + 120),
+            (WIN_WIDTH // 2, game_over_y + gameover_img.get_height() + 120),
             SCORE_ORANGE,
             SCORE_OUTLINE,
             SCORE_FILL
@@ -119,7 +129,7 @@ def draw_window(win, bird, pipes, score, game_over=False, best_score=0):
     
     # Control hints (only when not game over)
     if not game_over:
-        hint_font = pygame.font.Font(None, 24)
+        hint_font = get_font(24)
         render_outlined_text(
             win,
             "SPACE: Jump | ESC: Pause | R: Restart | M: Menu",
@@ -130,7 +140,9 @@ def draw_window(win, bird, pipes, score, game_over=False, best_score=0):
             SCORE_FILL
         )
     
-    pygame.display.update()
+    PROFILER.lap("render")
+    PROFILER.draw(win)
+    win.present()
 
 def main(best_score_override=None):
     """
@@ -138,6 +150,9 @@ def main(best_score_override=None):
     If best_score_override is provided (e.g., server best for logged-in user),
     it is displayed instead of the local best.
     """
+    # The renderer outlives a session and set_mode() hands back the same window:
+    # whatever the menu or leaderboard drew there must go
+    screen.invalidate()
     bird = Bird(300, 500)
     pipes = [Pipe(800)]
     run = True
@@ -149,10 +164,12 @@ def main(best_score_override=None):
     
     while run:
         clock.tick(60) 
+        PROFILER.begin_frame()
 
         # Handle pause state
         if paused:
             resume_button, menu_button = draw_pause_menu(win)
+            screen.invalidate()
             
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
@@ -173,6 +190,8 @@ def main(best_score_override=None):
             continue  # Skip the rest of the game logic while paused
         
         for event in pygame.event.get():
+            if PROFILER.handle_event(event):
+                continue
             if event.type == pygame.QUIT:
                 run = False
             if event.type == pygame.KEYDOWN:
@@ -193,6 +212,7 @@ def main(best_score_override=None):
                     # M key always returns to menu
                     best_score = save_best_score(score)
                     return score
+        PROFILER.lap("input")
 
         if not game_over:
             bird.move()
@@ -200,7 +220,9 @@ def main(best_score_override=None):
             for pipe in pipes:
                 pipe.move()
                 # Check collision between the bird and the pipe
-                if pipe.collide(bird):
+                with PROFILER.phase("collision"):
+                    hit = pipe.collide(bird)
+                if hit:
                     game_over = True
                     # Update best score when game ends
                     best_score = save_best_score(score)
@@ -222,8 +244,10 @@ def main(best_score_override=None):
             # Add a new pipe when needed
             if pipes and pipes[-1].x < 450:
                 pipes.append(Pipe(WIN_WIDTH))
+        PROFILER.lap("sim")
 
-        draw_window(win, bird, pipes, score, game_over, best_score)
+        draw_window(screen, bird, pipes, score, game_over, best_score)
+        PROFILER.lap("flip")
 
     pygame.quit()
     return score
@@ -4,13 +4,16 @@ import os
 import sys
 import random
 import math
-import pickle  # <-- for loading trained birds
 
-from src.core.bird import Bird
+from src.core.bird import Bird, BIRD_SPRITES
 from src.core.pipe import Pipe
-from src.core.assets import BG_IMG, SCORE_ORANGE, SCORE_OUTLINE, SCORE_FILL, GAMEOVER_IMG
+from src.core.assets import BG_IMG, SCORE_ORANGE, SCORE_OUTLINE, SCORE_FILL, GAMEOVER_IMG, get_font
 from src.ui.button import Button, render_outlined_text
+from src.ui.dirty_rects import DirtyRenderer
+from src.ui.viewport import Viewport
+from src.utils.frame_profiler import FrameProfiler
 from src.utils.best_score import load_best_score, save_best_score
+from src.ai.policies import load_policy  # NEAT winners or Q-table policies
 
 # -------------------------
 # Game settings / window
@@ -41,12 +44,12 @@ PAUSE_BUTTON_MARGIN = 20
 # -------------------------
 
 # Pre-cache fonts
-FONT_24 = pygame.font.Font(None, 24)
-FONT_28 = pygame.font.Font(None, 28)
-FONT_32 = pygame.font.Font(None, 32)
-FONT_36 = pygame.font.Font(None, 36)
-FONT_48 = pygame.font.Font(None, 48)
-FONT_72 = pygame.font.Font(None, 72)
+FONT_24 = get_font(24)
+FONT_28 = get_font(28)
+FONT_32 = get_font(32)
+FONT_36 = get_font(36)
+FONT_48 = get_font(48)
+FONT_72 = get_font(72)
 
 # Pre-scale backgrounds once (convert() for fast blits)
 AI_BG = pygame.transform.scale(BG_IMG.convert(), (WIN_WIDTH, UPPER_HEIGHT))
@@ -70,6 +73,11 @@ OVERLAY_HUMAN_DEAD.fill((255, 0, 0, 100))
 # the sprite scale factor is constant 0.5 for both halves.
 HALF_RATIO = 0.5
 
+# Each half draws its world through a viewport with sprites pre-scaled once
+# (the AI half stops one row short: that row is the divider, drawn over the AI world)
+AI_VIEW = Viewport((0, 0, WIN_WIDTH, UPPER_HEIGHT - 1), HALF_RATIO, BIRD_SPRITES["ai"])
+HUMAN_VIEW = Viewport((0, UPPER_HEIGHT, WIN_WIDTH, LOWER_HEIGHT), HALF_RATIO, BIRD_SPRITES["human"])
+
 # -------------------------
 # Difficulty → config mapping
 # (filenames match your spelling exactly)
@@ -96,20 +104,6 @@ DIFF_TO_WINNER = {
     "Exterme": "winner_EXTREME.pkl",
 }
 
-def ensure_pipe_scaled(pipe):
-    """Attach half-height scaled sprites to a Pipe once (for both halves)."""
-    if not hasattr(pipe, "_scaled_cached"):
-        pipe.PIPE_TOP_UPPER = pygame.transform.scale(
-            pipe.PIPE_TOP, (pipe.PIPE_TOP.get_width(), max(1, pipe.PIPE_TOP.get_height() // 2))
-        )
-        pipe.PIPE_BOTTOM_UPPER = pygame.transform.scale(
-            pipe.PIPE_BOTTOM, (pipe.PIPE_BOTTOM.get_width(), max(1, pipe.PIPE_BOTTOM.get_height() // 2))
-        )
-        # same scale for lower half (identical size)
-        pipe.PIPE_TOP_LOWER = pipe.PIPE_TOP_UPPER
-        pipe.PIPE_BOTTOM_LOWER = pipe.PIPE_BOTTOM_UPPER
-        pipe._scaled_cached = True
-
 # -------------------------
 # UI helpers
 # -------------------------
@@ -118,6 +112,20 @@ def draw_divider_line(surface):
     """Draw a line dividing the AI and human areas."""
     pygame.draw.line(surface, SCORE_ORANGE, (0, UPPER_HEIGHT), (WIN_WIDTH, UPPER_HEIGHT), 3)
 
+def split_background():
+    """Both halves' backgrounds and the divider (the human half covers its lower rows)."""
+    bg = pygame.Surface((WIN_WIDTH, WIN_HEIGHT)).convert()
+    bg.blit(AI_BG, (0, 0))
+    draw_divider_line(bg)
+    bg.blit(HUMAN_BG, (0, UPPER_HEIGHT))
+    return bg
+
+# The split screen only redraws and updates what moved
+SCREEN = DirtyRenderer(split_background())
+
+# F3: frame-time overlay, F4: dump the timings
+PROFILER = FrameProfiler("man_vs_machine")
+
 def draw_pause_menu(surface):
     """Draw pause menu overlay (reuses cached bg + overlay)."""
     surface.blit(FULL_BG, (0, 0))
@@ -299,57 +307,13 @@ def select_difficulty_screen():
 def draw_split_screen(surface, ai_birds, ai_pipes, human_bird, human_pipes,
                       ai_score, human_score, ai_lives, human_lives, level,
                       ai_game_over, human_game_over, ai_death_pause=0, human_death_pause=0):
-    """Draw the split screen with AI on top and human on bottom (fast path)."""
-    surface.fill((0, 0, 0))
-
-    # --- AI area (upper) ---
-    surface.blit(AI_BG, (0, 0))
-    ai_area = pygame.Rect(0, 0, WIN_WIDTH, UPPER_HEIGHT)
-    surface.set_clip(ai_area)
-
-    for pipe in ai_pipes:
-        ensure_pipe_scaled(pipe)
-        scaled_top_height = int(pipe.height * HALF_RATIO)
-        scaled_gap = int(pipe.GAP * HALF_RATIO)
-        scaled_bottom_y = scaled_top_height + scaled_gap
-
-        surface.blit(pipe.PIPE_TOP_UPPER, (pipe.x, scaled_top_height - pipe.PIPE_TOP_UPPER.get_height()))
-        surface.blit(pipe.PIPE_BOTTOM_UPPER, (pipe.x, scaled_bottom_y))
-
-    for bird in ai_birds:
-        scaled_bird_y = int(bird.y * HALF_RATIO)
-        temp_bird = Bird(bird.x, scaled_bird_y, "ai")
-        temp_bird.tilt = bird.tilt
-        temp_bird.jump_frame = bird.jump_frame
-        temp_bird.draw(surface)
-        bird.jump_frame = temp_bird.jump_frame
-
-    surface.set_clip(None)
-    draw_divider_line(surface)
-
-    # --- Human area (lower) ---
-    surface.blit(HUMAN_BG, (0, UPPER_HEIGHT))
-    human_area = pygame.Rect(0, UPPER_HEIGHT, WIN_WIDTH, LOWER_HEIGHT)
-    surface.set_clip(human_area)
-
-    for pipe in human_pipes:
-        ensure_pipe_scaled(pipe)
-        scaled_top_height = int(pipe.height * HALF_RATIO)
-        scaled_gap = int(pipe.GAP * HALF_RATIO)
-        scaled_bottom_y = scaled_top_height + scaled_gap
-
-        surface.blit(pipe.PIPE_TOP_LOWER, (pipe.x, UPPER_HEIGHT + scaled_top_height - pipe.PIPE_TOP_LOWER.get_height()))
-        surface.blit(pipe.PIPE_BOTTOM_LOWER, (pipe.x, UPPER_HEIGHT + scaled_bottom_y))
-
-    if human_bird:
-        scaled_bird_y = int(human_bird.y * HALF_RATIO)
-        temp_bird = Bird(human_bird.x, UPPER_HEIGHT + scaled_bird_y, "human")
-        temp_bird.tilt = human_bird.tilt
-        temp_bird.jump_frame = human_bird.jump_frame
-        temp_bird.draw(surface)
-        human_bird.jump_frame = temp_bird.jump_frame
-
-    surface.set_clip(None)
+    """
+    Draw the split screen with AI on top and human on bottom (fast path).
+    surface: the DirtyRenderer, whose background already holds both halves.
+    """
+    surface.begin()
+    AI_VIEW.draw(surface, ai_pipes, ai_birds)
+    HUMAN_VIEW.draw(surface, human_pipes, [human_bird] if human_bird else [])
 
     # UI labels
     render_outlined_text(surface, "MACHINE", FONT_32, (100, 20), SCORE_ORANGE, SCORE_OUTLINE, SCORE_FILL)
@@ -405,7 +369,9 @@ def draw_split_screen(surface, ai_birds, ai_pipes, human_bird, human_pipes,
                              FONT_24, (WIN_WIDTH // 2, WIN_HEIGHT - 20),
                              SCORE_ORANGE, SCORE_OUTLINE, SCORE_FILL)
 
-    pygame.display.update()
+    PROFILER.lap("render")
+    PROFILER.draw(surface)
+    surface.present()
 
 # -------------------------
 # Game loop
@@ -419,6 +385,8 @@ def main():
 
     # --- Difficulty select & paths ---
     chosen = select_difficulty_screen()  # "Easy"/"Meduim"/"Hard"/"Exterme"
+    # The difficulty cards (or an earlier game's screens) are still on the window
+    SCREEN.invalidate()
     local_dir = os.path.dirname(__file__)
     project_root = os.path.dirname(local_dir)  # Go up one level from scripts/ to project root
     config_path = os.path.join(project_root, "configs", DIFFICULTY_TO_CONFIG[chosen])
@@ -430,17 +398,16 @@ def main():
             f"Trained genome not found for '{chosen}'. Expected file: {os.path.basename(winner_path)}"
         )
 
-    # Load NEAT config + trained genome
+    # Load NEAT config + trained policy (stateless, so respawns reuse it)
     config = neat.config.Config(
         neat.DefaultGenome, neat.DefaultReproduction,
         neat.DefaultSpeciesSet, neat.DefaultStagnation,
         config_path
     )
-    with open(winner_path, "rb") as f:
-        trained_genome = pickle.load(f)
+    trained_policy = load_policy(winner_path, config)
 
-    # Build the single trained network and bird
-    ai_nets = [neat.nn.FeedForwardNetwork.create(trained_genome, config)]
+    # The single trained network and bird
+    ai_nets = [trained_policy]
     ai_birds = [Bird(280, 250, "ai")]
 
     # Human player
@@ -480,10 +447,12 @@ def main():
     run = True
     while run:
         clock.tick(FPS)
+        PROFILER.begin_frame()
 
         # Pause state
         if paused:
             resume_button, restart_button, menu_button = draw_pause_menu(WIN)
+            SCREEN.invalidate()
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     run = False
@@ -502,6 +471,7 @@ def main():
         # Game completely over
         if game_completely_over:
             draw_game_over_screen(WIN, ai_score, human_score, ai_lives, human_lives)
+            SCREEN.invalidate()
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     run = False
@@ -515,6 +485,8 @@ def main():
 
         # Process events
         for event in pygame.event.get():
+            if PROFILER.handle_event(event):
+                continue
             if event.type == pygame.QUIT:
                 run = False
             if event.type == pygame.KEYDOWN:
@@ -527,6 +499,7 @@ def main():
                 elif event.key == pygame.K_m:
                     return_to_menu = True
                     run = False
+        PROFILER.lap("input")
 
         # -----------------
         # AI logic (single trained bird)
@@ -540,11 +513,12 @@ def main():
             # Move + NN decision
             bird = ai_birds[0]
             bird.move()
-            output = ai_nets[0].activate((
-                bird.y,
-                abs(bird.y - ai_pipes[pipe_ind].height),
-                abs(bird.y - ai_pipes[pipe_ind].bottom)
-            ))
+            with PROFILER.phase("ai"):
+                output = ai_nets[0].activate((
+                    bird.y,
+                    abs(bird.y - ai_pipes[pipe_ind].height),
+                    abs(bird.y - ai_pipes[pipe_ind].bottom)
+                ))
             if output[0] > 0.5:
                 bird.jump()
 
@@ -565,7 +539,9 @@ def main():
                 pipe.move()
 
                 # Collision
-                if ai_birds and pipe.collide(ai_birds[0]):
+                with PROFILER.phase("collision"):
+                    hit = bool(ai_birds) and pipe.collide(ai_birds[0])
+                if hit:
                     # trained bird "dies"
                     del ai_nets[0]
                     del ai_birds[0]
@@ -616,7 +592,9 @@ def main():
                 pipe.move()
 
                 # Collision
-                if human_bird and pipe.collide(human_bird) and human_death_cooldown == 0:
+                with PROFILER.phase("collision"):
+                    hit = bool(human_bird) and pipe.collide(human_bird)
+                if hit and human_death_cooldown == 0:
                     human_lives -= 1
                     human_death_pause = 120
                     human_death_cooldown = 180
@@ -682,7 +660,7 @@ def main():
                 ai_nets.clear()
                 ai_birds.clear()
                 ai_pipes = [Pipe(WIN_WIDTH + 20)]
-                ai_nets.append(neat.nn.FeedForwardNetwork.create(trained_genome, config))
+                ai_nets.append(trained_policy)
                 ai_birds.append(Bird(280, 250, "ai"))
 
         if human_death_pause > 0:
@@ -697,12 +675,15 @@ def main():
         if human_death_cooldown > 0:
             human_death_cooldown -= 1
 
+        PROFILER.lap("sim")
+
         # Draw frame
         draw_split_screen(
-            WIN, ai_birds, ai_pipes, human_bird, human_pipes,
+            SCREEN, ai_birds, ai_pipes, human_bird, human_pipes,
             ai_score, human_score, ai_lives, human_lives, level,
             ai_game_over, human_game_over, ai_death_pause, human_death_pause
         )
+        PROFILER.lap("flip")
 
     # Return to menu?
     if return_to_menu:
@@ -0,0 +1,350 @@
+# aio_net.py
+#
+# asyncio backend for LAN play. One event loop on a daemon thread serves
+# every socket, in place of a blocking accept() polled from the render loop
+# and a reader thread per connection. The game loops keep net.py's API:
+# AsyncConnection and AsyncDatagramChannel are drop-in Connection /
+# DatagramChannel (send() from any thread, start_reader(on_msg), the same
+# codecs, stats and format switching), and AsyncServer.accept() never waits.
+#
+# on_msg runs on the loop thread, so it must be quick: the host and client
+# only do the handshake there and hand the rest to a net.Inbox. A full Inbox
+# holds the loop up until the game loop drains it, which pauses reading on
+# every socket: back-pressure all the way to the senders' TCP windows.
+#
+# send() never touches the socket: it encodes the message (in the format of
+# the moment, so format switches stay in order) and queues it. flush(), once
+# per frame from the game loop and after each read on the loop thread, hands
+# the whole batch to the transport as a single write, with TCP_NODELAY on so
+# it goes out at once. Once the transport's buffer passes WRITE_HIGH the
+# protocol is paused and batches wait in the outbox; a new snapshot makes the
+# queued ones stale and they are dropped. A peer that still lets MAX_QUEUE
+# messages pile up is not reading at all, and is dropped rather than holding
+# on to memory. Either way the game loop never waits for a peer.
+import asyncio
+import socket
+import threading
+import time
+from collections import deque
+
+from .net import Connection, DatagramChannel, RecvBuffer, nodelay
+
+WRITE_HIGH = 16 * 1024     # transport buffer that counts as backed up (asyncio's default is 64 KB)
+MAX_QUEUE = 256            # messages queued for one peer, after dropping stale snapshots, before it counts as stalled
+DROPPABLE = ("state", "snap")   # superseded by the next one; deltas are acked, so a dropped snap is never a baseline
+CONNECT_TIMEOUT = 5.0
+
+class Backend:
+    """An event loop running on its own daemon thread."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="net-loop", daemon=True)
+        self.thread.start()
+
+    def run(self, coro, timeout=None):
+        """Run coro on the loop and wait for its result (from any other thread)."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def call(self, fn, *args):
+        """Call fn(*args) on the loop thread, in order with earlier calls."""
+        self.loop.call_soon_threadsafe(fn, *args)
+
+_BACKEND = None
+_BACKEND_LOCK = threading.Lock()
+
+def backend() -> Backend:
+    """The shared loop, started on first use."""
+    global _BACKEND
+    with _BACKEND_LOCK:
+        if _BACKEND is None:
+            _BACKEND = Backend()
+    return _BACKEND
+
+# -------------------------
+# TCP
+# -------------------------
+
+class _StreamProtocol(asyncio.BufferedProtocol):
+    """Feeds an AsyncConnection: the transport receives straight into its RecvBuffer."""
+
+    def __init__(self, conn, on_made=None):
+        self.conn = conn
+        self.on_made = on_made
+
+    def connection_made(self, transport):
+        self.conn._made(transport)
+        if self.on_made is not None:
+            self.on_made(self.conn)
+
+    def get_buffer(self, sizehint):
+        return self.conn.buf.space()
+
+    def buffer_updated(self, nbytes):
+        self.conn._received(nbytes)
+
+    def eof_received(self):
+        return False   # close
+
+    def connection_lost(self, exc):
+        self.conn._lost()
+
+    def pause_writing(self):
+        self.conn.paused = True
+
+    def resume_writing(self):
+        self.conn.paused = False
+        self.conn._flush()
+
+class AsyncConnection(Connection):
+    """Connection on the shared event loop; on_msg is called on the loop thread."""
+
+    def __init__(self):
+        super().__init__(None)
+        self.loop = backend().loop
+        self.buf = RecvBuffer()
+        self.transport = None
+        self.peer = None
+        self.on_msg = None
+        self.closed = False
+        self.paused = False            # transport buffer above its high-water mark
+        self.pending = []              # (droppable, bytes) sent since the last flush()
+        self.outbox = deque()          # (droppable, bytes) flushed while the transport was paused
+        self.stats.update(writes=0, dropped=0, queue_max=0)
+
+    @property
+    def depth(self):
+        """Messages waiting to be handed to the transport."""
+        return len(self.pending) + len(self.outbox)
+
+    # Loop thread
+    def _made(self, transport):
+        self.transport = transport
+        self.sock = transport.get_extra_info("socket")
+        self.peer = transport.get_extra_info("peername")
+        nodelay(self.sock)
+        transport.set_write_buffer_limits(high=WRITE_HIGH)
+        if self.closed:
+            # Closed before it was up: send what was left, then close
+            if self.outbox:
+                transport.write(b"".join(data for _, data in self.outbox))
+                self.outbox.clear()
+            transport.close()
+            return
+        self._flush()
+
+    def _received(self, n):
+        self.stats["bytes_received"] += n
+        self.buf.filled(n)
+        if self.on_msg is not None:
+            self._dispatch(self.buf, self.on_msg)
+            self.flush()   # replies to what was just read go out together
+
+    def _lost(self):
+        self.closed = True
+
+    def _write(self, batch):
+        if self.closed:
+            return
+        if self.outbox and any(droppable for droppable, _ in batch):
+            # Backed up: a newer snapshot is on its way, the queued ones are stale
+            kept = deque(item for item in self.outbox if not item[0])
+            self.stats["dropped"] += len(self.outbox) - len(kept)
+            self.outbox = kept
+        self.outbox.extend(batch)
+        depth = len(self.outbox)
+        self.stats["queue_max"] = max(self.stats["queue_max"], depth)
+        if depth > MAX_QUEUE:
+            print("[NET] Peer stopped reading, dropping the connection")
+            self.outbox.clear()
+            self.closed = True
+            if self.transport is not None:
+                self.transport.abort()   # nothing more would get through
+            return
+        self._flush()
+
+    def _flush(self):
+        if self.paused or self.closed or self.transport is None or not self.outbox:
+            return
+        self.transport.write(b"".join(data for _, data in self.outbox))
+        self.outbox.clear()
+        self.stats["writes"] += 1
+
+    # Any thread
+    def _send(self, msg):
+        if self.closed:
+            return False
+        data = self.encode(msg)
+        self.pending.append((msg.get("type") in DROPPABLE, data))
+        self.stats["sent"] += 1
+        self.stats["bytes_sent"] += len(data)
+        return True
+
+    def flush(self):
+        """Hand everything sent since the last flush to the transport as one write (never blocks)."""
+        with self.lock:
+            batch, self.pending = self.pending, []
+        if not batch or self.closed:
+            return
+        self._call(self._write, batch)
+
+    def _call(self, fn, *args):
+        # fn(*args) on the loop thread: right away from it, else in order with earlier calls
+        if threading.current_thread() is backend().thread:
+            fn(*args)
+            return
+        try:
+            self.loop.call_soon_threadsafe(fn, *args)
+        except RuntimeError:
+            pass   # loop already gone (interpreter exit)
+
+    def start_reader(self, on_msg):
+        """Call on_msg(dict) on the loop thread, starting with anything that arrived before."""
+        def _start():
+            self.on_msg = on_msg
+            self._dispatch(self.buf, on_msg)
+            self.flush()
+        self.loop.call_soon_threadsafe(_start)
+
+    def close(self):
+        """Send what is pending, then close once the transport has written it (any thread)."""
+        with self.lock:
+            batch, self.pending = self.pending, []
+        self._call(self._close, batch)
+
+    def _close(self, batch):
+        # Loop thread, after every write queued before: closed only from here on
+        if self.closed:
+            return
+        if batch:
+            self._write(batch)
+        if self.closed:
+            return   # the write found the peer stalled and dropped it
+        if self.outbox and self.transport is not None:
+            # Paused: the transport holds on to this last write until it is out
+            self.transport.write(b"".join(data for _, data in self.outbox))
+            self.outbox.clear()
+        self.closed = True
+        if self.transport is not None:
+            self.transport.close()
+
+def connect(host: str, port: int, timeout: float = CONNECT_TIMEOUT) -> AsyncConnection:
+    """Connect (blocking the caller, not the loop); raises OSError like net.connect."""
+    conn = AsyncConnection()
+
+    async def _open():
+        try:
+            await asyncio.wait_for(conn.loop.create_connection(lambda: _StreamProtocol(conn), host, port), timeout)
+        except asyncio.TimeoutError:
+            raise socket.timeout(f"timed out connecting to {host}:{port}") from None
+
+    backend().run(_open())
+    return conn
+
+class AsyncServer:
+    """Listening socket on the loop; accept() hands out the connections that came in, without waiting."""
+
+    def __init__(self, host: str, port: int, backlog: int = 16):
+        self.accepted = deque()
+
+        def _factory():
+            return _StreamProtocol(AsyncConnection(), self.accepted.append)
+
+        async def _serve():
+            return await asyncio.get_running_loop().create_server(
+                _factory, host, port, reuse_address=True, backlog=backlog)
+
+        self.server = backend().run(_serve())
+
+    def accept(self):
+        """The next new AsyncConnection, or None."""
+        try:
+            return self.accepted.popleft()
+        except IndexError:
+            return None
+
+    def close(self):
+        backend().call(self.server.close)
+        while self.accepted:
+            self.accepted.popleft().close()
+
+# -------------------------
+# UDP
+# -------------------------
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, channel, on_msg):
+        self.channel = channel
+        self.on_msg = on_msg
+
+    def datagram_received(self, data, addr):
+        self.channel.received(data, addr, self.on_msg)
+
+class AsyncDatagramChannel(DatagramChannel):
+    """DatagramChannel whose reader is the shared loop. send() still goes straight out from the caller."""
+
+    transport = None
+
+    def start_reader(self, on_msg):
+        async def _open():
+            transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+                lambda: _DatagramProtocol(self, on_msg), sock=self.sock)
+            return transport
+        self.transport = backend().run(_open())
+
+    def close(self):
+        if self.transport is not None:
+            backend().call(self.transport.close)
+        else:
+            super().close()
+
+# -------------------------
+# Check
+# -------------------------
+
+def check_close(frames=40, per_frame=50, pad=1000, timeout=5.0):
+    """
+    Loopback check that what is sent right before close() arrives. Sends
+    `frames` flushes of numbered messages with "state" padding in between
+    (enough to back the transport up if the reader falls behind), then a
+    "close" and close(), all from the calling thread. Returns a dict with
+    "ok": every numbered message arrived in order and "close" came last.
+    """
+    server = AsyncServer("127.0.0.1", 0)
+    port = server.server.sockets[0].getsockname()[1]
+    receiver = connect("127.0.0.1", port)
+    got = []
+    receiver.start_reader(got.append)
+    sender = None
+    deadline = time.monotonic() + timeout
+    while sender is None and time.monotonic() < deadline:
+        sender = server.accept()
+        time.sleep(0.001)
+
+    numbered = []
+    for frame in range(frames):
+        for i in range(per_frame):
+            n = frame * per_frame + i
+            if i % 2:
+                sender.send({"type": "state", "pad": "x" * pad})
+            else:
+                sender.send({"type": "note", "n": n})
+                numbered.append(n)
+        sender.flush()
+    sender.send({"type": "close"})
+    sender.close()
+
+    while not (got and got[-1]["type"] == "close") and time.monotonic() < deadline:
+        time.sleep(0.01)
+    receiver.close()
+    server.close()
+    notes = [m["n"] for m in got if m["type"] == "note"]
+    return {"ok": notes == numbered and bool(got) and got[-1]["type"] == "close",
+            "notes": len(notes), "states": sum(m["type"] == "state" for m in got),
+            "dropped": sender.stats["dropped"], "closed": sender.closed}
+
+if __name__ == "__main__":
+    result = check_close()
+    print(f"send + close(): {result['notes']} numbered messages in order, {result['states']} states "
+          f"({result['dropped']} stale ones dropped), close {'arrived last' if result['ok'] else 'MISSING'}")
+    raise SystemExit(0 if result["ok"] else 1)
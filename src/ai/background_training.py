@@ -0,0 +1,209 @@
+# background_training.py
+#
+# Runs the multi_generation NEAT demo in a worker process at full speed.
+# The worker plays exactly the demo's rules (same spawn geometry, levels /
+# moving pipes, fitness bonuses) without drawing, and publishes a snapshot of
+# every `sample_every`-th frame to a SnapshotRing in shared memory. The UI
+# (multi_generation.run_background) draws the newest snapshot at 60 FPS, so
+# training is no longer throttled by rendering.
+#
+# The worker is a separate `python -m` process (not multiprocessing), so it
+# never re-imports the game's main module and its window.
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+import numpy as np
+
+from .snapshot_ring import SnapshotRing, PAUSED, STOP
+
+MODE_LEVELS = "levels"
+MODE_MOVING = "moving"
+
+BIRD_X, BIRD_Y = 230, 350
+PIPE_SPAWN_X = 900      # multi_generation: WIN_WIDTH + 100
+FLOOR = 730
+MAX_PIPES = 8
+GENERATIONS = 50
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+class Trainer:
+    """
+    Handle to a running worker. Owns the shared ring; pause() / resume() gate
+    the simulation, stop() ends it and frees the shared memory.
+    """
+
+    def __init__(self, config_file, mode=MODE_LEVELS, max_birds=256, sample_every=1):
+        self.ring = SnapshotRing(max_birds, MAX_PIPES)
+        env = dict(os.environ, SDL_VIDEODRIVER="dummy")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "src.ai.background_training",
+             "--ring", self.ring.name, "--birds", str(max_birds),
+             "--config", os.path.abspath(config_file), "--mode", mode,
+             "--sample-every", str(sample_every)],
+            cwd=PROJECT_ROOT, env=env)
+
+    def latest(self):
+        return self.ring.latest()
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def pause(self):
+        self.ring.set_flag(PAUSED)
+
+    def resume(self):
+        self.ring.set_flag(PAUSED, False)
+
+    def stop(self, timeout=2.0):
+        if self.ring.closed:
+            return
+        self.ring.set_flag(STOP)
+        self.ring.set_flag(PAUSED, False)
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.terminate()
+            self.process.wait()
+        self.ring.close()
+
+class _Stop(Exception):
+    pass
+
+def train(ring, config_file, mode=MODE_LEVELS, sample_every=1):
+    """Worker side: the demo's NEAT loop, publishing into ring."""
+    # Headless pygame in this process only (sprites are still needed for masks)
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import neat
+    from ..core.bird import Bird
+    from ..core.pipe import Pipe
+    from .speciation import CachedSpeciesSet
+
+    stats = {"gen": 0, "best": 0.0, "mean": 0.0}
+
+    def publish(frame, birds, pipes, score, level):
+        pipe_rows = np.array([(p.x, p.height, p.GAP) for p in pipes], dtype=np.float32).reshape(-1, 3)
+        bird_rows = np.array([(b.y, b.tilt, 1.0 if b.jump_frame > 0 else 0.0) for b in birds],
+                             dtype=np.float32).reshape(-1, 3)
+        ring.publish(bird_rows, pipe_rows, frame=frame, gen=stats["gen"], score=score,
+                     level=level, best_fitness=stats["best"], mean_fitness=stats["mean"])
+
+    def eval_genomes(genomes, config):
+        stats["gen"] += 1
+        nets, birds, ge = [], [], []
+        for _, genome in genomes:
+            genome.fitness = 0
+            nets.append(neat.nn.FeedForwardNetwork.create(genome, config))
+            birds.append(Bird(BIRD_X, BIRD_Y))
+            ge.append(genome)
+
+        moving = mode == MODE_MOVING
+        pipes = [Pipe(PIPE_SPAWN_X, moving=moving)]
+        current_gap = Pipe.BASIC_GAP
+        passed_count = 0
+        level = 1
+        score = 0
+        frame = 0
+
+        while birds:
+            while ring.flag(PAUSED) and not ring.flag(STOP):
+                time.sleep(0.05)
+            if ring.flag(STOP):
+                raise _Stop()
+            frame += 1
+
+            pipe_ind = 0
+            if len(pipes) > 1 and birds[0].x > pipes[0].x + pipes[0].PIPE_TOP.get_width():
+                pipe_ind = 1
+
+            for i, bird in enumerate(birds):
+                bird.move()
+                ge[i].fitness += 1
+                # jump_frame only counts down when the demo draws; do it here
+                bird.jump_frame = max(0, bird.jump_frame - 1)
+                output = nets[i].activate((bird.y, abs(bird.y - pipes[pipe_ind].height),
+                                           abs(bird.y - pipes[pipe_ind].bottom)))
+                if output[0] > 0.5:
+                    bird.jump()
+
+            add_pipe = False
+            for pipe in pipes:
+                if moving:
+                    if pipe.motionToTop:
+                        pipe.moveUp()
+                    else:
+                        pipe.moveDown()
+                pipe.move()
+                for i in reversed(range(len(birds))):
+                    if pipe.collide(birds[i]):
+                        ge[i].fitness -= 1
+                        del nets[i], ge[i], birds[i]
+                if birds and not pipe.passed and pipe.x < birds[0].x:
+                    pipe.passed = True
+                    add_pipe = True
+
+            if add_pipe:
+                score += 1
+                for genome in ge:
+                    genome.fitness += 5
+                if moving:
+                    pipes.append(Pipe(PIPE_SPAWN_X, moving=True))
+                else:
+                    passed_count += 1
+                    if passed_count % 15 == 0:
+                        current_gap = max(Pipe.MIN_GAP, current_gap - Pipe.CHANGE_IN_GAP)
+                        if current_gap != Pipe.MIN_GAP:
+                            level += 1
+                            for genome in ge:
+                                genome.fitness += 15
+                    pipes.append(Pipe(PIPE_SPAWN_X, gap=current_gap))
+
+            pipes = [p for p in pipes if p.x + p.PIPE_TOP.get_width() >= 0]
+
+            for i in reversed(range(len(birds))):
+                bird = birds[i]
+                if bird.y + bird.img.get_height() - 10 >= FLOOR or bird.y < -50:
+                    del nets[i], ge[i], birds[i]
+
+            if frame % sample_every == 0 or not birds:
+                publish(frame, birds, pipes, score, level)
+
+        fitnesses = [g.fitness for _, g in genomes]
+        stats["best"] = max(fitnesses)
+        stats["mean"] = sum(fitnesses) / len(fitnesses)
+
+    config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                                CachedSpeciesSet, neat.DefaultStagnation,
+                                config_file)
+    p = neat.Population(config)
+    p.add_reporter(neat.StdOutReporter(True))
+    try:
+        winner = p.run(eval_genomes, GENERATIONS)
+        print('\nBest genome:\n{!s}'.format(winner))
+    except _Stop:
+        pass
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ring", required=True, help="Shared-memory name of the SnapshotRing")
+    parser.add_argument("--birds", type=int, required=True, help="max_birds the ring was created with")
+    parser.add_argument("--config", required=True, help="NEAT config file")
+    parser.add_argument("--mode", choices=(MODE_LEVELS, MODE_MOVING), default=MODE_LEVELS)
+    parser.add_argument("--sample-every", type=int, default=1, help="Publish every n-th frame")
+    args = parser.parse_args()
+
+    # Lower priority than the UI, so sharing a core never costs it frames
+    if hasattr(os, "nice"):
+        os.nice(10)
+
+    ring = SnapshotRing(args.birds, MAX_PIPES, name=args.ring)
+    try:
+        train(ring, args.config, args.mode, args.sample_every)
+    finally:
+        ring.close()
+
+if __name__ == "__main__":
+    main()
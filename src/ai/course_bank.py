@@ -0,0 +1,271 @@
+# course_bank.py
+#
+# Pre-generated, physics-checked pipe courses.
+#
+# Pipe.set_height draws heights with randrange and never checks that the next
+# gap is reachable under Bird.GRAVITY / Bird.JUMP_VEL, so training wastes
+# evaluations on courses nobody can finish. This tool generates large seeded
+# batches of courses with NumPy, rejects the infeasible ones and stores the rest
+# in a memory-mapped .npy file that training / benchmark runs can draw from.
+#
+#   python -m src.ai.course_bank --out data/course_bank.npy --count 20000 --preset offline
+#
+import os
+import json
+import time
+import random
+import argparse
+
+import numpy as np
+
+# Load sprites headless (only their sizes are needed here)
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame  # noqa: E402
+
+from ..core.bird import Bird  # noqa: E402
+from ..core.pipe import Pipe  # noqa: E402
+from ..core.assets import PIPE_IMG, BIRD_AI_IMGS  # noqa: E402
+
+# Spawn geometry of each game loop: (pipe spawn x, bird x, distance between pipes).
+# The distance is how far the previous pipe has travelled when the next one spawns.
+PRESETS = {
+    "offline": (1020, 280, 745),  # train_offline: spawn when the bird passes a pipe
+    "mvm":     (1020, 280, 325),  # man_vs_machine: spawn when last pipe x < 700
+    "single":  (800, 300, 355),   # human_play: spawn when last pipe x < 450
+    "demo":    (900, 230, 675),   # multi_generation: spawn when the birds pass a pipe
+}
+
+START_Y = 250          # bird spawn height used by the AI loops
+LEVEL_EVERY = 15       # pipes per level (gap shrinks by Pipe.CHANGE_IN_GAP)
+MOVE_STEP = 3          # Pipe.moveUp / moveDown amount per frame
+
+def course_dtype(n_pipes):
+    return np.dtype([
+        ("seed", "<u8"),
+        ("heights", "<i2", (n_pipes,)),
+        ("gaps", "<i2", (n_pipes,)),
+        ("up", "u1", (n_pipes,)),   # initial Pipe.motionToTop for moving courses
+    ])
+
+# -------------------------
+# Physics envelopes
+# -------------------------
+
+def _sprite_size():
+    """Collision box of the bird (largest frame) and the pipe width."""
+    bird_w = max(img.get_width() for img in BIRD_AI_IMGS)
+    bird_h = max(img.get_height() for img in BIRD_AI_IMGS)
+    return bird_w, bird_h, PIPE_IMG.get_width()
+
+def max_climb(frames):
+    """Highest the bird can get in `frames` frames: flap every frame."""
+    return -(Bird.JUMP_VEL + Bird.GRAVITY) * frames
+
+def max_drop(frames):
+    """Lowest the bird gets in `frames` frames falling from rest."""
+    return Bird.GRAVITY * frames * (frames + 1) / 2.0
+
+def min_band(frames):
+    """
+    Smallest vertical band the bird needs to survive `frames` frames:
+    either fall the whole time or hover with one flap cycle.
+    """
+    vel = Bird.JUMP_VEL + Bird.GRAVITY * np.arange(1, 200)
+    jump_rise = -vel[vel < 0].sum()
+    return min(max_drop(frames), jump_rise)
+
+def gap_schedule(n_pipes, levels):
+    """Gap of every pipe in a course (levels shrink it every LEVEL_EVERY pipes)."""
+    if not levels:
+        return np.full(n_pipes, Pipe.BASIC_GAP, dtype=np.int16)
+    level = np.arange(n_pipes) // LEVEL_EVERY
+    return np.maximum(Pipe.MIN_GAP, Pipe.BASIC_GAP - level * Pipe.CHANGE_IN_GAP).astype(np.int16)
+
+def bounce(h0, up, frames):
+    """
+    Height of moving pipes after `frames` frames, closed form of
+    Pipe.moveUp / Pipe.moveDown (a triangle wave with one stall frame per flip).
+    h0, up: arrays (same shape); frames: int or array broadcastable to them.
+    """
+    h0 = np.asarray(h0, dtype=np.int64)
+    lo = h0 - MOVE_STEP * ((h0 - Pipe.MIN_HEIGHT) // MOVE_STEP)
+    hi = h0 + MOVE_STEP * ((Pipe.MAX_HEIGHT - h0) // MOVE_STEP)
+    n = (hi - lo) // MOVE_STEP
+    period = 2 * n + 2
+    # phase 0 = at lo heading down the screen (height growing)
+    phase0 = np.where(up, n + 1 + (hi - h0) // MOVE_STEP, (h0 - lo) // MOVE_STEP)
+    m = (phase0 + frames) % period
+    return np.where(m <= n, lo + MOVE_STEP * m, hi - MOVE_STEP * (m - n - 1))
+
+# -------------------------
+# Feasibility
+# -------------------------
+
+def analyze(heights, gaps, up=None, preset="offline"):
+    """
+    Vectorized reachability check for a batch of courses.
+
+    heights, gaps: (courses, pipes) arrays; up: initial motionToTop of moving
+    pipes (None for static courses). Returns a boolean array, True where every
+    gap fits the bird and every gap is reachable from the previous one.
+    """
+    spawn_x, bird_x, spacing = PRESETS[preset]
+    bird_w, bird_h, pipe_w = _sprite_size()
+
+    # Frames from spawn until the bird reaches the pipe, frames spent inside it,
+    # and free frames between leaving one pipe and entering the next.
+    enter = (spawn_x - bird_x - bird_w) / Pipe.VEL
+    inside = (pipe_w + bird_w) / Pipe.VEL
+    free = (spacing - pipe_w - bird_w) / Pipe.VEL
+    band = min_band(inside)
+
+    heights = np.asarray(heights, dtype=np.int64)
+    gaps = np.asarray(gaps, dtype=np.int64)
+
+    if up is None:
+        top_in = top_out = heights
+    else:
+        # Where the moving gap is when the bird enters and leaves it
+        top_in = bounce(heights, up, int(round(enter)))
+        top_out = bounce(heights, up, int(round(enter + inside)))
+
+    # 1) The bird has to fit through each gap for the whole traversal
+    # (a moving gap only drifts MOVE_STEP px/frame, slower than the bird can
+    # climb or fall, so the bird can follow it and only the gap size matters)
+    fits = gaps - bird_h >= band
+
+    # 2) Each gap has to be reachable from the previous one
+    safe_top_out = top_out[:, :-1]
+    safe_bottom_out = top_out[:, :-1] + gaps[:, :-1] - bird_h
+    safe_top_in = top_in[:, 1:]
+    safe_bottom_in = top_in[:, 1:] + gaps[:, 1:] - bird_h
+    climb_ok = safe_top_out - safe_bottom_in <= max_climb(free)
+    drop_ok = safe_top_in - safe_bottom_out <= max_drop(free)
+
+    # 3) ... and the first one from the spawn height
+    first_free = enter
+    first_ok = ((START_Y - (top_in[:, 0] + gaps[:, 0] - bird_h) <= max_climb(first_free)) &
+                (top_in[:, 0] - START_Y <= max_drop(first_free)))
+
+    return fits.all(axis=1) & climb_ok.all(axis=1) & drop_ok.all(axis=1) & first_ok
+
+def generate(seed, n_courses, n_pipes, levels=False, moving=False):
+    """One seeded batch of random courses, drawn exactly like Pipe.set_height."""
+    rng = np.random.default_rng(seed)
+    heights = rng.integers(Pipe.MIN_HEIGHT, Pipe.MAX_HEIGHT, size=(n_courses, n_pipes), dtype=np.int16)
+    gaps = np.broadcast_to(gap_schedule(n_pipes, levels), (n_courses, n_pipes))
+    up = rng.integers(0, 2, size=(n_courses, n_pipes), dtype=np.uint8) if moving else None
+    return heights, gaps, up
+
+def build_bank(out, count, n_pipes=64, preset="offline", levels=False, moving=False,
+               seed=0, batch=4096):
+    """Generate batches until `count` feasible courses are stored in `out`."""
+    bank = np.lib.format.open_memmap(out, mode="w+", dtype=course_dtype(n_pipes), shape=(count,))
+    stored = 0
+    generated = 0
+    feasible = 0
+    batch_no = 0
+    t0 = time.time()
+    while stored < count:
+        batch_seed = seed * 1_000_003 + batch_no
+        heights, gaps, up = generate(batch_seed, batch, n_pipes, levels, moving)
+        ok = analyze(heights, gaps, up, preset)
+        idx = np.flatnonzero(ok)[:count - stored]
+
+        rows = bank[stored:stored + len(idx)]
+        rows["seed"] = (np.uint64(batch_seed) << np.uint64(20)) | idx.astype(np.uint64)
+        rows["heights"] = heights[idx]
+        rows["gaps"] = gaps[idx]
+        if up is not None:
+            rows["up"] = up[idx]
+
+        stored += len(idx)
+        generated += batch
+        feasible += int(ok.sum())
+        batch_no += 1
+        if batch_no > 1000 and stored == 0:
+            raise RuntimeError("No feasible course found; check the preset / gap settings.")
+    bank.flush()
+
+    meta = {
+        "preset": preset,
+        "pipes": n_pipes,
+        "levels": levels,
+        "moving": moving,
+        "seed": seed,
+        "count": count,
+        "generated": generated,
+        "feasible_rate": feasible / generated,
+    }
+    with open(out + ".json", "w") as f:
+        json.dump(meta, f, indent=2)
+    print(f"[BANK] {count} courses ({meta['feasible_rate']:.1%} feasible) "
+          f"in {time.time() - t0:.1f}s -> {out}")
+    return meta
+
+# -------------------------
+# Reading the bank
+# -------------------------
+
+class Course:
+    """Pipe factory replaying one stored course (falls back to random pipes at its end)."""
+
+    def __init__(self, row, moving=False):
+        self.heights = row["heights"]
+        self.gaps = row["gaps"]
+        self.up = row["up"]
+        self.moving = moving
+        self.index = 0
+
+    def next_pipe(self, x):
+        i = self.index
+        self.index += 1
+        if i >= len(self.heights):
+            return Pipe(x, gap=int(self.gaps[-1]), moving=self.moving)
+        pipe = Pipe(x, gap=int(self.gaps[i]), moving=self.moving, height=int(self.heights[i]))
+        if self.moving:
+            pipe.motionToTop = int(self.up[i])
+        return pipe
+
+class CourseBank:
+    """Read-only, memory-mapped view of a bank written by build_bank."""
+
+    def __init__(self, path):
+        self.path = path
+        self.courses = np.load(path, mmap_mode="r")
+        try:
+            with open(path + ".json") as f:
+                self.meta = json.load(f)
+        except FileNotFoundError:
+            self.meta = {}
+
+    def __len__(self):
+        return len(self.courses)
+
+    def course(self, index):
+        return Course(self.courses[index % len(self.courses)], self.meta.get("moving", False))
+
+    def sample_index(self, rng=random):
+        return rng.randrange(len(self.courses))
+
+    def sample(self, rng=random):
+        return self.course(self.sample_index(rng))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", required=True, help="Output .npy file (metadata goes to <out>.json)")
+    parser.add_argument("--count", type=int, default=10000, help="Number of feasible courses to store")
+    parser.add_argument("--pipes", type=int, default=64, help="Pipes per course")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="offline", help="Spawn geometry of the target game loop")
+    parser.add_argument("--levels", action="store_true", help="Shrink the gap every 15 pipes")
+    parser.add_argument("--moving", action="store_true", help="Moving pipes (multi_generation moving mode)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch", type=int, default=4096, help="Courses generated per vectorized batch")
+    args = parser.parse_args()
+
+    pygame.init()
+    build_bank(args.out, args.count, args.pipes, args.preset, args.levels, args.moving,
+               args.seed, args.batch)
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,17 @@ import os
 import random
 import sys
 
+import numpy as np
+
 from ..core.bird import Bird
 from ..core.pipe import Pipe
-from ..core.assets import BG_IMG, SCORE_ORANGE, SCORE_OUTLINE, SCORE_FILL
+from ..core.assets import BG_IMG, PIPE_IMG, BIRD_IMGS, SCORE_ORANGE, SCORE_OUTLINE, SCORE_FILL, get_font, quantize_font_size, image
 from ..ui.button import Button, render_outlined_text
+from ..ui.population_renderer import PopulationRenderer
+from ..ui.dirty_rects import DirtyRenderer
+from ..utils.frame_profiler import FrameProfiler
+from .speciation import CachedSpeciesSet
+from .background_training import Trainer, BIRD_X
 
 # Game settings
 WIN_WIDTH = 800
@@ -19,6 +26,12 @@ pygame.display.set_caption("Flappy Bird NEAT - Level System")
 
 clock = pygame.time.Clock()
 
+# Training frames only redraw and update what moved (pipes, birds, HUD text)
+SCREEN = DirtyRenderer(BG_IMG)
+
+# F3: frame-time overlay, F4: dump the timings
+PROFILER = FrameProfiler("multi_generation")
+
 # Pause menu settings
 PAUSE_OVERLAY_COLOR = (0, 0, 0, 180)  # Semi-transparent black
 PAUSE_BUTTON_WIDTH = 200
@@ -35,7 +48,7 @@ MODE_MOVING = "moving"
 
 def draw_pause_menu(surface):
     # Use background image instead of semi-transparent overlay
-    surface.blit(BG_IMG, (0, 0))
+    surface.blit(image("bg"), (0, 0))
     
     # Create a semi-transparent overlay on top of the background
     overlay = pygame.Surface((WIN_WIDTH, WIN_HEIGHT), pygame.SRCALPHA)
@@ -43,7 +56,7 @@ def draw_pause_menu(surface):
     surface.blit(overlay, (0, 0))
     
     # Create pause title text
-    title_font = pygame.font.Font(None, 72)
+    title_font = get_font(72)
     render_outlined_text(
         surface,
         "PAUSED",
@@ -98,10 +111,11 @@ def draw_level_up_animation(surface, frame):
     else:
         alpha = 255 * (1 - (frame - LEVEL_UP_DURATION / 2) / (LEVEL_UP_DURATION / 2))
     
-    # Create the level up text font
+    # Create the level up text font (sizes quantized so the animation reuses
+    # a handful of shared fonts and cached text surfaces)
     base_size = 72
-    font_size = int(base_size * scale)
-    level_font = pygame.font.Font(None, font_size)
+    font_size = quantize_font_size(base_size * scale)
+    level_font = get_font(font_size)
     
     # Create a transparent surface for the level up text
     text_surface = pygame.Surface((WIN_WIDTH, 200), pygame.SRCALPHA)
@@ -118,26 +132,42 @@ def draw_level_up_animation(surface, frame):
         "LEVEL UP!",
         level_font,
         (WIN_WIDTH // 2, 100),
-        (*LEVEL_UP_COLOR, int(alpha)),
-        (0, 0, 0, int(alpha * 0.8)),
-        (255, 255, 255, int(alpha * 0.6))
+        LEVEL_UP_COLOR,
+        (0, 0, 0),
+        (255, 255, 255)
     )
     
+    # Fade the whole text (font.render ignores the alpha of its color)
+    text_surface.set_alpha(int(alpha))
+    
     # Apply the text surface to the main surface
     surface.blit(text_surface, (0, y_pos - 100))
 
 # Draw game window (without base)
 def draw_window(win, birds, pipes, score, gen, mode, level=1, level_up_frame=None):
-    win.blit(BG_IMG, (0, 0))
+    # win: the DirtyRenderer; it restores the background under the last frame
+    win.begin()
     
     for pipe in pipes:
         pipe.draw(win)
     
+    rows = [(bird.y, bird.tilt, 1 if bird.jump_frame > 0 else 0) for bird in birds]
     for bird in birds:
-        bird.draw(win)
-    
+        # Bird.draw would count the wing frame down (collisions depend on it)
+        if bird.jump_frame > 0:
+            bird.jump_frame -= 1
+    next_pipe = next((p for p in pipes if p.x + p.PIPE_TOP.get_width() > BIRD_X), None)
+    POPULATION.draw(win, rows, gap_rank(rows, next_pipe and (next_pipe.height, next_pipe.GAP)))
+    
+    draw_hud(win, score, gen, len(birds), mode, level, level_up_frame)
+    PROFILER.lap("render")
+    PROFILER.draw(win)
+    win.present()
+
+def draw_hud(win, score, gen, alive, mode, level=1, level_up_frame=None):
+    """Score / generation / alive counters, mode info and control hints."""
     # Create custom font similar to what's used in main.py
-    font = pygame.font.Font(None, 40)
+    font = get_font(40)
     
     # Display score with stylized text in top center
     render_outlined_text(
@@ -164,7 +194,7 @@ def draw_window(win, birds, pipes, score, gen, mode, level=1, level_up_frame=Non
     # Display alive birds count with stylized text
     render_outlined_text(
         win, 
-        "Alive: " + str(len(birds)), 
+        "Alive: " + str(alive), 
         font, 
         (80, 70),
         SCORE_ORANGE,
@@ -212,7 +242,7 @@ def draw_window(win, birds, pipes, score, gen, mode, level=1, level_up_frame=Non
         )
     
     # Control hints (AI mode - no jump control needed)
-    hint_font = pygame.font.Font(None, 24)
+    hint_font = get_font(24)
     render_outlined_text(
         win,
         "ESC: Pause | R: Restart | M: Menu",
@@ -222,8 +252,47 @@ def draw_window(win, birds, pipes, score, gen, mode, level=1, level_up_frame=Non
         SCORE_OUTLINE,
         SCORE_FILL
     )
-    
-    pygame.display.update()
+
+# All birds in one blits call; above CULL_ABOVE birds only the TOP_K closest to
+# the next gap are drawn, plus a heat strip of where the rest are
+POPULATION = PopulationRenderer(BIRD_IMGS, BIRD_X, WIN_HEIGHT)
+
+def gap_rank(rows, gap):
+    """Higher for birds closer to the middle of the next gap (height, size)."""
+    if gap is None or len(rows) == 0:
+        return None
+    height, size = gap
+    return -np.abs(np.asarray(rows, dtype=np.float64).reshape(-1, 3)[:, 0] - (height + size / 2))
+
+def draw_snapshot(win, snap, mode, level_up_frame=None):
+    """Draw one snapshot published by the background trainer (win: the DirtyRenderer)."""
+    win.begin()
+
+    pipe_top, pipe_bottom = image("pipe_top"), image("pipe")
+    for x, height, gap in snap["pipes"][:snap["n_pipes"]].tolist():
+        win.blit(pipe_top, (x, height - pipe_top.get_height()))
+        win.blit(pipe_bottom, (x, height + gap))
+
+    birds = snap["birds"][:snap["alive"]]
+    pipes = snap["pipes"][:snap["n_pipes"]]
+    ahead = pipes[pipes[:, 0] + PIPE_IMG.get_width() > BIRD_X]
+    POPULATION.draw(win, birds, gap_rank(birds, tuple(ahead[0, 1:]) if len(ahead) else None))
+
+    draw_hud(win, int(snap["score"]), int(snap["gen"]), int(snap["alive"]), mode,
+             int(snap["level"]), level_up_frame)
+    if snap["gen"] > 1:
+        render_outlined_text(
+            win,
+            "Best: " + str(int(snap["best_fitness"])),
+            get_font(40),
+            (80, 110),
+            SCORE_ORANGE,
+            SCORE_OUTLINE,
+            SCORE_FILL
+        )
+    PROFILER.lap("render")
+    PROFILER.draw(win)
+    win.present()
 
 # Global generation counter
 gen = 0
@@ -237,6 +306,8 @@ def eval_genomes(genomes, config, mode=MODE_LEVELS):
         pygame.display.set_caption("Flappy Bird NEAT - Level System")
     else:  # mode == MODE_MOVING
         pygame.display.set_caption("Flappy Bird NEAT - Moving Pipes")
+    # A new generation starts from a full redraw (the window may hold the menu)
+    SCREEN.invalidate()
 
     nets = []
     birds = []
@@ -267,10 +338,12 @@ def eval_genomes(genomes, config, mode=MODE_LEVELS):
     run = True
     while run and len(birds) > 0:
         clock.tick(60)
+        PROFILER.begin_frame()
         
         # Handle pause state
         if paused:
             resume_button, menu_button = draw_pause_menu(WIN)
+            SCREEN.invalidate()
             
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
@@ -292,6 +365,8 @@ def eval_genomes(genomes, config, mode=MODE_LEVELS):
         
         # Process events
         for event in pygame.event.get():
+            if PROFILER.handle_event(event):
+                continue
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
@@ -302,6 +377,7 @@ def eval_genomes(genomes, config, mode=MODE_LEVELS):
                     # Set flag to return to menu instead of calling directly
                     return_to_menu = True
                     run = False
+        PROFILER.lap("input")
         
         # Only determine pipe_ind if birds exist
         if len(birds) > 0:
@@ -314,7 +390,8 @@ def eval_genomes(genomes, config, mode=MODE_LEVELS):
             bird.move()
             ge[i].fitness += 1
             
-            output = nets[i].activate((bird.y,abs(bird.y - pipes[pipe_ind].height), abs(bird.y - pipes[pipe_ind].bottom)))
+            with PROFILER.phase("ai"):
+                output = nets[i].activate((bird.y,abs(bird.y - pipes[pipe_ind].height), abs(bird.y - pipes[pipe_ind].bottom)))
             if output[0] > 0.5:
                 bird.jump()
         
@@ -332,12 +409,13 @@ def eval_genomes(genomes, config, mode=MODE_LEVELS):
             pipe.move()
             
             # Check for collision with any bird
-            for i, bird in enumerate(birds):
-                if pipe.collide(bird):
-                    ge[i].fitness -= 1
-                    nets.pop(i)
-                    ge.pop(i)
-                    birds.pop(i)
+            with PROFILER.phase("collision"):
+                for i, bird in enumerate(birds):
+                    if pipe.collide(bird):
+                        ge[i].fitness -= 1
+                        nets.pop(i)
+                        ge.pop(i)
+                        birds.pop(i)
             
             # Mark pipe for removal if it goes off-screen
             if pipe.x + pipe.PIPE_TOP.get_width() < 0:
@@ -391,11 +469,14 @@ def eval_genomes(genomes, config, mode=MODE_LEVELS):
             else:
                 level_up_frame = None
         
+        PROFILER.lap("sim")
+        
         # Draw window with current game state
         if mode == MODE_LEVELS:
-            draw_window(WIN, birds, pipes, score, gen, mode, level, level_up_frame)
+            draw_window(SCREEN, birds, pipes, score, gen, mode, level, level_up_frame)
         else:  # mode == MODE_MOVING
-            draw_window(WIN, birds, pipes, score, gen, mode)
+            draw_window(SCREEN, birds, pipes, score, gen, mode)
+        PROFILER.lap("flip")
     
     # After exiting the main game loop, check if we need to return to menu
     if return_to_menu:
@@ -403,16 +484,102 @@ def eval_genomes(genomes, config, mode=MODE_LEVELS):
     
     return None
 
-def run(config_file, mode=MODE_LEVELS):
+def run_background(config_file, mode=MODE_LEVELS):
+    """
+    Train in a worker process at full speed and draw its newest snapshot at 60 FPS.
+    Returns "menu" when the player asks for the menu.
+    """
+    pygame.display.set_caption("Flappy Bird NEAT - Level System" if mode == MODE_LEVELS
+                               else "Flappy Bird NEAT - Moving Pipes")
+    # SCREEN outlives a session and set_mode() hands back the same window, so
+    # whatever the menu drew there is still on it
+    SCREEN.invalidate()
+    config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                                CachedSpeciesSet, neat.DefaultStagnation,
+                                config_file)
+    trainer = Trainer(config_file, mode, max_birds=config.pop_size)
+    paused = False
+    level = 1
+    level_up_frame = None
+    snap = None
+
+    try:
+        while True:
+            clock.tick(60)
+            PROFILER.begin_frame()
+
+            if paused:
+                resume_button, menu_button = draw_pause_menu(WIN)
+                SCREEN.invalidate()
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        pygame.quit()
+                        sys.exit()
+                    if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                        paused = False
+                        trainer.resume()
+                    if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                        if resume_button.is_clicked(pygame.mouse.get_pos(), True):
+                            paused = False
+                            trainer.resume()
+                        if menu_button.is_clicked(pygame.mouse.get_pos(), True):
+                            return "menu"
+                continue
+
+            for event in pygame.event.get():
+                if PROFILER.handle_event(event):
+                    continue
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    sys.exit()
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_ESCAPE:
+                        paused = True
+                        trainer.pause()
+                    elif event.key == pygame.K_m:
+                        return "menu"
+
+            PROFILER.lap("input")
+
+            # The simulation runs in the worker; here it is just reading the newest snapshot
+            snap = trainer.latest() or snap
+            if snap is None:
+                if not trainer.alive():
+                    return None
+                continue
+
+            # The level-up animation runs on the UI clock
+            if mode == MODE_LEVELS and int(snap["level"]) > level:
+                level_up_frame = 0
+            level = int(snap["level"])
+            if level_up_frame is not None:
+                level_up_frame = level_up_frame + 1 if level_up_frame < LEVEL_UP_DURATION else None
+
+            # After the last generation the final frame stays up until the player leaves
+            PROFILER.lap("sim")
+            draw_snapshot(SCREEN, snap, mode, level_up_frame)
+            PROFILER.lap("flip")
+    finally:
+        # Also on sys.exit() from the QUIT handlers
+        trainer.stop()
+
+def run(config_file, mode=MODE_LEVELS, background=True):
     """
     Run the NEAT algorithm to train a neural network to play Flappy Bird.
     
     Args:
         config_file: Path to the config file for NEAT
         mode: Game mode - either "levels" for decreasing gaps or "moving" for moving pipes
+        background: Train in a worker process and only visualize it (see background_training)
     """
+    if background:
+        if run_background(config_file, mode) == "menu":
+            from ..ui import menu
+            menu.run_menu()
+        return
+
     config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
-                                neat.DefaultSpeciesSet, neat.DefaultStagnation,
+                                CachedSpeciesSet, neat.DefaultStagnation,
                                 config_file)
     
     p = neat.Population(config)
@@ -1,10 +1,35 @@
 # net.py
+#
+# Transport for LAN play. A TCP connection starts out carrying newline-
+# delimited JSON; each direction can then switch to length-prefixed binary
+# frames (a uint16 body length, then the body) once the peers agreed on a
+# codec, see multiplayer/protocol.py. The sender switches right after a
+# marker message and the receiver right after reading it, so both ends change
+# format at the same byte.
+#
+# Real-time state can additionally go over a DatagramChannel (UDP): a lost
+# datagram is simply superseded by the next one instead of holding up
+# everything behind it until TCP retransmits it.
+#
+# Readers receive straight into a preallocated buffer and decode each message
+# from a memoryview of it; the game loop picks the messages up from an Inbox
+# once per frame. `python -m src.ai.net` measures the reader's throughput,
+# and its framing alone on bursts of different recv sizes.
 import json
 import socket
+import struct
 import threading
+import time
+from collections import deque
 
 ENC = "utf-8"
 DELIM = b"\n"
+FRAME_HEADER = struct.Struct("<H")   # body length of a binary frame
+MAX_FRAME = 0xFFFF
+DATAGRAM_HEADER = struct.Struct("<II")   # channel token, sequence number
+MAX_DATAGRAM = 1200                      # below a typical path MTU, so never fragmented
+RECV_BUFFER = 1 << 16                    # initial reader buffer; grows to fit a longer line
+INBOX_SIZE = 1024                        # messages waiting for the game loop before the reader pauses
 
 def make_server(host: str, port: int) -> socket.socket:
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -18,52 +43,465 @@ def connect(host: str, port: int, timeout: float = 5.0) -> socket.socket:
     s.settimeout(timeout)
     s.connect((host, port))
     s.settimeout(None)
+    nodelay(s)
     return s
 
+def nodelay(sock: socket.socket):
+    """Turn Nagle's algorithm off: a flap is a few bytes and must not wait for an ACK to go out."""
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    except (OSError, AttributeError):
+        pass   # not TCP (e.g. a socketpair in the benchmark)
+
+def open_udp(host: str = "0.0.0.0", port: int = 0) -> socket.socket:
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    s.bind((host, port))
+    return s
+
+def encode_json(obj: dict) -> bytes:
+    return json.dumps(obj, separators=(",", ":")).encode(ENC) + DELIM
+
 def send_json(sock: socket.socket, obj: dict):
     try:
-        data = json.dumps(obj, separators=(",", ":")).encode(ENC) + DELIM
-        sock.sendall(data)
+        sock.sendall(encode_json(obj))
     except OSError:
         # socket closed/disconnected
         pass
 
+class Connection:
+    """
+    A connected socket plus the format of each direction. tx_codec / rx_codec
+    are None for JSON lines, or an object with encode(dict) -> bytes and
+    decode(bytes) -> dict for binary frames. send() may be called from any
+    thread; on_msg is called on the reader thread.
+    """
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.tx_codec = None
+        self.rx_codec = None
+        self.version = None            # binary protocol version agreed on, None for JSON
+        self.lock = threading.Lock()   # one message at a time, and no format switch mid-send
+        self.stats = {"sent": 0, "bytes_sent": 0, "received": 0, "bytes_received": 0}
+
+    @property
+    def binary(self):
+        return self.tx_codec is not None
+
+    def encode(self, msg: dict) -> bytes:
+        if self.tx_codec is None:
+            return encode_json(msg)
+        body = self.tx_codec.encode(msg)
+        if len(body) > MAX_FRAME:
+            raise ValueError(f"message too large for one frame: {len(body)} bytes")
+        return FRAME_HEADER.pack(len(body)) + body
+
+    def _send(self, msg):
+        data = self.encode(msg)
+        try:
+            self.sock.sendall(data)
+        except OSError:
+            return False
+        self.stats["sent"] += 1
+        self.stats["bytes_sent"] += len(data)
+        return True
+
+    def send(self, msg: dict) -> bool:
+        """Send one message; False if the socket is closed."""
+        with self.lock:
+            return self._send(msg)
+
+    def flush(self):
+        """Nothing to do: send() writes straight away (AsyncConnection batches until here)."""
+
+    def switch_tx(self, codec, marker=None):
+        """Send marker (in the current format), then everything after it with codec."""
+        with self.lock:
+            if marker is not None:
+                self._send(marker)
+            self.tx_codec = codec
+
+    def switch_rx(self, codec):
+        """Decode everything after the message being handled with codec (call from on_msg)."""
+        self.rx_codec = codec
+
+    # -------------------------
+    # Reading
+    # -------------------------
+
+    def _next(self, buf: "RecvBuffer"):
+        """The next complete message body in buf as (memoryview, codec), or None."""
+        codec = self.rx_codec
+        if codec is None:
+            body = buf.line()
+        else:
+            body = buf.frame()
+        return None if body is None else (body, codec)
+
+    def _dispatch(self, buf: "RecvBuffer", on_msg):
+        """Decode the complete messages in buf and pass them to on_msg."""
+        # on_msg may switch rx_codec, so the format is looked up per message
+        while True:
+            item = self._next(buf)
+            if item is None:
+                break
+            body, codec = item
+            if not body:
+                continue
+            try:
+                msg = json.loads(str(body, ENC)) if codec is None else codec.decode(body)
+                self.stats["received"] += 1
+                on_msg(msg)
+            except Exception:
+                pass
+            finally:
+                body.release()
+
+    def start_reader(self, on_msg):
+        """
+        Read messages on a background thread and call on_msg(dict).
+        Quits quietly if the socket is closed/reset.
+        """
+        def _run():
+            buf = RecvBuffer()
+            try:
+                while True:
+                    try:
+                        n = buf.fill(self.sock)
+                    except (ConnectionResetError, OSError):
+                        break
+                    if not n:
+                        break
+                    self.stats["bytes_received"] += n
+                    self._dispatch(buf, on_msg)
+            finally:
+                self.close()
+
+        t = threading.Thread(target=_run, daemon=True)
+        t.start()
+        return t
+
+    def close(self):
+        try:
+            self.sock.close()
+        except Exception:
+            pass
+
+class RecvBuffer:
+    """
+    A preallocated receive buffer: recv_into() fills the free space at the
+    end and messages are handed out as memoryviews of it, so nothing is
+    copied per message. Consumed bytes are only reclaimed when the free
+    space runs out, by moving the (usually short) unread rest to the front.
+    A view must be released before the next fill().
+    """
+
+    def __init__(self, size=RECV_BUFFER):
+        self.buf = bytearray(size)
+        self.view = memoryview(self.buf)
+        self.start = 0             # first unread byte
+        self.end = 0               # end of the received data
+
+    def fill(self, sock: socket.socket) -> int:
+        """Receive into the free space; returns the byte count (0: closed)."""
+        n = sock.recv_into(self.space())
+        self.filled(n)
+        return n
+
+    def space(self) -> memoryview:
+        """The free space at the end, made room for if there is none."""
+        if self.start == self.end:
+            self.start = self.end = 0
+        elif self.end == len(self.buf):
+            self._compact()
+        return self.view[self.end:]
+
+    def filled(self, n: int):
+        self.end += n
+
+    def _compact(self):
+        if self.start:
+            size = self.end - self.start
+            self.view[:size] = self.view[self.start:self.end]
+            self.start, self.end = 0, size
+        else:
+            # One message longer than the whole buffer: make room
+            self.view.release()
+            self.buf.extend(bytes(len(self.buf)))
+            self.view = memoryview(self.buf)
+
+    def line(self):
+        """The next newline-terminated body (without the newline), or None."""
+        i = self.buf.find(DELIM, self.start, self.end)
+        if i < 0:
+            return None
+        body = self.view[self.start:i]
+        self.start = i + 1
+        return body
+
+    def frame(self):
+        """The next length-prefixed body, or None."""
+        if self.end - self.start < FRAME_HEADER.size:
+            return None
+        (n,) = FRAME_HEADER.unpack_from(self.buf, self.start)
+        begin = self.start + FRAME_HEADER.size
+        if self.end - begin < n:
+            if begin + n > len(self.buf) and self.start:
+                self._compact()   # (growing waits for space(): a recv may still hold a view)
+            return None
+        self.start = begin + n
+        return self.view[begin:begin + n]
+
+class Inbox:
+    """
+    Bounded hand-off from reader threads to the game loop, which drain()s
+    it once per frame. When it is full the reader waits, stops reading the
+    socket, and TCP flow control slows the sender down.
+    """
+
+    def __init__(self, size=INBOX_SIZE):
+        self.size = size
+        self.items = deque()       # (arrival time, message)
+        self.cond = threading.Condition()
+        self.closed = False
+        self.stats = {"messages": 0, "max_depth": 0, "waits": 0}
+
+    def put(self, msg: dict):
+        now = time.perf_counter()
+        with self.cond:
+            while len(self.items) >= self.size and not self.closed:
+                self.stats["waits"] += 1
+                self.cond.wait(0.1)
+            self.items.append((now, msg))
+            self.stats["messages"] += 1
+            self.stats["max_depth"] = max(self.stats["max_depth"], len(self.items))
+
+    def drain(self):
+        """[(arrival time, message)] that came in since the last call."""
+        with self.cond:
+            items = list(self.items)
+            self.items.clear()
+            self.cond.notify_all()
+        return items
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
 def start_reader(sock: socket.socket, on_msg):
     """
     Read newline-delimited JSON on a background thread and call on_msg(dict).
     Quits quietly if the socket is closed/reset.
     """
-    buf = b""
+    return Connection(sock).start_reader(on_msg)
 
-    def _run():
-        nonlocal buf
+class DatagramChannel:
+    """
+    Unreliable messages to one peer over UDP, with Connection's send() /
+    start_reader(on_msg). Every datagram carries the channel token (handed
+    out over TCP) and a sequence number. The reader drops datagrams with
+    another token and any that arrive after a newer one (late or reordered),
+    so on_msg only ever moves forward. peer=None (host side) is learned from
+    the first datagram with the right token.
+    """
+
+    def __init__(self, sock: socket.socket, token: int, codec, peer=None):
+        self.sock = sock
+        self.token = token
+        self.codec = codec
+        self.peer = peer
+        self.seq = 0
+        self.newest = 0            # newest sequence number received
+        self.stats = {"sent": 0, "bytes_sent": 0, "received": 0, "late": 0, "lost": 0}
+
+    def send(self, msg: dict) -> bool:
+        """Send one message as one datagram; False if there is no peer yet or the socket failed."""
+        if self.peer is None:
+            return False
+        self.seq += 1
+        data = DATAGRAM_HEADER.pack(self.token, self.seq) + self.codec.encode(msg)
+        if len(data) > MAX_DATAGRAM:
+            raise ValueError(f"message too large for one datagram: {len(data)} bytes")
         try:
+            self.sock.sendto(data, self.peer)
+        except OSError:
+            return False
+        self.stats["sent"] += 1
+        self.stats["bytes_sent"] += len(data)
+        return True
+
+    def received(self, data, addr, on_msg):
+        """Handle one datagram (bytes or a memoryview) from addr."""
+        if len(data) <= DATAGRAM_HEADER.size:
+            return
+        token, seq = DATAGRAM_HEADER.unpack_from(data)
+        if token != self.token:
+            return
+        if seq <= self.newest:
+            self.stats["late"] += 1
+            return
+        self.stats["lost"] += seq - self.newest - 1
+        self.newest = seq
+        if self.peer is None:
+            self.peer = addr
+        try:
+            msg = self.codec.decode(data[DATAGRAM_HEADER.size:])
+            self.stats["received"] += 1
+            on_msg(msg)
+        except Exception:
+            pass
+
+    def start_reader(self, on_msg):
+        """Read datagrams on a background thread and call on_msg(dict) for the newer ones."""
+        def _run():
+            buf = bytearray(MAX_DATAGRAM)
+            view = memoryview(buf)
             while True:
                 try:
-                    chunk = sock.recv(4096)
-                except (ConnectionResetError, OSError):
+                    n, addr = self.sock.recvfrom_into(buf)
+                except OSError:
                     break
-                if not chunk:
-                    break
-                buf += chunk
-                while True:
-                    i = buf.find(DELIM)
-                    if i < 0:
-                        break
-                    line = buf[:i]
-                    buf = buf[i + 1:]
-                    if not line:
-                        continue
-                    try:
-                        on_msg(json.loads(line.decode(ENC)))
-                    except Exception:
-                        pass
-        finally:
-            try:
-                sock.close()
-            except Exception:
-                pass
+                self.received(view[:n], addr, on_msg)
+
+        t = threading.Thread(target=_run, daemon=True)
+        t.start()
+        return t
+
+    def close(self):
+        try:
+            self.sock.close()
+        except Exception:
+            pass
+
+# -------------------------
+# Reader benchmarks: python -m src.ai.net [--messages N] [--repeat N]
+# -------------------------
+
+def _copying_lines(sock, recv_size=4096):
+    """The framing before RecvBuffer: appends each chunk, slices each line off the front."""
+    buf = b""
+    while True:
+        chunk = sock.recv(recv_size)
+        if not chunk:
+            break
+        buf += chunk
+        while True:
+            i = buf.find(DELIM)
+            if i < 0:
+                break
+            line, buf = buf[:i], buf[i + 1:]
+            if line:
+                yield line
+
+def _copying_reader(sock: socket.socket, on_msg):
+    """The reader before RecvBuffer, for comparison."""
+    for line in _copying_lines(sock):
+        on_msg(json.loads(line.decode(ENC)))
+
+class _Burst:
+    """Socket stand-in for bench_framing: a burst already received, at most `chunk` bytes per call."""
+
+    def __init__(self, data, chunk):
+        self.data = memoryview(data)
+        self.pos = 0
+        self.chunk = chunk
+
+    def recv(self, n):
+        n = min(n, self.chunk)
+        out = self.data[self.pos:self.pos + n].tobytes()
+        self.pos += len(out)
+        return out
+
+    def recv_into(self, buf):
+        n = min(len(buf), self.chunk, len(self.data) - self.pos)
+        buf[:n] = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return n
+
+def bench_framing(messages=20_000, size=200, chunk=1 << 20):
+    """
+    Framing alone: lines per second split out of a burst of `size`-byte lines
+    that arrive up to `chunk` bytes per recv, with no socket, decoding or
+    Inbox. Returns (copying reader, RecvBuffer) rates.
+    """
+    data = (b"x" * (size - 1) + DELIM) * messages
+    rates = []
+    for copying in (True, False):
+        sock = _Burst(data, chunk)
+        count = 0
+        start = time.perf_counter()
+        if copying:
+            for _ in _copying_lines(sock, chunk):
+                count += 1
+        else:
+            buf = RecvBuffer()
+            while buf.fill(sock):
+                line = buf.line()
+                while line is not None:
+                    line.release()
+                    count += 1
+                    line = buf.line()
+        assert count == messages
+        rates.append(messages / (time.perf_counter() - start))
+    return rates
+
+def bench_reader(messages=100_000, codec=None, copying=False, sample=None):
+    """Messages per second from a socketpair burst through a reader into an Inbox the caller drains."""
+    a, b = socket.socketpair()
+    msg = sample or {"type": "state", "p1": {"x": 300, "y": 412.5, "tilt": 15, "alive": True, "score": 3},
+                     "p2": {"x": 200, "y": 380.25, "tilt": -20, "alive": True, "score": 2},
+                     "pipes": [{"x": 612, "top": -412, "bottom": 528}, {"x": 312, "top": -301, "bottom": 639}],
+                     "game_over1": False, "game_over2": False, "w": 800, "h": 900}
+    sender = Connection(b)
+    sender.tx_codec = codec
+    data = sender.encode(msg) * messages
+    inbox = Inbox()
+    if copying:
+        threading.Thread(target=_copying_reader, args=(a, inbox.put), daemon=True).start()
+    else:
+        reader = Connection(a)
+        reader.rx_codec = codec
+        reader.start_reader(inbox.put)
+
+    start = time.perf_counter()
+    threading.Thread(target=b.sendall, args=(data,), daemon=True).start()
+    received = 0
+    while received < messages:
+        time.sleep(0.001)   # the game loop drains once per frame; far more often here
+        received += len(inbox.drain())
+    elapsed = time.perf_counter() - start
+    a.close()
+    b.close()
+    return messages / elapsed, len(data) / elapsed
+
+if __name__ == "__main__":
+    import argparse
+    from ..multiplayer.protocol import CODEC
+    from ..multiplayer.snapshots import SnapshotEncoder
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per framing case (the best one counts)")
+    args = parser.parse_args()
+
+    class _Pipe:
+        def __init__(self, x, top, bottom):
+            self.x, self.top, self.bottom = x, top, bottom
+    snap = SnapshotEncoder().snapshot(1, [(300, 412.5, 15, True, 3, -2.5), (200, 380.25, -20, True, 2, 4.0)],
+                                      [_Pipe(612, -412, 528), _Pipe(312, -301, 639)], 5)
+    runs = [("JSON lines, copying reader", None, True, None),
+            ("JSON lines", None, False, None),
+            ("binary state frames", CODEC, False, None),
+            ("binary snap frames", CODEC, False, snap)]
+    for label, codec, copying, sample in runs:
+        rate, throughput = bench_reader(args.messages, codec, copying, sample)
+        print(f"{label:28s} {rate:10,.0f} msg/s  {throughput / 1e6:6.1f} MB/s")
 
-    t = threading.Thread(target=_run, daemon=True)
-    t.start()
-    return t
\ No newline at end of file
+    # The copying reader's cost grows with the bytes one recv returns; the reader
+    # above gets 4 KB at a time from the socket, so this feeds a burst directly
+    print("\nFraming only, 200-byte lines:   copying      RecvBuffer")
+    for chunk in (4096, 1 << 16, 1 << 20):
+        copying, recv_buffer = (max(r) for r in zip(*[bench_framing(chunk=chunk) for _ in range(args.repeat)]))
+        print(f"  {chunk // 1024:5d} KB per recv        {copying:10,.0f}  {recv_buffer:10,.0f} msg/s")
@@ -0,0 +1,66 @@
+# policies.py
+#
+# Non-NEAT policies. They are pickled to data/*.pkl like the NEAT winners and
+# expose the same activate(inputs) -> [output] call as neat's FeedForwardNetwork,
+# so the game loops can use them unchanged (output > 0.5 means flap).
+import pickle
+
+import numpy as np
+import neat
+
+class QTablePolicy:
+    """Greedy policy of a tabular Q-learner over the three eval_genome inputs."""
+
+    def __init__(self, edges, actions):
+        self.edges = [np.asarray(e, dtype=np.float64) for e in edges]
+        self.actions = np.asarray(actions, dtype=np.uint8)
+
+    def state(self, inputs):
+        return tuple(int(np.searchsorted(e, v, side="right")) for e, v in zip(self.edges, inputs))
+
+    def activate(self, inputs):
+        return [float(self.actions[self.state(inputs)])]
+
+class MLPPolicy:
+    """
+    Fixed-topology 3-H-1 tanh network (trained by train_es). Inputs are divided
+    by in_scale so the raw pixel distances of eval_genome stay out of saturation.
+    """
+
+    def __init__(self, theta, hidden, in_scale=1000.0):
+        self.hidden = hidden
+        self.in_scale = in_scale
+        self.theta = np.asarray(theta, dtype=np.float64)
+
+    @staticmethod
+    def size(hidden, inputs=3):
+        return inputs * hidden + hidden + hidden + 1
+
+    def activate(self, inputs):
+        x = np.asarray(inputs, dtype=np.float64)[None, :]
+        return [float(mlp_forward(self.theta[None, :], self.hidden, x / self.in_scale)[0])]
+
+def mlp_forward(thetas, hidden, x):
+    """
+    Batched forward pass: row i of x (n, inputs) goes through the network of
+    row i of thetas (n, size). Returns the n outputs.
+    """
+    n, inputs = x.shape
+    w1_end = inputs * hidden
+    w1 = thetas[:, :w1_end].reshape(n, inputs, hidden)
+    b1 = thetas[:, w1_end:w1_end + hidden]
+    w2 = thetas[:, w1_end + hidden:w1_end + 2 * hidden]
+    b2 = thetas[:, -1]
+    h = np.tanh(np.einsum("ni,nih->nh", x, w1) + b1)
+    return np.tanh((h * w2).sum(axis=1) + b2)
+
+def load_policy(path, config):
+    """
+    Load data/*.pkl: a NEAT genome (built with `config`) or any pickled
+    policy that already has activate().
+    """
+    with open(path, "rb") as f:
+        obj = pickle.load(f)
+    if hasattr(obj, "activate"):
+        return obj
+    return neat.nn.FeedForwardNetwork.create(obj, config)
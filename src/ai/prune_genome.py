@@ -0,0 +1,156 @@
+# prune_genome.py
+#
+# Post-training simplification of a NEAT winner. Removes what never reaches
+# the output (disabled links, dead-end or unreachable hidden nodes), then tries
+# to drop small-weight connections one by one, keeping a removal only if the
+# network still makes the same flap decision on every state recorded from the
+# original bird. The slim genome is written next to the original:
+#
+#   python -m src.ai.prune_genome data/winner_EASY.pkl --config configs/config-feedforwardEasy.txt
+#   -> data/winner_EASY.slim.pkl
+#
+import os
+import copy
+import time
+import pickle
+import argparse
+
+import numpy as np
+import neat
+from neat.graphs import feed_forward_layers
+
+from .vec_env import VecFlappyEnv
+from .course_bank import PRESETS
+
+# -------------------------
+# Structure
+# -------------------------
+
+def live_structure(genome, config):
+    """
+    (nodes, connections) FeedForwardNetwork.create actually evaluates: enabled
+    links into nodes that are both reachable from the inputs and needed by an
+    output. Output nodes are always kept.
+    """
+    gc = config.genome_config
+    enabled = [k for k, c in genome.connections.items() if c.enabled]
+    evaluated = set().union(*feed_forward_layers(gc.input_keys, gc.output_keys, enabled))
+    nodes = evaluated | set(gc.output_keys)
+    conns = [(a, b) for a, b in enabled if b in evaluated]
+    return nodes, conns
+
+def strip(genome, config):
+    """Copy of genome without the genes live_structure leaves out (same outputs)."""
+    nodes, conns = live_structure(genome, config)
+    slim = copy.deepcopy(genome)
+    slim.nodes = {k: slim.nodes[k] for k in genome.nodes if k in nodes}
+    slim.connections = {k: slim.connections[k] for k in genome.connections if k in conns}
+    return slim
+
+# -------------------------
+# Behaviour
+# -------------------------
+
+def record_states(genome, config, preset="mvm", episodes=8, seed=0):
+    """Network inputs seen by the original bird over `episodes` runs."""
+    net = neat.nn.FeedForwardNetwork.create(genome, config)
+    env = VecFlappyEnv(episodes, preset=preset, seed=seed, auto_reset=False)
+    obs = env.reset()
+    states = []
+    while env.alive.any():
+        live = obs[env.alive]
+        states.append(live)
+        flap = np.zeros(episodes, dtype=bool)
+        flap[env.alive] = [net.activate(o)[0] > 0.5 for o in live]
+        obs, _, _, _ = env.step(flap)
+    return np.concatenate(states)
+
+def outputs(genome, config, states):
+    net = neat.nn.FeedForwardNetwork.create(genome, config)
+    return np.array([net.activate(s)[0] for s in states])
+
+def activate_time(genome, config, states, repeat=3):
+    """Mean seconds per activate() call over the recorded states."""
+    net = neat.nn.FeedForwardNetwork.create(genome, config)
+    rows = [tuple(s) for s in states]
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for s in rows:
+            net.activate(s)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(rows)
+
+# -------------------------
+# Pruning
+# -------------------------
+
+def prune(genome, config, states, max_weight=0.5):
+    """
+    Slim copy of genome. Connections with |weight| <= max_weight are removed
+    smallest first while every recorded state keeps its flap decision.
+    Returns (slim genome, largest output change on the recorded states).
+    """
+    reference = outputs(genome, config, states)
+    decisions = reference > 0.5
+    slim = strip(genome, config)
+
+    candidates = sorted((k for k, c in slim.connections.items() if abs(c.weight) <= max_weight),
+                        key=lambda k: abs(slim.connections[k].weight))
+    for key in candidates:
+        if key not in slim.connections:
+            continue
+        trial = copy.deepcopy(slim)
+        del trial.connections[key]
+        trial = strip(trial, config)
+        if np.array_equal(outputs(trial, config, states) > 0.5, decisions):
+            slim = trial
+
+    drift = float(np.abs(outputs(slim, config, states) - reference).max()) if len(states) else 0.0
+    return slim, drift
+
+def slim_path(path):
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.slim{ext or '.pkl'}"
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("genome", help="Winner pickle (e.g., data/winner_EASY.pkl)")
+    parser.add_argument("--config", required=True, help="NEAT config the genome was trained with")
+    parser.add_argument("--out", help="Slim genome filename (default: <genome>.slim.pkl)")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="mvm", help="Course layout to record states on")
+    parser.add_argument("--episodes", type=int, default=8, help="Recorded runs of the original bird")
+    parser.add_argument("--max-weight", type=float, default=0.5, help="Only try removing links up to this |weight|")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = neat.config.Config(
+        neat.DefaultGenome, neat.DefaultReproduction,
+        neat.DefaultSpeciesSet, neat.DefaultStagnation,
+        args.config
+    )
+    with open(args.genome, "rb") as f:
+        genome = pickle.load(f)
+
+    states = record_states(genome, config, args.preset, args.episodes, args.seed)
+    print(f"[PRUNE] Recorded {len(states)} states from {args.episodes} runs ({args.preset})")
+
+    slim, drift = prune(genome, config, states, args.max_weight)
+    out = args.out or slim_path(args.genome)
+    with open(out, "wb") as f:
+        pickle.dump(slim, f)
+
+    # Equivalence is re-checked from the written file
+    with open(out, "rb") as f:
+        same = np.array_equal(outputs(pickle.load(f), config, states) > 0.5,
+                              outputs(genome, config, states) > 0.5)
+    print(f"[PRUNE] nodes {len(genome.nodes)} -> {len(slim.nodes)}  "
+          f"connections {len(genome.connections)} -> {len(slim.connections)}")
+    print(f"[PRUNE] size {os.path.getsize(args.genome)} -> {os.path.getsize(out)} bytes  "
+          f"activate {activate_time(genome, config, states) * 1e6:.2f} -> "
+          f"{activate_time(slim, config, states) * 1e6:.2f} us")
+    print(f"[PRUNE] Same decisions on all recorded states: {same} (max output change {drift:.4f})")
+    print("[PRUNE] Saved:", out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# snapshot_ring.py
+#
+# Fixed-size ring of world snapshots in shared memory, written by the training
+# worker and read by the pygame UI. One writer, any number of readers, no
+# locks: every slot carries a sequence number that is odd while the slot is
+# being written (seqlock), so a reader that raced the writer just retries.
+# The header also carries the reader -> writer control flags (pause, stop).
+import os
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+
+HEAD_BYTES = 64   # write counter + control flags, padded to keep the slots aligned
+PAUSED, STOP = 0, 1
+
+def snapshot_dtype(max_birds, max_pipes):
+    return np.dtype([
+        ("seq", "<u8"),
+        ("frame", "<u8"),
+        ("gen", "<u4"),
+        ("score", "<u4"),
+        ("level", "<u4"),
+        ("alive", "<u4"),
+        ("n_pipes", "<u4"),
+        ("best_fitness", "<f4"),     # of the previous generation
+        ("mean_fitness", "<f4"),
+        ("birds", "<f4", (max_birds, 3)),   # y, tilt, wing frame
+        ("pipes", "<f4", (max_pipes, 3)),   # x, height, gap
+    ])
+
+class SnapshotRing:
+    """
+    SnapshotRing(max_birds, max_pipes, slots) creates the shared block;
+    SnapshotRing(..., name=ring.name) attaches to it from another process.
+    """
+
+    def __init__(self, max_birds, max_pipes=8, slots=8, name=None):
+        self.max_birds = max_birds
+        self.max_pipes = max_pipes
+        self.slots = slots
+        self.dtype = snapshot_dtype(max_birds, max_pipes)
+        size = HEAD_BYTES + self.dtype.itemsize * slots
+        self.owner = name is None
+        self.closed = False
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        if not self.owner and os.name == "posix":
+            # Only the creator may unlink the block; an attaching process would
+            # otherwise have its resource tracker remove it on exit
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+        self.head = np.ndarray((1,), dtype="<u8", buffer=self.shm.buf)
+        self.flags = np.ndarray((2,), dtype="u1", buffer=self.shm.buf, offset=8)
+        self.ring = np.ndarray((slots,), dtype=self.dtype, buffer=self.shm.buf, offset=HEAD_BYTES)
+        if self.owner:
+            self.head[0] = 0
+            self.flags[:] = 0
+            self.ring["seq"] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    # -------------------------
+    # Control flags
+    # -------------------------
+
+    def set_flag(self, flag, on=True):
+        self.flags[flag] = 1 if on else 0
+
+    def flag(self, flag):
+        return bool(self.flags[flag])
+
+    # -------------------------
+    # Writer
+    # -------------------------
+
+    def publish(self, birds, pipes, **fields):
+        """
+        Write the next snapshot. birds: (n, 3) array of y / tilt / wing frame,
+        pipes: (m, 3) array of x / height / gap; fields: the scalar columns.
+        """
+        count = int(self.head[0])
+        slot = self.ring[count % self.slots:count % self.slots + 1]
+        slot["seq"] = 2 * count + 1
+        n = min(len(birds), self.max_birds)
+        m = min(len(pipes), self.max_pipes)
+        slot["birds"][0, :n] = birds[:n]
+        slot["pipes"][0, :m] = pipes[:m]
+        slot["alive"] = n
+        slot["n_pipes"] = m
+        for key, value in fields.items():
+            slot[key] = value
+        slot["seq"] = 2 * count + 2
+        self.head[0] = count + 1
+
+    # -------------------------
+    # Reader
+    # -------------------------
+
+    def latest(self, retries=4):
+        """Copy of the newest complete snapshot (a numpy record), or None."""
+        for _ in range(retries):
+            count = int(self.head[0])
+            if count == 0:
+                return None
+            i = (count - 1) % self.slots
+            slot = self.ring[i:i + 1]
+            seq = int(slot["seq"][0])
+            snap = slot.copy()[0]
+            if seq == 2 * count and int(slot["seq"][0]) == seq:
+                return snap
+        return None
+
+    def close(self):
+        """Unmap the block (and unlink it if this process created it); safe to call twice."""
+        if self.closed:
+            return
+        self.closed = True
+        # The views export the mapping: drop them first, and don't leave them
+        # pointing at unmapped memory
+        self.head = self.flags = self.ring = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
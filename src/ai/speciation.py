@@ -0,0 +1,216 @@
+# speciation.py
+#
+# Drop-in replacement for neat.DefaultSpeciesSet that stays cheap for large
+# populations. Same speciation rule and same distances as
+# DefaultGenome.distance, but:
+#   * every genome is encoded once into sparse (key, value) arrays,
+#   * distances from one representative to the whole population are computed
+#     in one NumPy pass, touching only the genomes that share its genes,
+#   * pairwise distances are cached across generations (keyed by genome key;
+#     NEAT never mutates a genome after it is created, elites keep their key).
+#
+#   config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
+#                               CachedSpeciesSet, neat.DefaultStagnation, path)
+#
+# neat.config.Config reads the species-set section named after the class, so
+# a config needs a [CachedSpeciesSet] section (same keys as [DefaultSpeciesSet],
+# which stays for the scripts that load the plain class).
+import numpy as np
+from neat.species import DefaultSpeciesSet, Species
+
+class _Encoded:
+    """Sparse arrays of one genome: node/connection keys and their attributes."""
+
+    def __init__(self, genome, labels):
+        self.genome = genome
+        self.node_keys = list(genome.nodes)
+        self.nodes = np.array([(n.bias, n.response, labels(n.activation), labels(n.aggregation))
+                               for n in genome.nodes.values()], dtype=np.float64).reshape(-1, 4)
+        self.conn_keys = list(genome.connections)
+        self.conns = np.array([(c.weight, float(c.enabled)) for c in genome.connections.values()],
+                              dtype=np.float64).reshape(-1, 2)
+
+class _SparseGenes:
+    """
+    One gene kind (nodes or connections) of many genomes, stored by gene key
+    (column-compressed): the genomes carrying a given gene are one slice.
+    """
+
+    def __init__(self, encoded, keys_attr, vals_attr, numeric):
+        self.numeric = numeric     # leading value columns compared by |a - b|, the rest by !=
+        columns = {}
+        row_cols = []
+        for e in encoded:
+            row_cols.append(np.array([columns.setdefault(k, len(columns)) for k in getattr(e, keys_attr)],
+                                     dtype=np.int64))
+        self.row_cols = row_cols
+        self.row_vals = [getattr(e, vals_attr) for e in encoded]
+        self.counts = np.array([len(c) for c in row_cols], dtype=np.int64)
+
+        cols = np.concatenate(row_cols) if row_cols else np.zeros(0, dtype=np.int64)
+        rows = np.repeat(np.arange(len(encoded)), self.counts)
+        vals = np.concatenate(self.row_vals) if row_cols else np.zeros((0, numeric))
+        order = np.argsort(cols, kind="stable")
+        self.rows = rows[order]
+        self.vals = vals[order]
+        self.ptr = np.searchsorted(cols[order], np.arange(len(columns) + 1))
+
+    def component(self, r, dc, wc):
+        """(homologous distance + dc * disjoint) / max gene count, from row r to every row."""
+        cols = self.row_cols[r]
+        starts, ends = self.ptr[cols], self.ptr[cols + 1]
+        idx = np.concatenate([np.arange(a, b) for a, b in zip(starts.tolist(), ends.tolist())] or
+                             [np.zeros(0, dtype=np.int64)])
+        ref = np.repeat(self.row_vals[r], ends - starts, axis=0)
+        vals = self.vals[idx]
+        n = self.numeric
+        diff = np.abs(vals[:, :n] - ref[:, :n]).sum(axis=1) + (vals[:, n:] != ref[:, n:]).sum(axis=1)
+
+        size = len(self.counts)
+        homologous = np.bincount(self.rows[idx], diff, minlength=size) * wc
+        shared = np.bincount(self.rows[idx], minlength=size)
+        disjoint = self.counts + self.counts[r] - 2 * shared
+        largest = np.maximum(self.counts, self.counts[r])
+        return np.where(largest > 0, (homologous + dc * disjoint) / np.maximum(largest, 1), 0.0)
+
+class _DistanceMatrix:
+    """The genomes of one speciate() call, for one-to-many distance queries."""
+
+    def __init__(self, encoded, genome_config):
+        self.row = {e.genome.key: i for i, e in enumerate(encoded)}
+        self.wc = genome_config.compatibility_weight_coefficient
+        self.dc = genome_config.compatibility_disjoint_coefficient
+        self.nodes = _SparseGenes(encoded, "node_keys", "nodes", numeric=2)
+        self.conns = _SparseGenes(encoded, "conn_keys", "conns", numeric=1)
+
+    def rows(self, keys):
+        return np.array([self.row[k] for k in keys.tolist()], dtype=np.int64)
+
+    def distances(self, r, rows):
+        """Distances from row r to each of rows (DefaultGenome.distance, vectorized)."""
+        d = self.nodes.component(r, self.dc, self.wc) + self.conns.component(r, self.dc, self.wc)
+        return d[rows]
+
+class CachedSpeciesSet(DefaultSpeciesSet):
+    """DefaultSpeciesSet with vectorized, cached genome distances."""
+
+    def __init__(self, config, reporters):
+        super().__init__(config, reporters)
+        self._encoded = {}     # genome key -> _Encoded
+        self._cache = {}       # representative key -> (sorted genome keys, distances)
+        self._labels = {}      # activation / aggregation name -> number
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        # Checkpoints only need the species; caches are rebuilt on demand
+        state = dict(self.__dict__)
+        state["_encoded"] = {}
+        state["_cache"] = {}
+        return state
+
+    def _label(self, name):
+        return self._labels.setdefault(name, len(self._labels))
+
+    def _encode(self, genome):
+        enc = self._encoded.get(genome.key)
+        if enc is None or enc.genome is not genome:
+            enc = _Encoded(genome, self._label)
+            self._encoded[genome.key] = enc
+        return enc
+
+    def _distances(self, matrix, rep_key, keys):
+        """Distances rep -> keys (int array), reusing the ones cached for rep."""
+        out = np.empty(len(keys))
+        missing = np.ones(len(keys), dtype=bool)
+        cached = self._cache.get(rep_key)
+        if cached is not None and len(cached[0]):
+            known, dist = cached
+            pos = np.minimum(np.searchsorted(known, keys), len(known) - 1)
+            missing = known[pos] != keys
+            out[~missing] = dist[pos[~missing]]
+        n_missing = int(missing.sum())
+        self.hits += len(keys) - n_missing
+        self.misses += n_missing
+        if n_missing:
+            out[missing] = matrix.distances(matrix.row[rep_key], matrix.rows(keys[missing]))
+        if len(keys):
+            order = np.argsort(keys)
+            self._cache[rep_key] = (keys[order], out[order])
+        return out
+
+    def speciate(self, config, population, generation):
+        """Same partition rule as DefaultSpeciesSet.speciate."""
+        assert isinstance(population, dict)
+        threshold = self.species_set_config.compatibility_threshold
+
+        old_reps = [s.representative for s in self.species.values()]
+        genomes = list(population.values()) + [g for g in old_reps if g.key not in population]
+        matrix = _DistanceMatrix([self._encode(g) for g in genomes], config.genome_config)
+        used = []
+
+        # Find the best representatives for each existing species
+        unspeciated = np.fromiter(population, dtype=np.int64, count=len(population))
+        new_representatives = {}
+        new_members = {}
+        for sid, s in self.species.items():
+            d = self._distances(matrix, s.representative.key, unspeciated)
+            used.append(d)
+            best = int(d.argmin())
+            new_representatives[sid] = int(unspeciated[best])
+            new_members[sid] = [int(unspeciated[best])]
+            unspeciated = np.delete(unspeciated, best)
+
+        # Partition the rest. Genomes are visited in order and join the closest
+        # representative under the threshold; the first one that has none founds
+        # a new species. Everything before it is assigned in one vectorized step.
+        sids = list(new_representatives)
+        columns = [self._distances(matrix, new_representatives[sid], unspeciated) for sid in sids]
+        used.extend(columns)
+        start = 0
+        while start < len(unspeciated):
+            rest = unspeciated[start:]
+            if columns:
+                d = np.stack([c[start:] for c in columns])
+                nearest = d.argmin(axis=0)
+                ok = d[nearest, np.arange(len(rest))] < threshold
+            else:
+                nearest = np.zeros(len(rest), dtype=np.int64)
+                ok = np.zeros(len(rest), dtype=bool)
+            stop = len(rest) if ok.all() else int(np.argmin(ok))
+            for gid, k in zip(rest[:stop].tolist(), nearest[:stop].tolist()):
+                new_members[sids[k]].append(gid)
+            if stop == len(rest):
+                break
+            # No species is similar enough: this genome founds a new one
+            gid = int(rest[stop])
+            sid = next(self.indexer)
+            new_representatives[sid] = gid
+            new_members[sid] = [gid]
+            sids.append(sid)
+            column = self._distances(matrix, gid, unspeciated)
+            used.append(column[start + stop + 1:])
+            columns.append(column)
+            start += stop + 1
+
+        # Update species collection based on new speciation
+        self.genome_to_species = {}
+        for sid, rid in new_representatives.items():
+            s = self.species.get(sid)
+            if s is None:
+                s = Species(sid, generation)
+                self.species[sid] = s
+            members = new_members[sid]
+            for gid in members:
+                self.genome_to_species[gid] = sid
+            s.update(population[rid], {gid: population[gid] for gid in members})
+
+        # Only the new representatives are compared against the next generation
+        self._encoded = {k: e for k, e in self._encoded.items() if k in population}
+        self._cache = {k: self._cache[k] for k in new_representatives.values() if k in self._cache}
+
+        distances = np.concatenate(used) if used else np.zeros(1)
+        self.reporters.info(
+            'Mean genetic distance {0:.3f}, standard deviation {1:.3f} '
+            '(distance cache {2} hits / {3} misses)'.format(
+                distances.mean(), distances.std(), self.hits, self.misses))
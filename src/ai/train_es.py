@@ -0,0 +1,197 @@
+# train_es.py
+#
+# Evolution strategies for a fixed 3-H-1 network (no speciation, no topology
+# mutation). Every generation perturbs one weight vector with antithetic
+# Gaussian noise, flies the whole population in ONE vectorized rollout on the
+# headless world (vec_env) and moves the weights along the rank-weighted noise.
+# The saved MLPPolicy loads like a winner_*.pkl (see policies.load_policy).
+#
+#   python -m src.ai.train_es --out data/winner_EASY.pkl
+#   python -m src.ai.train_es --out data/winner_EASY.pkl --compare configs/config-feedforwardEasy.txt
+#
+# --compare also runs train_offline's NEAT loop on the same core and prints the
+# wall-clock time each trainer needs until its best network passes --target pipes.
+import os
+import time
+import pickle
+import argparse
+
+import numpy as np
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame  # noqa: E402
+import neat    # noqa: E402
+
+from .vec_env import VecFlappyEnv, MAX_FRAMES_PER_RUN  # noqa: E402
+from .course_bank import CourseBank, PRESETS  # noqa: E402
+from .policies import MLPPolicy, mlp_forward  # noqa: E402
+from .speciation import CachedSpeciesSet  # noqa: E402
+from . import train_offline  # noqa: E402
+
+HIDDEN = 8
+IN_SCALE = 1000.0   # WIN_HEIGHT: keeps the inputs around [0, 1]
+
+# -------------------------
+# Rollouts
+# -------------------------
+
+def rollout(thetas, hidden, preset="offline", bank=None, seed=0, max_frames=MAX_FRAMES_PER_RUN):
+    """
+    Fly one bird per weight vector on a shared course. Returns the eval_genome
+    fitness (+1 per frame, +50 per pipe) and the pipes passed of every bird.
+    """
+    n = len(thetas)
+    env = VecFlappyEnv(n, preset=preset, bank=bank, seed=seed, auto_reset=False,
+                       max_frames=max_frames, shared=True)
+    obs = env.reset()
+    fitness = np.zeros(n)
+    while env.alive.any():
+        flap = mlp_forward(thetas, hidden, obs / IN_SCALE) > 0.5
+        obs, reward, _, _ = env.step(flap)
+        fitness += reward
+    return fitness, env.score.copy()
+
+def reaches(act, target, preset="offline", episodes=4, seed=12345):
+    """
+    True if act(obs) -> flap flags passes `target` pipes on each of `episodes`
+    independent random courses (no frame limit). Both trainers are checked
+    with this, on the same courses.
+    """
+    env = VecFlappyEnv(episodes, preset=preset, seed=seed, auto_reset=False, max_frames=np.inf)
+    obs = env.reset()
+    while env.alive.any() and not (env.score[env.alive] >= target).all():
+        obs, _, _, _ = env.step(act(obs))
+        if (~env.alive & (env.score < target)).any():
+            return False
+    return bool((env.score >= target).all())
+
+def centered_ranks(x):
+    """Fitness shaping of OpenAI-ES: ranks mapped to [-0.5, 0.5]."""
+    ranks = np.empty(len(x))
+    ranks[np.argsort(x)] = np.arange(len(x))
+    return ranks / (len(x) - 1) - 0.5
+
+# -------------------------
+# ES
+# -------------------------
+
+def train(generations=300, pop=64, hidden=HIDDEN, sigma=0.1, lr=0.05, weight_decay=0.005,
+          preset="offline", bank=None, seed=0, target=100, log=print):
+    """
+    Returns (policy, seconds until `target` was reached or None). Adam on the
+    ES gradient; antithetic pairs, so pop must be even.
+    """
+    rng = np.random.default_rng(seed)
+    size = MLPPolicy.size(hidden)
+    theta = rng.normal(0.0, 0.5, size)
+    m = np.zeros(size)
+    v = np.zeros(size)
+    t0 = time.time()
+
+    for gen in range(1, generations + 1):
+        half = rng.normal(0.0, 1.0, (pop // 2, size))
+        noise = np.concatenate([half, -half])
+        fitness, scores = rollout(theta + sigma * noise, hidden, preset, bank, seed=seed + gen)
+
+        grad = noise.T @ centered_ranks(fitness) / (pop * sigma) - weight_decay * theta
+        m = 0.9 * m + 0.1 * grad
+        v = 0.999 * v + 0.001 * grad ** 2
+        step = lr * (m / (1 - 0.9 ** gen)) / (np.sqrt(v / (1 - 0.999 ** gen)) + 1e-8)
+
+        top = theta + sigma * noise[fitness.argmax()]
+        theta = theta + step
+        log(f"[ES] gen {gen:>4}  best {scores.max():>3} pipes  mean fitness {fitness.mean():8.1f}  "
+            f"{time.time() - t0:.1f}s")
+
+        # Only run the (long) target check once somebody survived the frame limit
+        if fitness.max() >= MAX_FRAMES_PER_RUN:
+            for candidate in (theta, top):
+                def act(obs, c=candidate):
+                    return mlp_forward(np.broadcast_to(c, (len(obs), size)), hidden, obs / IN_SCALE) > 0.5
+                if reaches(act, target, preset):
+                    elapsed = time.time() - t0
+                    log(f"[ES] Score {target} reached at generation {gen} ({elapsed:.1f}s)")
+                    return MLPPolicy(candidate, hidden, IN_SCALE), elapsed
+
+    # Target not reached: the trained weights, not an earlier lucky sample
+    return MLPPolicy(theta, hidden, IN_SCALE), None
+
+# -------------------------
+# NEAT baseline (train_offline)
+# -------------------------
+
+class _TargetReached(Exception):
+    pass
+
+class _TargetReporter(neat.reporting.BaseReporter):
+    """Stops Population.run once the best genome passes the shared target check."""
+
+    def __init__(self, config, target, budget):
+        self.config = config
+        self.target = target
+        self.budget = budget
+        self.t0 = time.time()
+
+    def post_evaluate(self, config, population, species, best_genome):
+        if time.time() - self.t0 > self.budget:
+            raise _TargetReached(None)
+        if best_genome.fitness < MAX_FRAMES_PER_RUN:
+            return
+        net = neat.nn.FeedForwardNetwork.create(best_genome, self.config)
+        if reaches(lambda obs: np.array([net.activate(o)[0] > 0.5 for o in obs]), self.target):
+            raise _TargetReached(time.time() - self.t0)
+
+def neat_time_to_score(config_path, target=100, budget=1800.0, log=print):
+    """Seconds train_offline's NEAT loop needs to reach `target` (None if over budget)."""
+    config = neat.config.Config(
+        neat.DefaultGenome, neat.DefaultReproduction,
+        CachedSpeciesSet, neat.DefaultStagnation,
+        config_path
+    )
+    p = neat.Population(config)
+    p.add_reporter(_TargetReporter(config, target, budget))
+    log(f"[ES] NEAT baseline: {os.path.basename(config_path)}, budget {budget:.0f}s")
+    try:
+        p.run(train_offline.eval_genomes, None)
+    except _TargetReached as done:
+        return done.args[0]
+    return None
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", required=True, help="Output policy filename (e.g., winner_EASY.pkl)")
+    parser.add_argument("--generations", type=int, default=300, help="Maximum ES generations")
+    parser.add_argument("--pop", type=int, default=64, help="Perturbations per generation (even)")
+    parser.add_argument("--hidden", type=int, default=HIDDEN, help="Hidden units of the fixed network")
+    parser.add_argument("--sigma", type=float, default=0.1, help="Noise standard deviation")
+    parser.add_argument("--lr", type=float, default=0.05, help="Adam step size")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="offline", help="Course layout to train on")
+    parser.add_argument("--bank", help="Optional course bank to draw courses from")
+    parser.add_argument("--target", type=int, default=100, help="Stop once the network passes this many pipes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", metavar="CONFIG", help="Also time train_offline's NEAT with this config")
+    parser.add_argument("--neat-budget", type=float, default=1800.0, help="Seconds before giving up on NEAT")
+    args = parser.parse_args()
+
+    pygame.init()
+    bank = CourseBank(args.bank) if args.bank else None
+    print(f"[ES] pop={args.pop}  hidden={args.hidden}  preset={args.preset}  target={args.target}")
+    policy, es_time = train(args.generations, args.pop, args.hidden, args.sigma, args.lr,
+                            preset=args.preset, bank=bank, seed=args.seed, target=args.target)
+
+    with open(args.out, "wb") as f:
+        pickle.dump(policy, f)
+    print("[ES] Saved:", args.out)
+
+    if args.compare:
+        neat_time = neat_time_to_score(args.compare, args.target, args.neat_budget)
+
+        def fmt(t):
+            return f"{t:.1f}s" if t is not None else "not reached"
+        print(f"[ES] Time to score {args.target} on one core: ES {fmt(es_time)}  |  "
+              f"NEAT (train_offline) {fmt(neat_time)}")
+        if es_time is not None and neat_time is not None:
+            print(f"[ES] ES was {neat_time / es_time:.1f}x faster")
+
+if __name__ == "__main__":
+    main()
@@ -12,20 +12,27 @@ import neat    # noqa: E402
 # Use your existing physics – no rendering done here
 from ..core.bird import Bird
 from ..core.pipe import Pipe
+from .course_bank import CourseBank
+from .speciation import CachedSpeciesSet
 
 WIN_WIDTH = 1000
 WIN_HEIGHT = 1000
 FPS = 240               # fast sim
 MAX_FRAMES_PER_RUN = 60 * 120  # ~120s at 60fps-equivalent per genome (safety stop)
 
-def eval_genome(genome, config):
+# Optional pre-generated course bank (set by --bank)
+BANK = None
+
+def eval_genome(genome, config, course=None):
     """
     Evaluate a single genome. Fitness:
       +1 per frame survived, +50 per pipe passed.
+    If a course from the bank is given, pipes replay it instead of random heights.
     """
     net = neat.nn.FeedForwardNetwork.create(genome, config)
     bird = Bird(280, 250, "ai")
-    pipes = [Pipe(WIN_WIDTH + 20)]
+    new_pipe = course.next_pipe if course else Pipe
+    pipes = [new_pipe(WIN_WIDTH + 20)]
     passed = set()
     frames = 0
 
@@ -50,7 +57,7 @@ def eval_genome(genome, config):
                 passed.discard(p)
 
         if add_pipe:
-            pipes.append(Pipe(WIN_WIDTH + 20))
+            pipes.append(new_pipe(WIN_WIDTH + 20))
             genome.fitness += 50.0
 
         for r in rem:
@@ -80,22 +87,30 @@ def eval_genome(genome, config):
             return genome.fitness
 
 def eval_genomes(genomes, config):
+    # Every genome of a generation flies the same feasible course
+    course_index = BANK.sample_index() if BANK else None
     for _, g in genomes:
         g.fitness = 0.0
-        eval_genome(g, config)
+        eval_genome(g, config, BANK.course(course_index) if BANK else None)
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--config", required=True, help="Path to NEAT config (e.g., config-feedforwardEasy.txt)")
     parser.add_argument("--generations", type=int, default=60, help="Number of generations to run")
     parser.add_argument("--out", required=True, help="Output winner filename (e.g., winner_EASY.pkl)")
+    parser.add_argument("--bank", help="Course bank from course_bank.py (preset 'offline') to draw courses from")
     args = parser.parse_args()
 
     pygame.init()
 
+    global BANK
+    if args.bank:
+        BANK = CourseBank(args.bank)
+        print(f"[TRAIN] Course bank: {len(BANK)} courses from {args.bank}")
+
     config = neat.config.Config(
         neat.DefaultGenome, neat.DefaultReproduction,
-        neat.DefaultSpeciesSet, neat.DefaultStagnation,
+        CachedSpeciesSet, neat.DefaultStagnation,
         args.config
     )
 
@@ -0,0 +1,141 @@
+# train_qlearning.py
+#
+# Tabular Q-learning trainer: a cheap alternative to NEAT that converges in
+# seconds on one core. Learns over the same three inputs eval_genome feeds the
+# network, on many headless birds stepped together (vec_env), and saves a
+# QTablePolicy that loads like a winner_*.pkl.
+#
+#   python -m src.ai.train_qlearning --out data/winner_EASY.pkl --preset mvm
+#
+import time
+import pickle
+import argparse
+
+import numpy as np
+
+from .vec_env import VecFlappyEnv
+from .course_bank import CourseBank, PRESETS
+from .policies import QTablePolicy
+
+# Discretization of (bird.y, |bird.y - pipe.height|, |bird.y - pipe.bottom|).
+# Coarse on purpose: the distances to the gap edges carry the decision, and a
+# small table is visited often enough to settle within a few thousand steps.
+Y_EDGES = np.array([500.0])
+DIST_EDGES = np.linspace(0, 640, 17)[1:-1]
+
+DEATH_PENALTY = -1000.0
+SHAPING = 1.0   # weight of the "stay level with the gap" potential
+
+def potential(obs):
+    """
+    Potential-based shaping (keeps the optimal policy): distance to the far
+    edge of the gap, smallest when the bird is level with the gap's middle.
+    """
+    return -SHAPING * np.maximum(obs[:, 1], obs[:, 2])
+
+def discretize(obs, edges):
+    return tuple(np.searchsorted(e, obs[:, i], side="right") for i, e in enumerate(edges))
+
+def evaluate(policy_actions, edges, preset, bank, episodes, seed):
+    """
+    Greedy rollouts of the current table. Returns the pipes passed per episode
+    and whether each run survived until the MAX_FRAMES_PER_RUN stop.
+    """
+    env = VecFlappyEnv(episodes, preset=preset, bank=bank, seed=seed, auto_reset=False)
+    obs = env.reset()
+    scores = np.zeros(episodes, dtype=np.int64)
+    survived = np.zeros(episodes, dtype=bool)
+    while env.alive.any():
+        flap = policy_actions[discretize(obs, edges)].astype(bool)
+        obs, _, done, score = env.step(flap)
+        scores[done] = score[done]
+        survived[done & ~env.died] = True
+    return scores, survived
+
+def train(steps=100_000, envs=256, alpha=0.01, gamma=0.99, eps_start=0.05, eps_end=0.0,
+          flap_prob=0.1, preset="offline", bank=None, seed=0, target_score=100,
+          eval_every=2_500, eval_episodes=32, log=print):
+    edges = [Y_EDGES, DIST_EDGES, DIST_EDGES]
+    rng = np.random.default_rng(seed)
+    env = VecFlappyEnv(envs, preset=preset, bank=bank, seed=seed)
+    q = np.zeros(tuple(len(e) + 1 for e in edges) + (2,))
+    delta = np.zeros_like(q)
+    visits = np.zeros(q.shape, dtype=np.int64)
+    total = np.zeros(q.shape, dtype=np.int64)
+
+    obs = env.reset()
+    state = discretize(obs, edges)
+    finished = []
+    # Q-learning with a greedy policy oscillates; keep the best table seen
+    best, best_key = q.argmax(axis=-1), (-1, -1.0)
+    t0 = time.time()
+
+    for step in range(1, steps + 1):
+        eps = eps_start + (eps_end - eps_start) * step / steps
+        action = q[state].argmax(axis=1)
+        explore = rng.random(envs) < eps
+        action[explore] = rng.random(explore.sum()) < flap_prob
+
+        before = potential(obs)
+        obs, reward, done, score = env.step(action.astype(bool))
+        reward = reward + np.where(env.died, DEATH_PENALTY, 0.0)
+        # Terminal potential is 0 (obs already belongs to the reset world there)
+        reward += np.where(done, 0.0, gamma * potential(obs)) - before
+        next_state = discretize(obs, edges)
+
+        target = reward + gamma * q[next_state].max(axis=1) * ~done
+        index = state + (action,)
+        # Many birds share a state (they all start alike): average their updates
+        # instead of letting np.add.at stack them
+        delta.fill(0.0)
+        visits.fill(0)
+        np.add.at(delta, index, target - q[index])
+        np.add.at(visits, index, 1)
+        seen = visits > 0
+        total += visits
+        # Step size of a running mean (shrinks as a state gets visited more),
+        # floored at alpha so the table keeps tracking the improving policy
+        rate = np.maximum(alpha, visits[seen] / total[seen])
+        q[seen] += rate * delta[seen] / visits[seen]
+        state = next_state
+        finished.extend(score[done].tolist())
+
+        if step % eval_every == 0:
+            actions = q.argmax(axis=-1).astype(np.uint8)
+            scores, survived = evaluate(actions, edges, preset, bank, eval_episodes, seed + step)
+            recent = np.mean(finished[-200:]) if finished else 0.0
+            log(f"[QL] step {step:>7}  eps {eps:.3f}  train score {recent:6.1f}  "
+                f"greedy min/mean {scores.min()}/{scores.mean():.1f}  {time.time() - t0:.1f}s")
+            key = (int(scores.min()), float(scores.mean()))
+            if key > best_key:
+                best, best_key = actions, key
+            # Done once every greedy run reaches the target (or the frame limit)
+            if (survived | (scores >= target_score)).all():
+                break
+
+    return QTablePolicy(edges, best)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", required=True, help="Output policy filename (e.g., winner_EASY.pkl)")
+    parser.add_argument("--steps", type=int, default=100_000, help="Vectorized steps (each steps every env)")
+    parser.add_argument("--envs", type=int, default=256, help="Birds simulated in parallel")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="offline", help="Course layout to train on")
+    parser.add_argument("--bank", help="Optional course bank to draw courses from")
+    parser.add_argument("--target", type=int, default=100, help="Stop once every greedy eval run passes this many pipes (or survives the frame limit)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    bank = CourseBank(args.bank) if args.bank else None
+    print(f"[QL] envs={args.envs}  steps={args.steps}  preset={args.preset}")
+    t0 = time.time()
+    policy = train(args.steps, args.envs, preset=args.preset, bank=bank, seed=args.seed,
+                   target_score=args.target)
+    print(f"[QL] Done in {time.time() - t0:.1f}s. Saving to {args.out}")
+
+    with open(args.out, "wb") as f:
+        pickle.dump(policy, f)
+    print("[QL] Saved:", args.out)
+
+if __name__ == "__main__":
+    main()
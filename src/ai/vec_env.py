@@ -0,0 +1,254 @@
+# vec_env.py
+#
+# Headless, vectorized copy of the train_offline world: N independent birds,
+# each with its own pipe stream, stepped together with NumPy. Physics and
+# fitness follow eval_genome frame for frame (Bird.move, Pipe.move, mask
+# collision, +1 per frame / +50 per pipe), so policies trained here behave the
+# same in the game loops.
+import os
+
+import numpy as np
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame  # noqa: E402
+
+from ..core.bird import Bird  # noqa: E402
+from ..core.pipe import Pipe  # noqa: E402
+from ..core.assets import PIPE_IMG, BIRD_AI_IMGS  # noqa: E402
+from .course_bank import PRESETS, START_Y  # noqa: E402
+
+WIN_HEIGHT = 1000
+MAX_FRAMES_PER_RUN = 60 * 120   # same safety stop as train_offline
+
+FRAME_REWARD = 1.0
+PIPE_REWARD = 50.0
+
+def _mask_bits(img, size=None):
+    """Mask of a sprite as a 0/1 array, zero-padded at the bottom/right to `size`."""
+    mask = pygame.mask.from_surface(img)
+    mw, mh = mask.get_size()
+    w, h = size or (mw, mh)
+    bits = np.zeros((h, w))
+    drawn = mask.to_surface(setcolor=(255, 255, 255, 255), unsetcolor=(0, 0, 0, 255))
+    bits[:mh, :mw] = pygame.surfarray.array_red(drawn).T > 0
+    return bits
+
+def overlap_table(bird_img, pipe_img, bird_size=None):
+    """
+    hit[dy + pipe_h - 1, dx + pipe_w - 1] is True where
+    bird_mask.overlap(pipe_mask, (dx, dy)) would find a pixel (full 2-D correlation, via FFT).
+    """
+    b = _mask_bits(bird_img, bird_size)
+    p = _mask_bits(pipe_img)[::-1, ::-1]
+    shape = (b.shape[0] + p.shape[0] - 1, b.shape[1] + p.shape[1] - 1)
+    corr = np.fft.irfft2(np.fft.rfft2(b, shape) * np.fft.rfft2(p, shape), shape)
+    return corr > 0.5
+
+_HITS = None
+
+def _hit_tables():
+    """(frame, top/bottom pipe, dy, dx) overlap tables for the AI bird, built once."""
+    global _HITS
+    if _HITS is None:
+        # eval_genome never draws, so jump_frame stays set after the first flap and
+        # get_mask() keeps returning the second frame from then on
+        pipe_top = pygame.transform.flip(PIPE_IMG, False, True)
+        size = (max(img.get_width() for img in BIRD_AI_IMGS), max(img.get_height() for img in BIRD_AI_IMGS))
+        _HITS = np.array([[overlap_table(img, pipe_top, size), overlap_table(img, PIPE_IMG, size)]
+                          for img in BIRD_AI_IMGS[:2]])
+    return _HITS
+
+class VecFlappyEnv:
+    """
+    n birds flying the train_offline course layout (or a course-bank preset).
+
+    step(flap) takes one boolean per bird, applies the flaps and simulates one
+    frame. Observations are the three network inputs of eval_genome:
+    (bird.y, |bird.y - pipe.height|, |bird.y - pipe.bottom|).
+
+    With shared=True every bird flies the same random pipe sequence, or the
+    same bank course (like all genomes of a train_offline generation), so
+    their scores can be compared.
+    """
+
+    def __init__(self, n, preset="offline", bank=None, seed=None, gap=None,
+                 auto_reset=True, max_frames=MAX_FRAMES_PER_RUN, shared=False):
+        self.n = n
+        self.spawn_x, self.bird_x, self.spacing = PRESETS[preset]
+        self.bank = bank
+        self.shared = shared
+        self.rng = np.random.default_rng(seed)
+        self.gap = gap if gap else Pipe.BASIC_GAP
+        self.auto_reset = auto_reset
+        self.max_frames = max_frames
+
+        self.pipe_w = PIPE_IMG.get_width()
+        self.bird_h = BIRD_AI_IMGS[0].get_height()   # bird.img used by the bounds check
+        self.pipe_h = PIPE_IMG.get_height()
+        self.hits = _hit_tables()
+
+        # Enough pipe slots for everything on screen at once
+        self.slots = (self.spawn_x + self.pipe_w) // self.spacing + 2
+
+        self.y = np.zeros(n)
+        self.vel = np.zeros(n)
+        self.jumped = np.zeros(n, dtype=bool)
+        self.frames = np.zeros(n, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.alive = np.zeros(n, dtype=bool)
+        self.died = np.zeros(n, dtype=bool)     # crashed on the last step (not a timeout)
+        self.px = np.zeros((n, self.slots), dtype=np.int64)
+        self.ph = np.zeros((n, self.slots), dtype=np.int64)
+        self.pgap = np.zeros((n, self.slots), dtype=np.int64)
+        self.pon = np.zeros((n, self.slots), dtype=bool)
+        self.ppassed = np.zeros((n, self.slots), dtype=bool)
+        self.course = np.zeros(n, dtype=np.int64)
+        self.course_pos = np.zeros(n, dtype=np.int64)
+        self.shared_heights = np.zeros(0, dtype=np.int64)
+        self.shared_course = int(self.rng.integers(0, len(bank))) if bank is not None and shared else None
+        self.reset()
+
+    # -------------------------
+    # Pipes
+    # -------------------------
+
+    def _next_heights(self, idx):
+        """Height and gap of the next pipe for the birds in idx."""
+        if self.bank is not None:
+            courses = self.bank.courses
+            n_pipes = courses["heights"].shape[1]
+            pos = np.minimum(self.course_pos[idx], n_pipes - 1)
+            heights = courses["heights"][self.course[idx], pos].astype(np.int64)
+            gaps = courses["gaps"][self.course[idx], pos].astype(np.int64)
+            # past the end of the course: random pipes, like Course.next_pipe
+            over = self.course_pos[idx] >= n_pipes
+            if over.any():
+                if self.shared:
+                    heights[over] = self._shared_heights(self.course_pos[idx][over] - n_pipes)
+                else:
+                    heights[over] = self.rng.integers(Pipe.MIN_HEIGHT, Pipe.MAX_HEIGHT, over.sum())
+            self.course_pos[idx] += 1
+            return heights, gaps
+        if self.shared:
+            heights = self._shared_heights(self.course_pos[idx])
+            self.course_pos[idx] += 1
+            return heights, np.full(len(idx), self.gap, dtype=np.int64)
+        heights = self.rng.integers(Pipe.MIN_HEIGHT, Pipe.MAX_HEIGHT, len(idx))
+        return heights, np.full(len(idx), self.gap, dtype=np.int64)
+
+    def _shared_heights(self, pos):
+        """Pipes pos of one random sequence for everybody, extended as the leader needs it."""
+        missing = pos.max() + 1 - len(self.shared_heights)
+        if missing > 0:
+            more = self.rng.integers(Pipe.MIN_HEIGHT, Pipe.MAX_HEIGHT, max(missing, 64))
+            self.shared_heights = np.concatenate([self.shared_heights, more])
+        return self.shared_heights[pos]
+
+    def _spawn(self, idx):
+        if len(idx) == 0:
+            return
+        slot = self.pon[idx].sum(axis=1)
+        heights, gaps = self._next_heights(idx)
+        self.px[idx, slot] = self.spawn_x
+        self.ph[idx, slot] = heights
+        self.pgap[idx, slot] = gaps
+        self.pon[idx, slot] = True
+        self.ppassed[idx, slot] = False
+
+    # -------------------------
+    # Episode control
+    # -------------------------
+
+    def reset(self, idx=None):
+        """Reset the birds in idx (all by default) and return observations."""
+        if idx is None:
+            idx = np.arange(self.n)
+        self.y[idx] = START_Y
+        self.vel[idx] = 0.0
+        self.jumped[idx] = False
+        self.frames[idx] = 0
+        self.score[idx] = 0
+        self.alive[idx] = True
+        self.pon[idx] = False
+        self.ppassed[idx] = False
+        if self.shared_course is not None:
+            self.course[idx] = self.shared_course
+        elif self.bank is not None:
+            self.course[idx] = self.rng.integers(0, len(self.bank), len(idx))
+        self.course_pos[idx] = 0
+        self._spawn(idx)
+        return self.observe()
+
+    def observe(self):
+        rows = np.arange(self.n)
+        ind = (self.pon[:, 1] & (self.bird_x > self.px[:, 0] + self.pipe_w)).astype(np.int64)
+        height = self.ph[rows, ind]
+        bottom = height + self.pgap[rows, ind]
+        return np.stack([self.y, np.abs(self.y - height), np.abs(self.y - bottom)], axis=1)
+
+    def _collide(self):
+        """Pixel-exact Pipe.collide for every bird and pipe slot."""
+        ry = np.round(self.y).astype(np.int64)[:, None]
+        frame = self.jumped.astype(np.int64)[:, None]
+        _, _, rows, cols = self.hits.shape
+        dx = self.px - self.bird_x + self.pipe_w - 1
+        dy_top = (self.ph - self.pipe_h) - ry + self.pipe_h - 1
+        dy_bottom = (self.ph + self.pgap) - ry + self.pipe_h - 1
+
+        def hit(kind, dy):
+            inside = (dx >= 0) & (dx < cols) & (dy >= 0) & (dy < rows) & self.pon
+            return inside & self.hits[frame, kind, np.clip(dy, 0, rows - 1), np.clip(dx, 0, cols - 1)]
+
+        return (hit(0, dy_top) | hit(1, dy_bottom)).any(axis=1)
+
+    def step(self, flap):
+        """
+        Advance one frame. Returns (obs, reward, done, score) where score holds
+        the pipes passed by birds that finished this frame (0 elsewhere).
+        """
+        live = self.alive
+        flap = np.asarray(flap, dtype=bool) & live
+        self.vel[flap] = Bird.JUMP_VEL
+        self.jumped |= flap
+
+        # Bird.move
+        self.vel[live] += Bird.GRAVITY
+        self.y[live] += self.vel[live]
+        self.frames[live] += 1
+
+        # Pipe.move + collisions
+        self.px[live] -= Pipe.VEL
+        hit = self._collide() & live
+
+        # Passing pipes
+        passing = self.pon & ~self.ppassed & (self.px < self.bird_x) & (live & ~hit)[:, None]
+        passed_now = passing.sum(axis=1)
+        self.ppassed |= passing
+        self.score += passed_now
+
+        # New pipe once the newest one has travelled `spacing`
+        newest = self.pon.sum(axis=1) - 1
+        newest_x = self.px[np.arange(self.n), np.maximum(newest, 0)]
+        self._spawn(np.flatnonzero(live & ~hit & (newest_x <= self.spawn_x - self.spacing)))
+
+        # Drop the oldest pipe once it is off-screen
+        gone = self.pon[:, 0] & (self.px[:, 0] + self.pipe_w < 0)
+        if gone.any():
+            for arr in (self.px, self.ph, self.pgap, self.pon, self.ppassed):
+                arr[gone, :-1] = arr[gone, 1:]
+            self.pon[gone, -1] = False
+
+        out = (self.y + self.bird_h - 10 >= WIN_HEIGHT) | (self.y < -50)
+        dead = live & (hit | out)
+        timeout = live & ~dead & (self.frames >= self.max_frames)
+
+        reward = np.where(live & ~hit, PIPE_REWARD * passed_now, 0.0)
+        reward += np.where(live & ~dead, FRAME_REWARD, 0.0)
+
+        self.died = dead
+        done = dead | timeout
+        score = np.where(done, self.score, 0)
+        self.alive &= ~done
+        if self.auto_reset and done.any():
+            self.reset(np.flatnonzero(done))
+        return self.observe(), reward, done, score
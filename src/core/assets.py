@@ -1,42 +1,142 @@
 import pygame
 import os
 
-pygame.init()
-
 # Colors for score display
 SCORE_ORANGE = (255, 140, 100)  # Coral/orange color
 SCORE_OUTLINE = (20, 20, 60)    # Dark blue/navy
 SCORE_FILL = (255, 255, 255)    # White fill
 
-# Background remains unchanged
-BG_IMG = pygame.transform.rotozoom(pygame.image.load(os.path.join(os.path.dirname(__file__), "..", "..", "assets", "bg.png")), 0, 1)
-
-# Scale the pipe image to 50% of its original size
-original_pipe = pygame.image.load(os.path.join(os.path.dirname(__file__), "..", "..", "assets", "pipe.png"))
-PIPE_IMG = pygame.transform.rotozoom(original_pipe, 0, 0.5)
-
-# Scale the bird image to smaller size
-BIRD_IMGS = [
-    pygame.transform.rotozoom(pygame.image.load(os.path.join(os.path.dirname(__file__), "..", "..", "assets", "bird1.png")), 0, 0.1),
-    pygame.transform.rotozoom(pygame.image.load(os.path.join(os.path.dirname(__file__), "..", "..", "assets", "bird2.png")), 0, 0.1)
-]
-
-# AI bird images - scaled smaller to match original bird size
-BIRD_AI_IMGS = [
-    pygame.transform.rotozoom(pygame.image.load(os.path.join(os.path.dirname(__file__), "..", "..", "assets", "bird-ai1.png")), 0, 0.05),
-    pygame.transform.rotozoom(pygame.image.load(os.path.join(os.path.dirname(__file__), "..", "..", "assets", "bird-ai2.png")), 0, 0.05)
-]
-
-# Human bird images - scaled smaller to match original bird size
-BIRD_HUMAN_IMGS = [
-    pygame.transform.rotozoom(pygame.image.load(os.path.join(os.path.dirname(__file__), "..", "..", "assets", "bird-human1.png")), 0, 0.05),
-    pygame.transform.rotozoom(pygame.image.load(os.path.join(os.path.dirname(__file__), "..", "..", "assets", "bird-human2.png")), 0, 0.05)
-]
-
-# Load and scale the game over image to 50% of its original size
-gameover_original = pygame.image.load(os.path.join(os.path.dirname(__file__), "..", "..", "assets", "gameover.png"))
-GAMEOVER_IMG = pygame.transform.rotozoom(gameover_original, 0, 0.5)
-
-# Font for score display
-SCORE_FONT = pygame.font.Font(None, 50)
-FINAL_SCORE_FONT = pygame.font.Font(None, 70)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+ASSET_DIR = os.path.join(PROJECT_ROOT, "assets")
+CACHE_DIR = os.path.join(PROJECT_ROOT, ".cache", "assets")
+
+# -------------------------
+# Images
+# -------------------------
+
+# name: (file, scale, per-pixel alpha, flipped vertically)
+IMAGES = {
+    "bg": ("bg.png", 1, False, False),                  # Background remains unchanged
+    "pipe": ("pipe.png", 0.5, True, False),             # 50% of its original size
+    "pipe_top": ("pipe.png", 0.5, True, True),
+    "bird1": ("bird1.png", 0.1, True, False),
+    "bird2": ("bird2.png", 0.1, True, False),
+    "bird-ai1": ("bird-ai1.png", 0.05, True, False),    # AI / human birds match the bird size
+    "bird-ai2": ("bird-ai2.png", 0.05, True, False),
+    "bird-human1": ("bird-human1.png", 0.05, True, False),
+    "bird-human2": ("bird-human2.png", 0.05, True, False),
+    "gameover": ("gameover.png", 0.5, True, False),
+}
+
+class AssetManager:
+    """
+    Loads IMAGES on first use. Scaled variants are kept as PNGs in cache_dir,
+    named after the source file's mtime and the scale, so a later start skips
+    decoding the full-size source and rotozooming it. Once a display exists,
+    image() hands out surfaces converted to its pixel format.
+    """
+
+    def __init__(self, images=IMAGES, asset_dir=ASSET_DIR, cache_dir=CACHE_DIR):
+        self.images = images
+        self.asset_dir = asset_dir
+        self.cache_dir = cache_dir
+        self.surfaces = {}       # name -> (surface, converted)
+        self.stats = {"loaded": 0, "disk_hits": 0, "converted": 0}
+
+    def cache_path(self, name):
+        file, scale, _, flip = self.images[name]
+        stem = os.path.splitext(file)[0]
+        mtime = os.stat(os.path.join(self.asset_dir, file)).st_mtime_ns
+        return os.path.join(self.cache_dir, f"{stem}@{scale:g}{'-flip' if flip else ''}.{mtime}.png")
+
+    def _load(self, name):
+        file, scale, _, flip = self.images[name]
+        cached = self.cache_path(name)
+        if os.path.exists(cached):
+            self.stats["disk_hits"] += 1
+            return pygame.image.load(cached)
+
+        surf = pygame.image.load(os.path.join(self.asset_dir, file))
+        if scale != 1:
+            surf = pygame.transform.rotozoom(surf, 0, scale)
+        if flip:
+            surf = pygame.transform.flip(surf, False, True)
+        self.stats["loaded"] += 1
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            prefix = os.path.basename(cached).rsplit(".", 2)[0] + "."
+            for old in os.listdir(self.cache_dir):
+                if old.startswith(prefix):   # same image and scale, older source
+                    os.remove(os.path.join(self.cache_dir, old))
+            tmp = cached + ".tmp.png"
+            pygame.image.save(surf, tmp)
+            os.replace(tmp, cached)
+        except (OSError, pygame.error):
+            pass   # read-only checkout: just don't cache
+        return surf
+
+    def image(self, name):
+        entry = self.surfaces.get(name)
+        if entry is None:
+            entry = (self._load(name), False)
+        surf, converted = entry
+        if not converted and pygame.display.get_surface() is not None:
+            surf = surf.convert_alpha() if self.images[name][2] else surf.convert()
+            entry = (surf, True)
+            self.stats["converted"] += 1
+        self.surfaces[name] = entry
+        return surf
+
+ASSETS = AssetManager()
+
+def image(name):
+    """Shared surface for an IMAGES entry; call it at draw / spawn time to get the converted one."""
+    return ASSETS.image(name)
+
+# -------------------------
+# Fonts
+# -------------------------
+
+# Constructing a Font reads and parses the font file, so every size is built
+# once and shared; never call pygame.font.Font in a draw function
+_FONTS = {}
+
+def get_font(size, name=None):
+    """Shared pygame Font for (name, size); name=None is pygame's default font."""
+    key = (name, int(size))
+    font = _FONTS.get(key)
+    if font is None:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        font = _FONTS[key] = pygame.font.Font(name, key[1])
+    return font
+
+def quantize_font_size(size, step=4):
+    """Round an animated font size to a multiple of step, so animations reuse a few fonts."""
+    return max(step, int(round(size / step)) * step)
+
+# -------------------------
+# Module constants (loaded on first access)
+# -------------------------
+
+_IMAGE_NAMES = {
+    "BG_IMG": "bg",
+    "PIPE_IMG": "pipe",
+    "BIRD_IMGS": ("bird1", "bird2"),
+    "BIRD_AI_IMGS": ("bird-ai1", "bird-ai2"),
+    "BIRD_HUMAN_IMGS": ("bird-human1", "bird-human2"),
+    "GAMEOVER_IMG": "gameover",
+}
+_FONT_SIZES = {
+    "SCORE_FONT": 50,        # Font for score display
+    "FINAL_SCORE_FONT": 70,
+}
+
+def __getattr__(name):
+    # `from .assets import BIRD_IMGS` keeps working; it loads at that point
+    if name in _IMAGE_NAMES:
+        names = _IMAGE_NAMES[name]
+        return image(names) if isinstance(names, str) else [image(n) for n in names]
+    if name in _FONT_SIZES:
+        return get_font(_FONT_SIZES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
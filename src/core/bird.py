@@ -1,5 +1,16 @@
 import pygame
-from .assets import BIRD_IMGS, BIRD_AI_IMGS, BIRD_HUMAN_IMGS
+from .assets import image
+from .sprites import rotated
+
+# Collision masks per bird sprite, built on first use
+_MASKS = {}
+
+# Sprite names (core/assets IMAGES) per bird type
+BIRD_SPRITES = {
+    "ai": ("bird-ai1", "bird-ai2"),
+    "human": ("bird-human1", "bird-human2"),
+    "default": ("bird1", "bird2"),
+}
 
 class Bird:
     GRAVITY = 0.3
@@ -16,13 +27,10 @@ class Bird:
         self.img_count = 0
         self.bird_type = bird_type
         
-        # Choose the appropriate image set based on bird type
-        if bird_type == "ai":
-            self.bird_imgs = BIRD_AI_IMGS
-        elif bird_type == "human":
-            self.bird_imgs = BIRD_HUMAN_IMGS
-        else:
-            self.bird_imgs = BIRD_IMGS  # Default images
+        # Choose the appropriate image set based on bird type (display-format
+        # surfaces once the window exists)
+        names = BIRD_SPRITES.get(bird_type, BIRD_SPRITES["default"])
+        self.bird_imgs = [image(name) for name in names]
             
         self.img = self.bird_imgs[0]
         self.jump_frame = 0
@@ -57,9 +65,8 @@ class Bird:
         else:
             current_img = self.bird_imgs[0]
 
-        rotated_image = pygame.transform.rotate(current_img, self.tilt)
-        new_rect = rotated_image.get_rect(center=current_img.get_rect(topleft=(self.x, self.y)).center)
-        win.blit(rotated_image, new_rect.topleft)
+        rotated_image, (dx, dy) = rotated(current_img, self.tilt)
+        win.blit(rotated_image, (round(self.x) + dx, round(self.y) + dy))
 
     def get_mask(self):
         # Use the current image for collision detection
@@ -67,4 +74,7 @@ class Bird:
             current_img = self.bird_imgs[1]
         else:
             current_img = self.bird_imgs[0]
-        return pygame.mask.from_surface(current_img)
+        mask = _MASKS.get(current_img)
+        if mask is None:
+            mask = _MASKS[current_img] = pygame.mask.from_surface(current_img)
+        return mask
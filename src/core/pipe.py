@@ -1,6 +1,11 @@
 import pygame
 import random
-from .assets import PIPE_IMG
+from .assets import image
+
+# The pipe sprites never change: build their masks once, not per pipe / per check
+PIPE_TOP_IMG = image("pipe_top")
+PIPE_TOP_MASK = pygame.mask.from_surface(PIPE_TOP_IMG)
+PIPE_BOTTOM_MASK = pygame.mask.from_surface(image("pipe"))
 
 class Pipe: 
     BASIC_GAP = 300
@@ -10,21 +15,22 @@ class Pipe:
     MIN_HEIGHT = 100
     MAX_HEIGHT = 500
 
-    def __init__(self, x, gap=None, moving=False):
+    def __init__(self, x, gap=None, moving=False, height=None):
         self.x = x
         self.height = 0
         self.top = 0
         self.bottom = 0
-        self.PIPE_TOP = pygame.transform.flip(PIPE_IMG, False, True)
-        self.PIPE_BOTTOM = PIPE_IMG
+        self.PIPE_TOP = image("pipe_top")
+        self.PIPE_BOTTOM = image("pipe")
         self.passed = False
         self.motionToTop = random.randint(0, 1)
         self.moving = moving
         self.GAP = gap if gap else Pipe.BASIC_GAP
-        self.set_height()
+        self.set_height(height)
 
-    def set_height(self):
-        self.height = random.randrange(self.MIN_HEIGHT, self.MAX_HEIGHT)
+    def set_height(self, height=None):
+        # A fixed height lets pre-generated courses (course bank) replay exactly
+        self.height = height if height is not None else random.randrange(self.MIN_HEIGHT, self.MAX_HEIGHT)
         self.top = self.height - self.PIPE_TOP.get_height()
         self.bottom = self.height + self.GAP
 
@@ -55,8 +61,8 @@ class Pipe:
 
     def collide(self, bird):
         bird_mask = bird.get_mask()
-        top_mask = pygame.mask.from_surface(self.PIPE_TOP)
-        bottom_mask = pygame.mask.from_surface(self.PIPE_BOTTOM)
+        top_mask = PIPE_TOP_MASK
+        bottom_mask = PIPE_BOTTOM_MASK
 
         top_offset = (self.x - bird.x, self.top - round(bird.y))
         bottom_offset = (self.x - bird.x, self.bottom - round(bird.y))
@@ -0,0 +1,25 @@
+# sprites.py
+#
+# Cache of rotated sprites. Bird tilt only takes values between -38 and 15
+# degrees, so rotating to whole degrees gives a few dozen surfaces per image
+# instead of one pygame.transform.rotate per bird per frame.
+import pygame
+
+_ROTATED = {}
+
+def rotated(img, angle):
+    """
+    (surface, (dx, dy)) for img rotated by angle (rounded to whole degrees).
+    Blit at (round(x) + dx, round(y) + dy) to keep the sprite centred where the
+    unrotated image at (x, y) would be, like Bird.draw does.
+    """
+    key = (img, int(round(angle)))
+    hit = _ROTATED.get(key)
+    if hit is None:
+        surf = pygame.transform.rotate(img, key[1])
+        if pygame.display.get_surface() is not None:
+            surf = surf.convert_alpha()   # display pixel format: much faster blits
+        w, h = img.get_size()
+        rw, rh = surf.get_size()
+        hit = _ROTATED[key] = (surf, (w // 2 - rw // 2, h // 2 - rh // 2))
+    return hit
@@ -0,0 +1,59 @@
+# inputs.py
+#
+# Flaps sent redundantly over the UDP channel. Every flap gets an id and the
+# host tick it is meant for (see prediction.py); each client datagram carries
+# the id of the newest flap and the ticks of the flaps first sent in the last
+# REDUNDANCY datagrams. A flap therefore survives up to REDUNDANCY - 1 lost
+# datagrams in a row, and the host applies each id once.
+from collections import deque
+
+REDUNDANCY = 8
+
+class InputSender:
+    """Client side."""
+
+    def __init__(self, redundancy=REDUNDANCY):
+        self.redundancy = redundancy
+        self.last = 0               # newest flap id
+        self.packet = 0
+        self.recent = deque()       # [flap id, tick, first packet it went out in]
+
+    def flap(self, tick=0):
+        """Record a flap for host tick `tick`; returns its id."""
+        self.last += 1
+        self.recent.append([self.last, tick, None])
+        return self.last
+
+    def message(self, ack):
+        """The "inputs" message for the next datagram; ack: newest applied snap seq or None."""
+        self.packet += 1
+        recent = self.recent
+        for entry in recent:
+            if entry[2] is None:
+                entry[2] = self.packet
+        while recent and recent[0][2] <= self.packet - self.redundancy:
+            recent.popleft()
+        return {"type": "inputs", "ack": ack, "last": self.last, "ticks": [tick for _, tick, _ in recent]}
+
+class InputReceiver:
+    """Host side."""
+
+    def __init__(self):
+        self.applied = 0            # newest flap id received
+        self.stats = {"flaps": 0, "repeats": 0, "missed": 0}
+
+    def receive(self, msg):
+        """[(flap id, tick)] of the flaps in msg not seen yet."""
+        last, ticks = msg["last"], msg["ticks"]
+        count = len(ticks)
+        if last <= self.applied:
+            self.stats["repeats"] += count
+            return []
+        first = last - count + 1
+        if first > self.applied + 1:
+            self.stats["missed"] += first - self.applied - 1   # fell out of the window while lost
+        new = [(first + i, tick) for i, tick in enumerate(ticks) if first + i > self.applied]
+        self.applied = last
+        self.stats["flaps"] += len(new)
+        self.stats["repeats"] += count - len(new)
+        return new
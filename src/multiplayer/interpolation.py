@@ -0,0 +1,121 @@
+# interpolation.py
+#
+# Jitter buffer for the LAN client. Host states are timestamped as they
+# arrive and the client draws the world as it was `delay` seconds ago,
+# interpolating birds and pipes between the two states around that moment.
+# Snapshots stamped with the host's clock (protocol 2+, "time") are placed on
+# the host's timeline, shifted to the local clock by the smallest transit
+# delay seen recently, so network jitter doesn't show up as uneven movement.
+# When the next state is late the last motion is extrapolated for up to
+# max_extrapolate seconds, then the picture holds.
+import threading
+import time
+from collections import deque
+
+INTERP_DELAY = 0.1         # seconds behind the newest state: about three 30 Hz snapshots
+MAX_EXTRAPOLATE = 0.1      # seconds past the newest state before holding it
+OFFSET_WINDOW = 120        # snapshots the clock offset is taken over (min transit delay)
+RESYNC = 0.25              # an offset this much above the minimum restarts the timeline
+BUFFER_SIZE = 64
+
+BIRD_FIELDS = ("x", "y", "tilt")
+
+def _lerp(a, b, t):
+    return a + (b - a) * t
+
+def _pipe_key(p):
+    # Delta snapshots carry pipe ids; full states are matched by their gap
+    return p.get("id", (p["top"], p["bottom"]))
+
+def blend(a, b, t):
+    """State dict between a (t=0) and b (t=1); t > 1 extrapolates. Discrete fields come from the nearer one."""
+    near = a if t < 0.5 else b
+    out = dict(near)
+    for key, pa in a.items():
+        pb = b.get(key)
+        if key[0] == "p" and key[1:].isdigit() and isinstance(pb, dict):
+            bird = dict(near[key])
+            for f in BIRD_FIELDS:
+                bird[f] = _lerp(pa[f], pb[f], t)
+            out[key] = bird
+    b_pipes = {_pipe_key(p): p for p in b.get("pipes", ())}
+    a_keys = set()
+    pipes = []
+    for pa in a.get("pipes", ()):
+        key = _pipe_key(pa)
+        a_keys.add(key)
+        pb = b_pipes.get(key)
+        if pb is not None:
+            pipe = dict(pb)
+            pipe["x"] = _lerp(pa["x"], pb["x"], t)
+            pipes.append(pipe)
+        elif near is a:
+            pipes.append(pa)
+    if near is b:
+        pipes += [p for key, p in b_pipes.items() if key not in a_keys]
+    out["pipes"] = pipes
+    return out
+
+class SnapshotBuffer:
+    """push() states from the network thread, sample() once per rendered frame."""
+
+    def __init__(self, delay=INTERP_DELAY, max_extrapolate=MAX_EXTRAPOLATE):
+        self.delay = delay
+        self.max_extrapolate = max_extrapolate
+        self.states = deque(maxlen=BUFFER_SIZE)   # (time, state), oldest first
+        self.offsets = deque(maxlen=OFFSET_WINDOW)
+        self.lock = threading.Lock()
+        self.stats = {"pushed": 0, "interpolated": 0, "extrapolated": 0, "held": 0,
+                      "depth": 0, "depth_ms": 0.0}
+
+    def push(self, state, now=None):
+        now = time.perf_counter() if now is None else now
+        host_time = state.get("time")
+        with self.lock:
+            if host_time is None:
+                t = now
+            else:
+                offset = now - host_time
+                if self.offsets and abs(offset - min(self.offsets)) > RESYNC:
+                    # A different host clock (reconnect, wrap): new timeline
+                    self.offsets.clear()
+                self.offsets.append(offset)
+                t = host_time + min(self.offsets)
+            if self.states and t < self.states[-1][0]:
+                if host_time is not None and self.states[-1][1].get("time", host_time) > host_time:
+                    return   # older than what is buffered
+                # The timeline jumped back: start over from here
+                self.states.clear()
+            self.states.append((t, state))
+            self.stats["pushed"] += 1
+
+    def sample(self, now=None):
+        """State to draw now, or None before the first one arrived."""
+        now = time.perf_counter() if now is None else now
+        target = now - self.delay
+        with self.lock:
+            states = self.states
+            if not states:
+                return None
+            # Drop what is no longer needed, keeping the two around target
+            # (or the last two, to extrapolate from)
+            while len(states) > 2 and states[1][0] <= target:
+                states.popleft()
+            self.stats["depth"] = sum(1 for t, _ in states if t > target)
+            self.stats["depth_ms"] = (states[-1][0] - target) * 1000
+
+            (ta, a), (tb, b) = states[0], states[-1]
+            if len(states) == 1 or target <= ta:
+                return a
+            if len(states) > 2:
+                tb, b = states[1]
+            if target <= tb:
+                self.stats["interpolated"] += 1
+                return blend(a, b, (target - ta) / (tb - ta) if tb > ta else 1.0)
+            # Late: run the last motion on for a bit, then hold
+            if target - tb > self.max_extrapolate:
+                self.stats["held"] += 1
+            else:
+                self.stats["extrapolated"] += 1
+            ahead = min(target - tb, self.max_extrapolate)
+            return blend(a, b, 1.0 + ahead / (tb - ta)) if tb > ta else b
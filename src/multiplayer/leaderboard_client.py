@@ -69,7 +69,7 @@ def fetch_user_best(username: str) -> Optional[int]:
 
 # NOTE: kept here per request so the menu can "transfer" to this page.
 import pygame
-from ..core.assets import BG_IMG, SCORE_ORANGE, SCORE_OUTLINE, SCORE_FILL
+from ..core.assets import SCORE_ORANGE, SCORE_OUTLINE, SCORE_FILL, get_font, image
 from ..ui.button import Button, render_outlined_text
 
 WIN_WIDTH = 800
@@ -87,9 +87,9 @@ def _draw_leaderboard_panel(surface, items, my_id=None, base_y=200):
     pygame.draw.rect(overlay, (0, 0, 0, 140), overlay.get_rect(), border_radius=18)
     pygame.draw.rect(overlay, (255, 255, 255, 70), overlay.get_rect(), width=2, border_radius=18)
 
-    title_font = pygame.font.Font(None, 48)
-    row_font = pygame.font.Font(None, 30)
-    small_font = pygame.font.Font(None, 26)
+    title_font = get_font(48)
+    row_font = get_font(30)
+    small_font = get_font(26)
 
     title = title_font.render("Leaderboard — Top 10", True, (255, 255, 255))
     overlay.blit(title, (overlay.get_width() // 2 - title.get_width() // 2, 16))
@@ -135,8 +135,8 @@ def run_leaderboard_screen(highlight_id: Optional[str] = None):
     pygame.display.set_caption("Flappy Bird — Leaderboard")
 
     clock = pygame.time.Clock()
-    title_font = pygame.font.Font(None, 80)
-    subtitle_font = pygame.font.Font(None, 32)
+    title_font = get_font(80)
+    subtitle_font = get_font(32)
 
     items = fetch_top10(limit=10)
 
@@ -159,7 +159,7 @@ def run_leaderboard_screen(highlight_id: Optional[str] = None):
 
         # background
         screen = pygame.display.get_surface()
-        screen.blit(BG_IMG, (0, 0))
+        screen.blit(image("bg"), (0, 0))
         dark = pygame.Surface((WIN_WIDTH, WIN_HEIGHT))
         dark.set_alpha(40)
         dark.fill((0, 0, 0))
@@ -0,0 +1,127 @@
+# lockstep.py
+#
+# Deterministic lockstep for LAN play. Every peer runs the same Match from
+# the same seed and the peers exchange only their inputs: a key press goes
+# into tick `now + delay`, and a tick is played once every player's input
+# for it is known. Each peer sends one "lock" message per frame:
+#
+#   {"type": "lock", "player": i, "upto": t, "flaps": [[tick, flags], ...], "sum": [tick, crc]}
+#
+# "upto" is the newest tick player i committed its input for (ticks without
+# a key press are implied, so only presses are listed) and "sum" is the
+# checksum of the newest tick it played. Comparing checksums tick by tick
+# catches a desync on the first tick the worlds differ; the game then falls
+# back to the host streaming its world (online_two_player_host.py).
+# Lockstep and Match take any number of players, but the host currently
+# accepts one client, and nothing relays one client's inputs to another.
+#
+# The match is set up over the TCP connection (JSON bodies):
+#
+#   host -> client   {"type": "lockstep", "seed": s, "delay": d, "players": n, "you": i}
+#   client -> host   {"type": "lockstep_ok"}
+#   either           {"type": "desync", "tick": t}      (the client stops, the host falls back)
+#   host -> client   {"type": "lockstep_off"}           (snapshots from here on)
+import threading
+
+from .match import Match
+
+INPUT_DELAY = 3           # ticks between a key press and the tick it is played on (50 ms at 60 Hz)
+MAX_CATCHUP = 2           # ticks played per frame after waiting for a peer
+SUM_HISTORY = 256         # ticks of checksums kept for comparing
+STALL_LIMIT = 120         # frames in a row without a tick before the peer counts as gone
+
+class Lockstep:
+    """receive() from the network thread; press() / advance() / message() from the game loop."""
+
+    def __init__(self, player, players=2, seed=None, delay=INPUT_DELAY):
+        self.match = Match(players, seed)
+        self.player = player
+        self.players = players
+        self.delay = delay
+        self.tick = 0                    # ticks played (the match's own tick stops between rounds)
+        self.upto = [delay] * players    # newest tick each player's input is known for
+        self.inputs = {}                 # tick -> {player: flags}, presses only
+        self.flags = 0                   # local presses not committed to a tick yet
+        self.outgoing = []               # [tick, flags] committed since the last message
+        self.sent_upto = delay
+        self.sums = {}                   # tick -> our checksum
+        self.remote_sums = {}            # tick -> [crc] from the other players
+        self.desync = None               # first tick the checksums disagreed on
+        self.stalled = 0                 # frames in a row without a tick
+        self.lock = threading.Lock()
+        self.stats = {"ticks": 0, "stalls": 0, "messages": 0, "checked": 0}
+
+    @property
+    def stuck(self):
+        return self.stalled >= STALL_LIMIT
+
+    def press(self, flags):
+        self.flags |= flags
+
+    def receive(self, msg):
+        with self.lock:
+            player = msg["player"]
+            for tick, flags in msg["flaps"]:
+                slot = self.inputs.setdefault(tick, {})
+                slot[player] = slot.get(player, 0) | flags
+            self.upto[player] = max(self.upto[player], msg["upto"])
+            if msg.get("sum"):
+                tick, crc = msg["sum"]
+                self.remote_sums.setdefault(tick, []).append(crc)
+                self._compare(tick)
+
+    def _compare(self, tick):
+        ours = self.sums.get(tick)
+        theirs = self.remote_sums.get(tick)
+        if ours is None or theirs is None:
+            return
+        del self.remote_sums[tick]
+        self.stats["checked"] += 1
+        if any(crc != ours for crc in theirs) and self.desync is None:
+            self.desync = tick
+
+    def advance(self, profiler=None):
+        """Play the ticks everyone's input is in for (at most MAX_CATCHUP), then commit ours for one more; returns ticks played."""
+        played = 0
+        with self.lock:
+            while played < MAX_CATCHUP and self.desync is None and min(self.upto) > self.tick:
+                tick = self.tick + 1
+                inputs = self.inputs.pop(tick, {})
+                self.match.step([inputs.get(p, 0) for p in range(self.players)], profiler)
+                self.tick = tick
+                self.sums[tick] = self.match.checksum()
+                self.sums.pop(tick - SUM_HISTORY, None)
+                self._compare(tick)
+                played += 1
+            # Checksums from further back than we remember can't be compared any more
+            for tick in [t for t in self.remote_sums if t <= self.tick - SUM_HISTORY]:
+                del self.remote_sums[tick]
+
+            # Our input goes `delay` ticks ahead of what is on screen, one tick
+            # per frame: that is the clock every peer plays at
+            if self.upto[self.player] < self.tick + self.delay:
+                tick = self.upto[self.player] + 1
+                if self.flags:
+                    self.inputs.setdefault(tick, {})[self.player] = self.flags
+                    self.outgoing.append([tick, self.flags])
+                    self.flags = 0
+                self.upto[self.player] = tick
+        self.stats["ticks"] += played
+        if played:
+            self.stalled = 0
+        else:
+            self.stalled += 1
+            self.stats["stalls"] += 1
+        return played
+
+    def message(self):
+        """The "lock" message for this frame, or None if nothing new was committed."""
+        upto = self.upto[self.player]
+        if upto == self.sent_upto:
+            return None
+        msg = {"type": "lock", "player": self.player, "upto": upto, "flaps": self.outgoing,
+               "sum": [self.tick, self.sums[self.tick]] if self.tick else None}
+        self.outgoing = []
+        self.sent_upto = upto
+        self.stats["messages"] += 1
+        return msg
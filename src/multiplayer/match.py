@@ -0,0 +1,133 @@
+# match.py
+#
+# The LAN world: one bird per player over a shared, seeded course, each
+# scoring independently until everyone is out. The host streams it, and in
+# lockstep (lockstep.py) both peers run it side by side, so a step depends
+# only on the seed and the inputs: pipe heights come from the match's own
+# Random, and a bird's collision mask (wing up for ten ticks after a flap)
+# is counted down here rather than by drawing it.
+import random
+import struct
+import zlib
+from contextlib import nullcontext
+
+from ..core.bird import Bird
+from ..core.pipe import Pipe
+
+WIN_WIDTH = 800
+WIN_HEIGHT = 900
+FIRST_PIPE_X = 800
+SPAWN_BEFORE_X = 450      # a new pipe comes in once the last one got this far
+
+# Input flags per player and tick
+FLAP, RESTART = 1, 2
+
+_BIRD_SUM = struct.Struct("<dddBH")    # y, vel, tilt, out, score
+_PIPE_SUM = struct.Struct("<dd")       # x, height
+
+def bird_start(i):
+    """(x, y, sprite) of player i's bird; players 1 and 2 start where the LAN game always had them."""
+    return 300 - 100 * (i % 2), 400 + 100 * (i % 2) + 30 * (i // 2), "human" if i == 0 else "ai"
+
+class Match:
+    def __init__(self, players=2, seed=None, width=WIN_WIDTH, height=WIN_HEIGHT):
+        self.players = players
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.rng = random.Random(seed)
+        self.tick = 0             # steps played; pipes move Pipe.VEL per tick
+        self.reset()
+
+    def reset(self):
+        self.birds = []
+        for i in range(self.players):
+            x, y, sprite = bird_start(i)
+            self.birds.append(Bird(x, y, sprite))
+        self.pipes = [self._pipe(FIRST_PIPE_X)]
+        self.scores = [0] * self.players
+        self.over = [False] * self.players
+        self.passed = [set() for _ in range(self.players)]
+
+    def _pipe(self, x):
+        return Pipe(x, height=self.rng.randrange(Pipe.MIN_HEIGHT, Pipe.MAX_HEIGHT))
+
+    @property
+    def finished(self):
+        return all(self.over)
+
+    def step(self, inputs=(), profiler=None):
+        """One tick; inputs[i]: FLAP / RESTART flags of player i. Stands still once everyone is out."""
+        if self.finished:
+            if any(flags & RESTART for flags in inputs):
+                self.reset()
+            return
+        for bird in self.birds:
+            if bird.jump_frame > 0:
+                bird.jump_frame -= 1
+        for i, flags in enumerate(inputs):
+            if flags & FLAP and not self.over[i]:
+                self.birds[i].jump()
+
+        self.tick += 1
+        alive = [i for i in range(self.players) if not self.over[i]]
+        for i in alive:
+            self.birds[i].move()
+
+        remove = []
+        for pipe in self.pipes:
+            pipe.move()
+            with profiler.phase("collision") if profiler else nullcontext():
+                for i in alive:
+                    if not self.over[i] and pipe.collide(self.birds[i]):
+                        self.over[i] = True
+
+            # Independent scoring (only while that player is alive)
+            right = pipe.x + pipe.PIPE_TOP.get_width()
+            for i in alive:
+                if not self.over[i] and right < self.birds[i].x and pipe not in self.passed[i]:
+                    self.scores[i] += 1
+                    self.passed[i].add(pipe)
+            if right < 0:
+                remove.append(pipe)
+
+        for i in alive:
+            if not self.over[i] and not 0 <= self.birds[i].y <= self.height:
+                self.over[i] = True
+
+        for pipe in remove:
+            for passed in self.passed:
+                passed.discard(pipe)
+            self.pipes.remove(pipe)
+        if self.pipes and self.pipes[-1].x < SPAWN_BEFORE_X:
+            self.pipes.append(self._pipe(self.width))
+
+    def checksum(self):
+        """CRC of everything a step depends on, bit for bit."""
+        crc = zlib.crc32(self.tick.to_bytes(4, "little"))
+        for bird, out, score in zip(self.birds, self.over, self.scores):
+            crc = zlib.crc32(_BIRD_SUM.pack(bird.y, bird.vel, bird.tilt, out, score & 0xFFFF), crc)
+            crc = zlib.crc32(bytes((bird.jump_frame,)), crc)
+        for pipe in self.pipes:
+            crc = zlib.crc32(_PIPE_SUM.pack(pipe.x, pipe.height), crc)
+        return crc
+
+    def state(self, order=None):
+        """The JSON-era "state" dict, as the host streams it; order: player indices to list as p1, p2, ..."""
+        state = {"type": "state", "tick": self.tick, "w": self.width, "h": self.height}
+        for k, i in enumerate(range(self.players) if order is None else order, 1):
+            bird, out = self.birds[i], self.over[i]
+            state[f"p{k}"] = {"x": bird.x, "y": bird.y, "tilt": bird.tilt, "alive": not out, "score": self.scores[i]}
+            state[f"game_over{k}"] = out
+        state["pipes"] = [{"x": p.x, "top": p.top, "bottom": p.bottom} for p in self.pipes]
+        return state
+
+    def draw(self, surface):
+        """Pipes, then the birds still in (they vanish on death)."""
+        for pipe in self.pipes:
+            pipe.draw(surface)
+        for bird, out in zip(self.birds, self.over):
+            if not out:
+                jump_frame = bird.jump_frame
+                bird.draw(surface)
+                bird.jump_frame = jump_frame   # the wing is the simulation's, see step()
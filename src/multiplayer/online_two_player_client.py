@@ -1,25 +1,36 @@
 # online_two_player_client.py
+import time
 import pygame
 from ..core.assets import (
     BG_IMG, SCORE_FONT, FINAL_SCORE_FONT, SCORE_FILL, SCORE_OUTLINE,
-    PIPE_IMG, GAMEOVER_IMG
+    GAMEOVER_IMG, get_font, image
 )
 from ..ui.button import render_outlined_text
+from ..ui.dirty_rects import DirtyRenderer
+from ..utils.frame_profiler import FrameProfiler
 from ..core.bird import Bird
-from ..ai.net import connect, send_json, start_reader
+from ..ai.net import Inbox, open_udp
+from ..ai.aio_net import AsyncDatagramChannel, connect
+from . import protocol
+from .snapshots import SnapshotDecoder
+from .inputs import InputSender
+from .interpolation import INTERP_DELAY, SnapshotBuffer
+from .prediction import Predictor
+from .lockstep import Lockstep
+from .match import FLAP
 
 # -------- Window --------
 WIN_WIDTH = 800
 WIN_HEIGHT = 900
 FPS = 60
 
-PIPE_TOP_IMG = pygame.transform.flip(PIPE_IMG, False, True)
-PIPE_BOTTOM_IMG = PIPE_IMG
-
 P1_COLOR = (255, 80, 80)
 P2_COLOR = (0, 200, 255)
 TAG_COLOR = (240, 240, 240)
 
+# F3: frame-time overlay, F4: dump the timings
+PROFILER = FrameProfiler("lan_client")
+
 def scaled_bg():
     return pygame.transform.scale(BG_IMG, (WIN_WIDTH, WIN_HEIGHT))
 
@@ -33,10 +44,10 @@ def ip_prompt(surface, title="Join Host", placeholder="Type host IP (e.g., 127.0
     BG = scaled_bg()
 
     # Fonts
-    title_font = pygame.font.Font(None, 48)
-    label_font = pygame.font.Font(None, 26)
-    input_font = pygame.font.Font(None, 28)
-    hint_font  = pygame.font.Font(None, 22)
+    title_font = get_font(48)
+    label_font = get_font(26)
+    input_font = get_font(28)
+    hint_font  = get_font(22)
 
     # Card metrics
     card_w, card_h = 560, 220
@@ -115,13 +126,14 @@ def ip_prompt(surface, title="Join Host", placeholder="Type host IP (e.g., 127.0
         clock.tick(60)
 
 # ---------- Client Main ----------
-def main(host_ip=None, port=50007):
+def main(host_ip=None, port=50007, interp_delay=INTERP_DELAY, room=None):
     pygame.init()
     win = pygame.display.set_mode((WIN_WIDTH, WIN_HEIGHT))
     pygame.display.set_caption("Flappy Bird - LAN Client (Player 2)")
     clock = pygame.time.Clock()
     BG = scaled_bg()
-    HUD_FONT = pygame.font.Font(None, 28)
+    screen = DirtyRenderer(BG)
+    HUD_FONT = get_font(28)
 
     # Ask for IP if not provided
     while not host_ip:
@@ -133,7 +145,7 @@ def main(host_ip=None, port=50007):
     while True:
         try:
             print(f"[CLIENT] Connecting to {host_ip}:{port} ...")
-            sock = connect(host_ip, port)
+            conn = connect(host_ip, port)
             break
         except OSError:
             # brief error screen, then re-prompt
@@ -181,85 +193,214 @@ def main(host_ip=None, port=50007):
         close = False
     state = RemoteState()
 
+    decoder = SnapshotDecoder()
+    buffer = SnapshotBuffer(delay=interp_delay)   # smooths 30/60 Hz states over 60 FPS frames
+    udp = None            # protocol 4 state channel, once the host offered it
+    udp_since = 0.0
+    udp_live = False      # a snapshot arrived over UDP
+    latest_ack = None     # newest snap applied, acked in the next UDP datagram
+    sender = InputSender()
+    predictor = Predictor(client_bird)   # our own bird runs ahead of the snapshots
+    lock = None           # lockstep match being played
+    inbox = Inbox()       # host messages (TCP and UDP), handled once per frame
+
+    def on_snap(msg: dict, arrival: float):
+        # Delta snapshots (protocol 4) are rebuilt into the same full state
+        nonlocal latest_ack
+        full, reply = decoder.apply(msg)
+        if reply is not None:
+            if reply["type"] == "ack" and udp_live:
+                latest_ack = reply["seq"]
+            else:
+                conn.send(reply)
+        if full is not None:
+            predictor.set_authoritative(full)
+            handle(full, arrival)
+
+    def on_udp(msg: dict):
+        nonlocal udp_live
+        if msg.get("type") == "snap":
+            udp_live = True
+            inbox.put(msg)
+
     def on_msg(msg: dict):
-        # host → client updates
-        if msg.get("type") == "state":
-            state.p1 = msg.get("p1", state.p1)
-            state.p2 = msg.get("p2", state.p2)
-            state.pipes = msg.get("pipes", state.pipes)
-            state.game_over1 = msg.get("game_over1", state.game_over1)
-            state.game_over2 = msg.get("game_over2", state.game_over2)
-
-            host_bird.x = state.p1.get("x", host_bird.x)
-            host_bird.y = state.p1.get("y", host_bird.y)
-            host_bird.tilt = state.p1.get("tilt", host_bird.tilt)
-            host_bird.jump_frame = 0
-
-            client_bird.x = state.p2.get("x", client_bird.x)
-            client_bird.y = state.p2.get("y", client_bird.y)
-            client_bird.tilt = state.p2.get("tilt", client_bird.tilt)
-            client_bird.jump_frame = 0
+        # The handshake switches formats mid-stream, so it is handled on the network thread
+        if not protocol.handle_handshake(conn, msg):
+            inbox.put(msg)
+
+    def handle(msg: dict, arrival: float):
+        nonlocal udp, udp_since, lock
+        if msg.get("type") == "lock":
+            if lock is not None:
+                lock.receive(msg)
+        elif msg.get("type") == "snap":
+            on_snap(msg, arrival)
+        elif msg.get("type") == "lockstep":
+            # The same seeded match as the host; from here on only inputs go back and forth
+            lock = Lockstep(msg["you"], msg["players"], msg["seed"], msg["delay"])
+            conn.send({"type": "lockstep_ok"})
+            print(f"[CLIENT] Lockstep, input delay {lock.delay} ticks")
+        elif msg.get("type") == "lockstep_off":
+            if lock is not None:
+                print("[CLIENT] Lockstep off, following host state")
+            lock = None
+        elif msg.get("type") == "udp":
+            try:
+                sock = open_udp()
+            except OSError:
+                conn.send({"type": "udp_off"})
+                return
+            udp = AsyncDatagramChannel(sock, msg["token"], protocol.CODEC, peer=(host_ip, msg["port"]))
+            udp.start_reader(on_udp)
+            udp_since = time.time()
+        # host → client updates: buffered, drawn interp_delay later
+        elif msg.get("type") == "state":
+            buffer.push(msg, arrival)
+
+        elif msg.get("type") == "joined":
+            print(f"[CLIENT] Room {msg['room']}, player {msg['you'] + 1} of {msg['players']}")
 
         elif msg.get("type") == "close":
+            if msg.get("reason"):
+                print(f"[CLIENT] Closed by server: {msg['reason']}")
             state.close = True  # host backed out
 
-    start_reader(sock, on_msg)
+    def predicting():
+        return lock is None and (conn.version or 0) >= protocol.DELTA_VERSION
+
+    def show(view: dict):
+        """Put the (interpolated) host state on screen; our bird is predicted instead when we can."""
+        state.p1 = view.get("p1", state.p1)
+        state.p2 = view.get("p2", state.p2)
+        state.pipes = view.get("pipes", state.pipes)
+        state.game_over1 = view.get("game_over1", state.game_over1)
+        state.game_over2 = view.get("game_over2", state.game_over2)
+
+        host_bird.x = state.p1.get("x", host_bird.x)
+        host_bird.y = state.p1.get("y", host_bird.y)
+        host_bird.tilt = state.p1.get("tilt", host_bird.tilt)
+        host_bird.jump_frame = 0
+
+        client_bird.x = state.p2.get("x", client_bird.x)
+        if predicting():
+            return
+        client_bird.y = state.p2.get("y", client_bird.y)
+        client_bird.tilt = state.p2.get("tilt", client_bird.tilt)
+        client_bird.jump_frame = 0
+
+    conn.start_reader(on_msg)
+    protocol.hello(conn)   # binary snapshots if the host supports them, JSON otherwise
+    if room:
+        # Match server (server.py): play in this room; a LAN host ignores it
+        conn.send({"type": "join", "room": room})
 
     # --- Game loop ---
     run = True
     while run:
         clock.tick(FPS)
+        PROFILER.begin_frame()
+
+        # Everything the host sent since the last frame (read `closed` first:
+        # anything that came in before the connection went is in the inbox)
+        lost = conn.closed
+        for arrival, msg in inbox.drain():
+            handle(msg, arrival)
 
-        # leave cleanly if host closed
-        if state.close:
+        # leave cleanly if host closed (or the connection dropped)
+        if state.close or lost:
             break
 
         for event in pygame.event.get():
+            if PROFILER.handle_event(event):
+                continue
             if event.type == pygame.QUIT:
                 run = False
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
-                    try:
-                        send_json(sock, {"type": "input", "action": "flap"})
-                    except OSError:
-                        pass
+                    if lock is not None:
+                        lock.press(FLAP)
+                    elif not predicting():
+                        conn.send({"type": "input", "action": "flap"})
+                    elif state.p2.get("alive", True):
+                        # Shown right away; the host applies it on the same tick
+                        tick = predictor.next_tick
+                        predictor.add(sender.flap(tick), tick)
+                        if not udp_live:
+                            conn.send(sender.message(None))
+                        # else: goes out (and is repeated) in the UDP datagrams below
                 elif event.key in (pygame.K_ESCAPE, pygame.K_m):
                     run = False
 
-        # Draw bg
-        win.blit(BG, (0, 0))
+        # UDP: one datagram per frame with the ack and the recent flaps;
+        # until the first snapshot comes back, hellos so the host learns our address
+        if udp is not None:
+            if udp_live:
+                if lock is None:   # lockstep inputs go over TCP
+                    udp.send(sender.message(latest_ack))
+            elif time.time() - udp_since < protocol.UDP_TIMEOUT:
+                udp.send({"type": "udp_hello"})
+            else:
+                print("[CLIENT] No UDP from host, staying on TCP")
+                conn.send({"type": "udp_off"})
+                udp.close()
+                udp = None
+        PROFILER.lap("input")
+
+        if lock is not None:
+            lock.advance(PROFILER)
+            msg = lock.message()
+            if msg is not None:
+                conn.send(msg)
+            if lock.desync is not None:
+                # Wait for the host's snapshots
+                print(f"[CLIENT] Desync at tick {lock.desync}")
+                conn.send({"type": "desync", "tick": lock.desync})
+                lock = None
+        # Everything this frame produced (inputs, lock, acks, replies) goes out as one write
+        conn.flush()
+        view = lock.match.state() if lock is not None else buffer.sample()
+        if view is not None:
+            show(view)
+        if predicting():
+            predictor.update()
+            predictor.step()
+
+        # Draw bg (only what moved is redrawn and updated)
+        screen.begin()
 
         # Pipes from server (top & bottom)
-        for p in state.pipes:
+        # (moved on to the predicted tick, so our bird meets them where the host does)
+        pipe_top, pipe_bottom = image("pipe_top"), image("pipe")
+        for p in (predictor.pipes() if predicting() and predictor.tick is not None else state.pipes):
             x = int(p["x"])
             top_y = int(p["top"])
             bottom_y = int(p["bottom"])
-            win.blit(PIPE_TOP_IMG, (x, top_y))
-            win.blit(PIPE_BOTTOM_IMG, (x, bottom_y))
+            screen.blit(pipe_top, (x, top_y))
+            screen.blit(pipe_bottom, (x, bottom_y))
 
         # Draw birds only while alive (vanish on death)
         if state.p1.get("alive", True):
-            host_bird.draw(win)
+            host_bird.draw(screen)
         if state.p2.get("alive", True):
-            client_bird.draw(win)
+            client_bird.draw(screen)
 
         # HUD scores (small, sides)
         render_outlined_text(
-            win, f"P1: {state.p1.get('score', 0)}",
+            screen, f"P1: {state.p1.get('score', 0)}",
             HUD_FONT, (70, 30), P1_COLOR, SCORE_OUTLINE, SCORE_FILL
         )
         render_outlined_text(
-            win, f"You: {state.p2.get('score', 0)}",
+            screen, f"You: {state.p2.get('score', 0)}",
             HUD_FONT, (WIN_WIDTH - 70, 30), P2_COLOR, SCORE_OUTLINE, SCORE_FILL
         )
 
         # Out markers
         if state.game_over1 ^ state.game_over2:
             if state.game_over1:
-                render_outlined_text(win, "P1 OUT", HUD_FONT, (70, 60),
+                render_outlined_text(screen, "P1 OUT", HUD_FONT, (70, 60),
                                      TAG_COLOR, SCORE_OUTLINE, SCORE_FILL)
             if state.game_over2:
-                render_outlined_text(win, "YOU ARE OUT", HUD_FONT, (WIN_WIDTH - 110, 60),
+                render_outlined_text(screen, "YOU ARE OUT", HUD_FONT, (WIN_WIDTH - 110, 60),
                                      TAG_COLOR, SCORE_OUTLINE, SCORE_FILL)
 
         # Final result when both are out
@@ -274,25 +415,45 @@ def main(host_ip=None, port=50007):
                 result = "DRAW!"
 
             render_outlined_text(
-                win, result, FINAL_SCORE_FONT,
+                screen, result, FINAL_SCORE_FONT,
                 (WIN_WIDTH // 2, WIN_HEIGHT // 2 - 40),
                 SCORE_FILL, SCORE_OUTLINE, SCORE_FILL
             )
             render_outlined_text(
-                win, f"P1: {s1}   You: {s2}", FINAL_SCORE_FONT,
+                screen, f"P1: {s1}   You: {s2}", FINAL_SCORE_FONT,
                 (WIN_WIDTH // 2, WIN_HEIGHT // 2 + 20),
                 SCORE_FILL, SCORE_OUTLINE, SCORE_FILL
             )
 
-        pygame.display.update()
+        PROFILER.lap("render")
+        PROFILER.draw(screen)
+        screen.present()
+        PROFILER.lap("flip")
 
     # Cleanup & return to menu (do NOT pygame.quit() here)
-    try:
-        sock.close()
-    except Exception:
-        pass
+    st = buffer.stats
+    print(f"[CLIENT] Snapshots: {st['pushed']}, frames interpolated {st['interpolated']}, "
+          f"extrapolated {st['extrapolated']}, held {st['held']}")
+    if lock is not None:
+        st = lock.stats
+        print(f"[CLIENT] Lockstep ticks: {st['ticks']}, stalls {st['stalls']}, "
+              f"checksums compared {st['checked']}, messages {st['messages']}")
+    elif predicting():
+        st = predictor.stats
+        print(f"[CLIENT] Predicted flaps: {st['flaps']}, late {st['late']}, corrections {st['corrections']}, "
+              f"resyncs {st['resyncs']}, lead {predictor.lead} ticks")
+    conn.close()
+    inbox.close()
+    if udp is not None:
+        udp.close()
     return  # hand control back to menu.py without tearing down pygame
 
 if __name__ == "__main__":
-    # Running directly still shows the nice IP prompt first
-    main()
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", help="host or match server address (asked for if left out)")
+    parser.add_argument("--port", type=int, default=50007)
+    parser.add_argument("--room", help="room code on a match server (server.py)")
+    args = parser.parse_args()
+    # Without --host this still shows the nice IP prompt first
+    main(args.host, args.port, room=args.room)
@@ -1,8 +1,6 @@
 import pygame
 import time
 import random
-import socket
-from typing import List, Set
 import socket as _sock
 
 from ..core.assets import (
@@ -10,13 +8,21 @@ from ..core.assets import (
     GAMEOVER_IMG,
     SCORE_FONT,
     FINAL_SCORE_FONT,
+    get_font,
     SCORE_FILL,
     SCORE_OUTLINE,
 )
 from ..core.pipe import Pipe
-from ..core.bird import Bird
 from ..ui.button import render_outlined_text
-from ..ai.net import make_server, send_json, start_reader
+from ..ui.dirty_rects import DirtyRenderer
+from ..utils.frame_profiler import FrameProfiler
+from ..ai.net import Inbox, open_udp
+from ..ai.aio_net import AsyncDatagramChannel, AsyncServer
+from . import protocol
+from .snapshots import SnapshotEncoder
+from .inputs import InputReceiver
+from .match import Match, FLAP, RESTART
+from .lockstep import INPUT_DELAY, Lockstep
 
 WIN_WIDTH = 800
 WIN_HEIGHT = 900
@@ -27,6 +33,9 @@ P1_COLOR = (255, 80, 80)   # red
 P2_COLOR = (0, 200, 255)   # cyan
 TAG_COLOR = (240, 240, 240)
 
+# F3: frame-time overlay, F4: dump the timings
+PROFILER = FrameProfiler("lan_host")
+
 def _get_local_ips():
     """Collect likely LAN IPs to show on the waiting screen / console."""
     ips = set()
@@ -45,98 +54,142 @@ def _get_local_ips():
         pass
     return sorted(ips)
 
-def main(host="0.0.0.0", port=50007):
+def main(host="0.0.0.0", port=50007, lockstep=False, input_delay=INPUT_DELAY):
     pygame.init()
     win = pygame.display.set_mode((WIN_WIDTH, WIN_HEIGHT))
     pygame.display.set_caption("Flappy Bird - LAN Host (Player 1)")
     clock = pygame.time.Clock()
     BG = pygame.transform.scale(BG_IMG, (WIN_WIDTH, WIN_HEIGHT))
-    HUD_FONT = pygame.font.Font(None, 28)
+    screen = DirtyRenderer(BG)
+    HUD_FONT = get_font(28)
 
-    # --- Networking (non-blocking accept) ---
+    # --- Networking (on the shared event-loop thread, see ai/aio_net.py) ---
     print(f"[HOST] Listening on {host}:{port} ...")
     for ip in _get_local_ips():
         print(f"[HOST] Connect clients to: {ip}:{port}")
-    server = make_server(host, port)
-    server.settimeout(0.1)
+    server = AsyncServer(host, port)
+    try:
+        udp_sock = open_udp(host, port)   # state channel for protocol 4 clients, same port number
+    except OSError:
+        udp_sock = None
     conn = None
+    udp = None                    # DatagramChannel once offered to the client; owns udp_sock from then on
     reader_started = False
+    udp_offered = False
+    udp_off = False               # client gets no datagrams from us
     remote_flap = False
+    encoder = SnapshotEncoder()   # delta snapshots for a protocol 4 client
+    inputs = InputReceiver()      # tick-tagged flaps, redundant over UDP
+    inbox = Inbox()               # client messages (TCP and UDP), handled once per frame
+    due = []                      # (flap id, tick, slack) waiting for their tick
+    last_input = 0                # newest flap applied, and how early it came
+    last_slack = 0
+    offered_lock = None           # Lockstep offered to the client, until it accepts
+    lock = None                   # lockstep match being played
+    desync_reported = False
 
     def on_msg(msg: dict):
-        nonlocal remote_flap
-        if msg.get("type") == "input" and msg.get("action") == "flap":
+        # The handshake switches formats mid-stream, so it is handled on the network thread
+        if not protocol.handle_handshake(conn, msg):
+            inbox.put(msg)
+
+    def handle(msg: dict):
+        nonlocal remote_flap, udp_off, lock, desync_reported
+        kind = msg.get("type")
+        if kind == "lock":
+            if lock is not None:
+                lock.receive(msg)
+        elif kind == "lockstep_ok":
+            lock = offered_lock
+        elif kind == "desync":
+            desync_reported = True
+        elif kind == "input" and msg.get("action") == "flap":
             remote_flap = True
+        elif kind == "inputs":
+            # Tagged flaps (over TCP if the client has no UDP channel), with
+            # how many ticks they came before the one they are meant for
+            next_tick = match.tick + 1
+            due.extend((fid, tick, tick - next_tick) for fid, tick in inputs.receive(msg))
+            if msg["ack"] is not None:
+                encoder.ack(msg["ack"])
+        elif kind == "ack":
+            encoder.ack(msg["seq"])
+        elif kind == "keyframe":
+            encoder.request_keyframe()
+        elif kind == "udp_off":
+            # Client gets no datagrams from us: stay on TCP
+            udp_off = True
         # you could handle other client messages here if needed
 
-    # --- World (single-player mechanics, duplicated for 2 birds) ---
-    def reset_game():
-        nonlocal bird1, bird2, pipes, score1, score2, game_over1, game_over2, passed_p1, passed_p2
-        bird1 = Bird(300, 400, "human")  # host (red)
-        bird2 = Bird(300, 500, "ai")     # client (cyan)
-        bird2.x = bird1.x - 100
-        pipes = [Pipe(800)]
-        score1 = 0
-        score2 = 0
-        game_over1 = False
-        game_over2 = False
-        passed_p1 = set()  # type: Set[Pipe]
-        passed_p2 = set()  # type: Set[Pipe]
-
-    bird1 = bird2 = None
-    pipes: List[Pipe] = []
-    passed_p1: Set[Pipe] = set()
-    passed_p2: Set[Pipe] = set()
-    score1 = score2 = 0
-    game_over1 = game_over2 = False
-    reset_game()
+    # --- World: host bird (red) is player 1, client bird (cyan) player 2 ---
+    match = Match(2, random.getrandbits(32), WIN_WIDTH, WIN_HEIGHT)
 
     last_state_sent = 0.0
-    SEND_HZ = 30
+    SEND_HZ = 30          # JSON clients
+    BINARY_SEND_HZ = 60   # clients that negotiated the binary protocol: every frame
     dots = 0
 
     def send_state():
         if not conn:
             return
-        state = {
-            "type": "state",
-            "p1": {"x": bird1.x, "y": bird1.y, "tilt": bird1.tilt, "alive": not game_over1, "score": score1},
-            "p2": {"x": bird2.x, "y": bird2.y, "tilt": bird2.tilt, "alive": not game_over2, "score": score2},
-            "pipes": [{"x": p.x, "top": p.top, "bottom": p.bottom} for p in pipes],
-            "game_over1": game_over1,
-            "game_over2": game_over2,
-            "w": WIN_WIDTH, "h": WIN_HEIGHT,
-        }
-        send_json(conn, state)
+        if (conn.version or 0) >= protocol.DELTA_VERSION:
+            players = [(b.x, b.y, b.tilt, not out, score, b.vel)
+                       for b, out, score in zip(match.birds, match.over, match.scores)]
+            snap = encoder.snapshot(match.tick, players, match.pipes, Pipe.VEL,
+                                    last_input=last_input, slack=last_slack)
+            if udp is not None and not udp_off and udp.peer is not None:
+                udp.send(snap)
+            else:
+                conn.send(snap)
+            return
+        conn.send(match.state())
 
     def tell_client_close():
         try:
             if conn:
-                send_json(conn, {"type": "close"})
+                conn.send({"type": "close"})
         except Exception:
             pass
 
     run = True
     while run:
         clock.tick(FPS)
+        PROFILER.begin_frame()
 
         # Accept client without freezing
         if not conn:
-            try:
-                conn, addr = server.accept()
-                print(f"[HOST] Client connected from {addr}")
-            except socket.timeout:
-                pass
-            except OSError:
-                pass
-
-        # Start reader thread once
+            conn = server.accept()
+            if conn:
+                print(f"[HOST] Client connected from {conn.peer}")
+
+        # Start reading once
         if conn and not reader_started:
-            start_reader(conn, on_msg)
+            conn.start_reader(on_msg)
             reader_started = True
 
+        # Protocol 4: offer the UDP state channel once
+        if conn and not udp_offered and (conn.version or 0) >= protocol.DELTA_VERSION and udp_sock is not None:
+            token = random.getrandbits(32)
+            udp = AsyncDatagramChannel(udp_sock, token, protocol.CODEC)
+            udp.start_reader(inbox.put)
+            conn.send({"type": "udp", "port": port, "token": token})
+            udp_offered = True
+
+        # Lockstep: offer a seeded match once; it starts when the client says ok
+        if conn and lockstep and offered_lock is None and (conn.version or 0) >= protocol.DELTA_VERSION:
+            seed = random.getrandbits(32)
+            offered_lock = Lockstep(0, 2, seed, input_delay)
+            conn.send({"type": "lockstep", "seed": seed, "delay": input_delay, "players": 2, "you": 1})
+
+        # Everything the client sent since the last frame
+        for _, msg in inbox.drain():
+            handle(msg)
+
         # Host input
+        flags = [0, 0]
         for event in pygame.event.get():
+            if PROFILER.handle_event(event):
+                continue
             if event.type == pygame.QUIT:
                 # back to menu via window X
                 tell_client_close()
@@ -146,10 +199,11 @@ def main(host="0.0.0.0", port=50007):
                     # back to menu via M (no pygame.quit here!)
                     tell_client_close()
                     run = False
-                elif event.key == pygame.K_SPACE and not game_over1:
-                    bird1.jump()
-                elif event.key == pygame.K_r and (game_over1 and game_over2):
-                    reset_game()
+                elif event.key == pygame.K_SPACE:
+                    flags[0] |= FLAP
+                elif event.key == pygame.K_r:
+                    flags[0] |= RESTART
+        PROFILER.lap("input")
 
         # Waiting screen until client connects
         if not conn and run:
@@ -172,82 +226,68 @@ def main(host="0.0.0.0", port=50007):
                 )
                 y += 28
             pygame.display.update()
+            screen.invalidate()
             continue
 
         if not run:
             break
 
-        # Apply client flap
-        if remote_flap and not game_over2:
-            bird2.jump()
-        remote_flap = False
-
-        # ---- Game step (same as single-player, per bird) ----
-        if not (game_over1 and game_over2):
-            if not game_over1:
-                bird1.move()
-            if not game_over2:
-                bird2.move()
-
-            remove = []
-            for pipe in pipes:
-                pipe.move()
-
-                # Collisions
-                if not game_over1 and pipe.collide(bird1):
-                    game_over1 = True
-                if not game_over2 and pipe.collide(bird2):
-                    game_over2 = True
-
-                # Bounds
-                if not game_over1 and (bird1.y > WIN_HEIGHT or bird1.y < 0):
-                    game_over1 = True
-                if not game_over2 and (bird2.y > WIN_HEIGHT or bird2.y < 0):
-                    game_over2 = True
-
-                # Independent scoring (only while that player is alive)
-                if (not game_over1) and (pipe.x + pipe.PIPE_TOP.get_width() < bird1.x) and (pipe not in passed_p1):
-                    score1 += 1
-                    passed_p1.add(pipe)
-                if (not game_over2) and (pipe.x + pipe.PIPE_TOP.get_width() < bird2.x) and (pipe not in passed_p2):
-                    score2 += 1
-                    passed_p2.add(pipe)
-
-                # Remove off-screen
-                if pipe.x + pipe.PIPE_TOP.get_width() < 0:
-                    remove.append(pipe)
-
-            for r in remove:
-                passed_p1.discard(r)
-                passed_p2.discard(r)
-                pipes.remove(r)
-
-            if pipes and pipes[-1].x < 450:
-                pipes.append(Pipe(WIN_WIDTH))
+        if lock is not None:
+            # Lockstep: both ends play the same ticks from the same inputs
+            lock.press(flags[0])
+            lock.advance(PROFILER)
+            msg = lock.message()
+            if msg is not None:
+                conn.send(msg)
+            if lock.desync is not None or desync_reported or lock.stuck:
+                why = "client gone" if lock.stuck else f"desync at tick {lock.desync or '?'}"
+                print(f"[HOST] Lockstep off ({why}), streaming state")
+                match = lock.match
+                lock = offered_lock = None
+                lockstep = False
+                conn.send({"type": "lockstep_off"})
+                encoder.request_keyframe()
+        else:
+            # Apply client flap
+            if remote_flap:
+                flags[1] |= FLAP
+            remote_flap = False
+
+            # Tagged flaps land on the tick the client predicted them for
+            # (or on the next one, if they got here too late for it)
+            next_tick = match.tick + 1
+            for flap in [f for f in due if match.finished or f[1] <= next_tick]:
+                due.remove(flap)
+                fid, _, last_slack = flap
+                last_input = max(last_input, fid)
+                flags[1] |= FLAP
+
+            # ---- Game step (same as single-player, per bird) ----
+            match.step(flags, PROFILER)
+
+        PROFILER.lap("sim")
 
         # ---- Draw ----
-        win.blit(BG, (0, 0))
-        for pipe in pipes:
-            pipe.draw(win)
-        # Draw birds ONLY if alive (vanish on death)
-        if not game_over1:
-            bird1.draw(win)
-        if not game_over2:
-            bird2.draw(win)
+        # Only what moved is redrawn and updated
+        screen.begin()
+        world = lock.match if lock is not None else match
+        world.draw(screen)
+        score1, score2 = world.scores
+        game_over1, game_over2 = world.over
 
         # Small side HUD scores
-        render_outlined_text(win, f"You: {score1}", HUD_FONT, (70, 30),
+        render_outlined_text(screen, f"You: {score1}", HUD_FONT, (70, 30),
                              P1_COLOR, SCORE_OUTLINE, SCORE_FILL)
-        render_outlined_text(win, f"P2: {score2}", HUD_FONT, (WIN_WIDTH - 70, 30),
+        render_outlined_text(screen, f"P2: {score2}", HUD_FONT, (WIN_WIDTH - 70, 30),
                              P2_COLOR, SCORE_OUTLINE, SCORE_FILL)
 
         # Small OUT tag if one player is out
         if game_over1 ^ game_over2:
             if game_over1:
-                render_outlined_text(win, "You OUT", HUD_FONT, (70, 60),
+                render_outlined_text(screen, "You OUT", HUD_FONT, (70, 60),
                                      TAG_COLOR, SCORE_OUTLINE, SCORE_FILL)
             if game_over2:
-                render_outlined_text(win, "P2 OUT", HUD_FONT, (WIN_WIDTH - 70, 60),
+                render_outlined_text(screen, "P2 OUT", HUD_FONT, (WIN_WIDTH - 70, 60),
                                      TAG_COLOR, SCORE_OUTLINE, SCORE_FILL)
 
         # Final banner when both are out (WIN / LOSE / DRAW)
@@ -259,25 +299,36 @@ def main(host="0.0.0.0", port=50007):
             else:
                 result = "DRAW!"
 
-            render_outlined_text(win, result, FINAL_SCORE_FONT,
+            render_outlined_text(screen, result, FINAL_SCORE_FONT,
                                  (WIN_WIDTH // 2, WIN_HEIGHT // 2 - 40),
                                  SCORE_FILL, SCORE_OUTLINE, SCORE_FILL)
-            render_outlined_text(win, f"You: {score1}   P2: {score2}", FINAL_SCORE_FONT,
+            render_outlined_text(screen, f"You: {score1}   P2: {score2}", FINAL_SCORE_FONT,
                                  (WIN_WIDTH // 2, WIN_HEIGHT // 2 + 20),
                                  SCORE_FILL, SCORE_OUTLINE, SCORE_FILL)
-            render_outlined_text(win, "Press R to restart or M for menu", HUD_FONT,
+            render_outlined_text(screen, "Press R to restart or M for menu", HUD_FONT,
                                  (WIN_WIDTH // 2, WIN_HEIGHT // 2 + 90),
                                  SCORE_FILL, SCORE_OUTLINE, SCORE_FILL)
 
-        pygame.display.update()
+        PROFILER.lap("render")
+        PROFILER.draw(screen)
+        screen.present()
+        PROFILER.lap("flip")
 
-        # Send state ~30 Hz
+        # Send state ~30 Hz (60 Hz over the binary protocol); nothing in lockstep
         now = time.time()
-        if now - last_state_sent >= 1.0 / SEND_HZ:
+        send_hz = BINARY_SEND_HZ if conn.binary else SEND_HZ
+        if lock is None and now - last_state_sent >= 1.0 / send_hz - 0.002:
             send_state()
             last_state_sent = now
+        # Everything this frame produced goes out as one write; a slow client
+        # only ever costs it queued (and dropped) snapshots, never time
+        conn.flush()
 
     # ---- Cleanup (do NOT pygame.quit — we return to menu) ----
+    if conn:
+        st = conn.stats
+        print(f"[HOST] Sent {st['sent']} messages in {st.get('writes', st['sent'])} writes, "
+              f"dropped {st.get('dropped', 0)} stale snapshots, queue depth max {st.get('queue_max', 0)}")
     try:
         if conn:
             tell_client_close()
@@ -285,8 +336,21 @@ def main(host="0.0.0.0", port=50007):
     except Exception:
         pass
     server.close()
+    inbox.close()
+    if udp is not None:
+        udp.close()   # its transport on the shared loop closes the socket
+    elif udp_sock is not None:
+        udp_sock.close()
     # Just return to the caller (menu)
     return
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=50007)
+    parser.add_argument("--lockstep", action="store_true",
+                        help="exchange inputs only and run the match on both ends")
+    parser.add_argument("--input-delay", type=int, default=INPUT_DELAY,
+                        help="lockstep ticks between a key press and its tick")
+    args = parser.parse_args()
+    main(port=args.port, lockstep=args.lockstep, input_delay=args.input_delay)
@@ -0,0 +1,124 @@
+# prediction.py
+#
+# Client-side prediction of the local bird for LAN play (protocol 4). The
+# client runs its own bird with the shared Bird physics `lead` ticks ahead of
+# the newest host snapshot and tags every flap with the host tick it is meant
+# for, so the host applies it at the same step the client already showed it.
+#
+# Each snapshot carries the host's bird (y, vel) at its tick, the id of the
+# newest flap the host applied and how early that flap arrived (slack, in
+# ticks). Reconciling resets the bird to the host's and replays the flaps the
+# host hasn't applied yet up to the predicted tick; a misprediction therefore
+# lasts at most one snapshot. Flaps that keep arriving late push lead up,
+# flaps with ticks to spare bring it back down. When the two frame rates
+# drift apart, step() runs a tick more or less per frame to catch up.
+import threading
+
+LEAD = 6                 # ticks ahead of the newest snapshot to start with
+MIN_LEAD, MAX_LEAD = 1, 60
+SPARE_SLACK = 2          # a flap this many ticks early lets lead drop by one
+DRIFT = 8                # ticks off the expected lead before the clock is reset
+
+class Predictor:
+    """set_authoritative() from the network thread; add() / update() / step() once per frame."""
+
+    def __init__(self, bird, key="p2", lead=LEAD):
+        self.bird = bird
+        self.key = key
+        self.lead = lead
+        self.tick = None             # predicted tick the bird is at; None until the first snapshot
+        self.pending = []            # [flap id, tick] not applied by the host yet
+        self.latest = None           # newest snapshot state, set by the reader thread
+        self.reconciled = None       # the one update() last reconciled against
+        self.last_slack_id = 0
+        self.drift = 0               # predicted tick minus where it should be
+        self.lock = threading.Lock()
+        self.stats = {"flaps": 0, "late": 0, "corrections": 0, "resyncs": 0, "skipped": 0, "doubled": 0}
+
+    @property
+    def next_tick(self):
+        """Tick a flap made now is tagged with (0: apply on arrival)."""
+        return 0 if self.tick is None else self.tick + 1
+
+    def add(self, fid, tick):
+        """A local flap, already tagged; shows on the next step()."""
+        self.pending.append([fid, tick])
+        self.stats["flaps"] += 1
+
+    def set_authoritative(self, state):
+        with self.lock:
+            self.latest = state
+
+    def update(self):
+        """Reconcile with the newest snapshot, if a new one came in."""
+        with self.lock:
+            state = self.latest
+        if state is None or state is self.reconciled:
+            return
+        self.reconciled = state
+        auth_tick = state["tick"]
+        last_input = state.get("input", 0)
+        self.pending = [p for p in self.pending if p[0] > last_input]
+
+        # How early the newest applied flap got there
+        if last_input > self.last_slack_id:
+            self.last_slack_id = last_input
+            slack = state.get("slack", 0)
+            if slack < 0:
+                self.stats["late"] += 1
+                self.lead = min(MAX_LEAD, self.lead - slack + 1)
+            elif slack > SPARE_SLACK:
+                self.lead = max(MIN_LEAD, self.lead - 1)
+
+        target = auth_tick + self.lead
+        if self.tick is None or abs(self.tick - target) > DRIFT:
+            if self.tick is not None:
+                self.stats["resyncs"] += 1
+            self.tick = target
+        self.drift = self.tick - target
+
+        player = state.get(self.key)
+        if not player or "vel" not in player or not player.get("alive", True):
+            return
+        bird = self.bird
+        before = bird.y
+        jump_frame = bird.jump_frame
+        bird.y, bird.vel = player["y"], player["vel"]
+        # The host applies what is still pending at its next step at the earliest
+        for t in range(auth_tick + 1, self.tick + 1):
+            self._advance(t, auth_tick + 1)
+        bird.jump_frame = jump_frame
+        if abs(bird.y - before) >= 1:   # a pixel or more: visible
+            self.stats["corrections"] += 1
+
+    def step(self):
+        """Advance the bird one tick (call once per frame, after update())."""
+        if self.tick is None:
+            return
+        if self.drift > 1:
+            # Ahead of the host: let it catch up
+            self.drift -= 1
+            self.stats["skipped"] += 1
+            return
+        steps = 1
+        if self.drift < -1:
+            self.drift += 1
+            self.stats["doubled"] += 1
+            steps = 2
+        for _ in range(steps):
+            self.tick += 1
+            self._advance(self.tick, 0)
+
+    def _advance(self, tick, earliest):
+        # Flaps tagged before `earliest` land on it
+        if any(max(t, earliest) == tick for _, t in self.pending):
+            self.bird.jump()
+        self.bird.move()
+
+    def pipes(self):
+        """The newest snapshot's pipes moved on to the predicted tick."""
+        state = self.reconciled
+        if state is None:
+            return []
+        ahead = self.tick - state["tick"]
+        return [dict(p, x=p["x"] - p.get("vel", 0) * ahead) for p in state.get("pipes", ())]
@@ -0,0 +1,249 @@
+# protocol.py
+#
+# Binary encoding of the LAN messages, negotiated per connection:
+#
+#   client -> host   {"type": "hello", "versions": [5, 1]}    (JSON)
+#   host -> client   {"type": "welcome", "version": 5}        (JSON, then binary)
+#   client -> host   {"type": "upgrade"}                      (JSON, then binary)
+#
+# A host that doesn't know "hello" never answers and a client that never sends
+# it is never welcomed, so older peers keep talking JSON. The game code only
+# sees dicts: the codec turns the same dicts into struct-packed bodies, with
+# coordinates as 1/16 px fixed point in int16. Messages it has no layout for
+# travel as a JSON body inside a binary frame.
+#
+# Version 1 peers exchange full "state"s and untagged "input"s. Version 5
+# peers exchange delta snapshots ("snap", "ack", "keyframe", snapshots.py)
+# and tick-tagged "inputs" (inputs.py, prediction.py), over UDP when it gets
+# through:
+#
+#   host -> client   {"type": "udp", "port": p, "token": t}   (TCP)
+#   client -> host   {"type": "udp_hello"} ...                 (UDP, until a snap arrives)
+#   host -> client   "snap" ...                                 (UDP)
+#   client -> host   "inputs": ack + the recent flaps           (UDP, every frame)
+#
+# If no snapshot arrives over UDP within UDP_TIMEOUT the client sends
+# {"type": "udp_off"} over TCP and both stay on TCP. Handshake, keyframe
+# requests and close always go over TCP. The codec only has the newest
+# snapshot layout, so peers on versions 2 to 4 settle on version 1. Version 5
+# peers can also play in lockstep and exchange only "lock" inputs over TCP,
+# see lockstep.py.
+import json
+import struct
+
+VERSION = 5
+SUPPORTED = (5, 1)
+DELTA_VERSION = 5                    # delta snapshots, UDP and tagged inputs (the one binary layout)
+FIXED = 16                           # coordinate units per pixel
+FIXED_MIN, FIXED_MAX = -32768, 32767 # int16, i.e. about +-2048 px
+VEL_FIXED = 256                      # bird velocity units per px/tick: replayed for many ticks on the client
+
+# Body type byte
+MSG_JSON, MSG_STATE, MSG_INPUT, MSG_CLOSE, MSG_SNAP, MSG_ACK, MSG_KEYFRAME, MSG_INPUTS, MSG_LOCK = range(9)
+ACTIONS = ("flap",)
+
+TYPE = struct.Struct("<B")
+STATE_HEAD = struct.Struct("<BHHBB")   # type, w, h, players, pipes
+PLAYER = "hhhBH"                       # x, y, tilt, alive, score
+PIPE = "hhh"                           # x, top, bottom
+INPUT = struct.Struct("<BB")           # type, action
+# type, seq, age (0: keyframe), tick, host ms, last flap applied, its slack, players, spawns, despawns
+SNAP_HEAD = struct.Struct("<BHBIIIbBBB")
+SNAP_FIELDS = (("x", "h"), ("y", "h"), ("tilt", "h"), ("alive", "B"), ("score", "H"), ("vel", "h"))
+SPAWN = struct.Struct("<HIhhhh")       # pipe id, tick, x, velocity, top, bottom
+ACK = struct.Struct("<BH")             # type, seq
+INPUTS = struct.Struct("<BIIB")        # type, acked snap seq (NO_ACK: none), last flap id, flaps repeated; then their ticks (I)
+NO_ACK = 0xFFFFFFFF
+LOCK = struct.Struct("<BBIIIB")        # type, player, upto, checksum tick (0: none), checksum, presses; then (tick I, flags B)
+
+# (players, pipes) -> Struct of a whole state body
+_STATE_STRUCTS = {}
+
+def _state_struct(n_players, n_pipes):
+    key = (n_players, n_pipes)
+    s = _STATE_STRUCTS.get(key)
+    if s is None:
+        s = _STATE_STRUCTS[key] = struct.Struct(STATE_HEAD.format + PLAYER * n_players + PIPE * n_pipes)
+    return s
+
+PLAYER_KEYS = tuple(f"p{i}" for i in range(1, 256))
+GAME_OVER_KEYS = tuple(f"game_over{i}" for i in range(1, 256))
+
+def _players(msg):
+    """p1, p2, ... in order."""
+    players = []
+    for key in PLAYER_KEYS:
+        p = msg.get(key)
+        if p is None:
+            break
+        players.append(p)
+    return players
+
+# field mask -> Struct of the fields present (snap players send changed fields only)
+_MASK_STRUCTS = {}
+
+def _mask_struct(mask):
+    s = _MASK_STRUCTS.get(mask)
+    if s is None:
+        s = _MASK_STRUCTS[mask] = struct.Struct("<" + "".join(f for i, (_, f) in enumerate(SNAP_FIELDS) if mask >> i & 1))
+    return s
+
+def _clamp(values):
+    # Only on the slow path: something was out of int16 / uint16 range
+    lo, hi = FIXED_MIN, FIXED_MAX
+    return [max(lo, min(hi, v)) if i >= 5 else v for i, v in enumerate(values)]
+
+class BinaryCodec:
+    """encode(dict) -> bytes and decode(bytes) -> dict for Connection's binary frames."""
+
+    version = VERSION
+
+    def encode(self, msg):
+        kind = msg.get("type")
+        if kind == "state":
+            players = _players(msg)
+            pipes = msg["pipes"]
+            values = [MSG_STATE, msg.get("w", 0), msg.get("h", 0), len(players), len(pipes)]
+            for p in players:
+                values += (int(p["x"] * FIXED), int(p["y"] * FIXED), int(p["tilt"] * FIXED),
+                           bool(p["alive"]), p["score"])
+            for p in pipes:
+                values += (int(p["x"] * FIXED), int(p["top"] * FIXED), int(p["bottom"] * FIXED))
+            body = _state_struct(len(players), len(pipes))
+            try:
+                return body.pack(*values)
+            except struct.error:
+                return body.pack(*_clamp(values))
+        if kind == "snap":
+            return self._encode_snap(msg)
+        if kind == "ack":
+            return ACK.pack(MSG_ACK, msg["seq"])
+        if kind == "keyframe":
+            return TYPE.pack(MSG_KEYFRAME)
+        if kind == "inputs":
+            ack = msg["ack"]
+            ticks = msg["ticks"]
+            return struct.pack(INPUTS.format + "I" * len(ticks), MSG_INPUTS,
+                               NO_ACK if ack is None else ack, msg["last"], len(ticks), *ticks)
+        if kind == "lock":
+            flaps = msg["flaps"]
+            tick, crc = msg["sum"] or (0, 0)
+            return struct.pack(LOCK.format + "IB" * len(flaps), MSG_LOCK, msg["player"], msg["upto"],
+                               tick, crc, len(flaps), *[v for flap in flaps for v in flap])
+        if kind == "input" and msg.get("action") in ACTIONS and len(msg) == 2:
+            return INPUT.pack(MSG_INPUT, ACTIONS.index(msg["action"]))
+        if kind == "close" and len(msg) == 1:
+            return TYPE.pack(MSG_CLOSE)
+        return TYPE.pack(MSG_JSON) + json.dumps(msg, separators=(",", ":")).encode("utf-8")
+
+    def _encode_snap(self, msg):
+        fmt = [SNAP_HEAD.format]
+        values = [MSG_SNAP, msg["seq"], msg["age"], msg["tick"], msg["ms"], msg["input"], msg["slack"],
+                  len(msg["players"]), len(msg["spawn"]), len(msg["despawn"])]
+        for p in msg["players"]:
+            mask = 0
+            fields = []
+            for i, (name, _) in enumerate(SNAP_FIELDS):
+                if name in p:
+                    mask |= 1 << i
+                    fields.append(p[name])
+            fmt.append("B" + _mask_struct(mask).format[1:])
+            values.append(mask)
+            values += fields
+        fmt.append(SPAWN.format[1:] * len(msg["spawn"]) + "H" * len(msg["despawn"]))
+        for spawn in msg["spawn"]:
+            values += spawn
+        values += msg["despawn"]
+        return struct.pack("".join(fmt), *values)
+
+    def _decode_snap(self, body):
+        _, seq, age, tick, ms, last_input, slack, n_players, n_spawn, n_despawn = SNAP_HEAD.unpack_from(body)
+        offset = SNAP_HEAD.size
+        players = []
+        for _ in range(n_players):
+            mask = body[offset]
+            fields = _mask_struct(mask)
+            values = fields.unpack_from(body, offset + 1)
+            offset += 1 + fields.size
+            names = [name for i, (name, _) in enumerate(SNAP_FIELDS) if mask >> i & 1]
+            players.append(dict(zip(names, values)))
+        spawn = [SPAWN.unpack_from(body, offset + i * SPAWN.size) for i in range(n_spawn)]
+        offset += n_spawn * SPAWN.size
+        despawn = list(struct.unpack_from(f"<{n_despawn}H", body, offset))
+        return {"type": "snap", "seq": seq, "age": age, "tick": tick, "ms": ms,
+                "input": last_input, "slack": slack, "players": players, "spawn": spawn, "despawn": despawn}
+
+    def decode(self, body):
+        kind = body[0]
+        if kind == MSG_SNAP:
+            return self._decode_snap(body)
+        if kind == MSG_ACK:
+            return {"type": "ack", "seq": ACK.unpack_from(body)[1]}
+        if kind == MSG_KEYFRAME:
+            return {"type": "keyframe"}
+        if kind == MSG_INPUTS:
+            _, ack, last, count = INPUTS.unpack_from(body)
+            ticks = list(struct.unpack_from(f"<{count}I", body, INPUTS.size))
+            return {"type": "inputs", "ack": None if ack == NO_ACK else ack, "last": last, "ticks": ticks}
+        if kind == MSG_LOCK:
+            _, player, upto, tick, crc, count = LOCK.unpack_from(body)
+            values = struct.unpack_from("<" + "IB" * count, body, LOCK.size)
+            return {"type": "lock", "player": player, "upto": upto,
+                    "flaps": [list(flap) for flap in zip(values[::2], values[1::2])],
+                    "sum": [tick, crc] if tick else None}
+        if kind == MSG_STATE:
+            _, w, h, n_players, n_pipes = STATE_HEAD.unpack_from(body)
+            values = _state_struct(n_players, n_pipes).unpack(body)
+            msg = {"type": "state", "w": w, "h": h}
+            i = 5   # past the head fields
+            for k in range(n_players):
+                x, y, tilt, alive, score = values[i:i + 5]
+                msg[PLAYER_KEYS[k]] = {"x": x / FIXED, "y": y / FIXED, "tilt": tilt / FIXED,
+                                       "alive": alive == 1, "score": score}
+                msg[GAME_OVER_KEYS[k]] = alive == 0
+                i += 5
+            msg["pipes"] = [{"x": x / FIXED, "top": top / FIXED, "bottom": bottom / FIXED}
+                            for x, top, bottom in zip(*[iter(values[i:])] * 3)]
+            return msg
+        if kind == MSG_INPUT:
+            return {"type": "input", "action": ACTIONS[body[1]]}
+        if kind == MSG_CLOSE:
+            return {"type": "close"}
+        if kind == MSG_JSON:
+            return json.loads(bytes(body[1:]).decode("utf-8"))
+        raise ValueError(f"unknown message type {kind}")
+
+CODEC = BinaryCodec()
+
+# -------------------------
+# Negotiation
+# -------------------------
+
+UDP_TIMEOUT = 2.0   # seconds
+
+def hello(conn):
+    """Client side: offer the binary formats (call after the reader started)."""
+    conn.send({"type": "hello", "versions": list(SUPPORTED)})
+
+def handle_handshake(conn, msg):
+    """
+    Call first in on_msg on both ends. Switches conn's directions as the
+    handshake goes; returns True if msg was part of it.
+    """
+    kind = msg.get("type")
+    if kind == "hello":
+        common = set(SUPPORTED) & set(msg.get("versions", ()))
+        if common:
+            conn.version = max(common)
+            conn.switch_tx(CODEC, {"type": "welcome", "version": conn.version})
+        return True
+    if kind == "welcome":
+        if msg.get("version") in SUPPORTED:
+            conn.version = msg["version"]
+            conn.switch_rx(CODEC)
+            conn.switch_tx(CODEC, {"type": "upgrade"})
+        return True
+    if kind == "upgrade":
+        conn.switch_rx(CODEC)
+        return True
+    return False
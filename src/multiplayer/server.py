@@ -0,0 +1,400 @@
+# server.py
+#
+# Headless authoritative match server: no window, no local player. One
+# process runs any number of rooms of 2 to MAX_PLAYERS players on the shared
+# event loop (ai/aio_net.py) at a fixed tick, with the same Match, Bird and
+# Pipe physics as the LAN host. Clients are the LAN client, unchanged apart
+# from the room code:
+#
+#   client -> server   {"type": "join", "room": "K3QX", "players": 2}   (optional)
+#   server -> client   {"type": "joined", "room": "K3QX", "you": i, "players": n}
+#   server -> client   {"type": "close", "reason": "..."}                (room full, server full)
+#
+# Joining an unknown code opens a room under it; a client that sends no
+# "join" within JOIN_WAIT (or one without a code) is put in the first public
+# room with a free seat. A round starts once every seat is taken, and the
+# next one RESTART_AFTER ticks after everyone is out. Every client sees
+# itself as p2 and the first other player as p1, as in a LAN game, so
+# prediction, tagged inputs and delta snapshots work as they do against a
+# host. Each room's world is quantized once per tick and delta-encoded per
+# seat.
+#
+# The CPU time of each room's ticks and of handling its players' messages is
+# charged to the room; `python -m src.multiplayer.server` reports the load
+# every REPORT_EVERY seconds, and `--bench N` measures N full rooms without
+# any sockets.
+import asyncio
+import random
+import time
+
+from ..ai.aio_net import AsyncServer, backend
+from ..core.pipe import Pipe
+from . import protocol
+from .inputs import InputReceiver
+from .match import FLAP, RESTART, Match
+from .snapshots import Quantizer, SnapshotEncoder
+
+TICK_RATE = 60
+MAX_PLAYERS = 8
+MAX_ROOMS = 500
+JOIN_WAIT = 0.5           # seconds a new connection has to send "join" before it is quick-matched
+RESTART_AFTER = 180       # ticks between everyone being out and the next round (3 s)
+MAX_BEHIND = 5            # ticks the loop catches up after a stall; further behind, it skips
+JSON_SEND_EVERY = 2       # ticks between states for JSON clients (30 Hz, as from the LAN host)
+REPORT_EVERY = 10.0       # seconds between load reports
+CODE_CHARS = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"   # no 0/O or 1/I
+CODE_LENGTH = 4
+
+def view_order(i, players):
+    """Player indices as player i sees them: the first other player, i, the rest."""
+    others = [j for j in range(players) if j != i]
+    return others[:1] + [i] + others[1:]
+
+class Seat:
+    """One player's connection and the input / snapshot state the room keeps for it."""
+
+    def __init__(self, conn, index, players, quantizer):
+        self.conn = conn
+        self.index = index
+        self.order = view_order(index, players)
+        self.encoder = SnapshotEncoder(quantizer=quantizer)
+        self.inputs = InputReceiver()
+        self.due = []             # (flap id, tick, slack) waiting for their tick
+        self.flap = False         # untagged flap (protocol 1)
+        self.last_input = 0       # newest flap applied, and how early it came
+        self.last_slack = 0
+
+    @property
+    def delta(self):
+        return (self.conn.version or 0) >= protocol.DELTA_VERSION
+
+    def handle(self, msg, next_tick):
+        kind = msg.get("type")
+        if kind == "input" and msg.get("action") == "flap":
+            self.flap = True
+        elif kind == "inputs":
+            self.due.extend((fid, tick, tick - next_tick) for fid, tick in self.inputs.receive(msg))
+            if msg["ack"] is not None:
+                self.encoder.ack(msg["ack"])
+        elif kind == "ack":
+            self.encoder.ack(msg["seq"])
+        elif kind == "keyframe":
+            self.encoder.request_keyframe()
+
+    def take(self, next_tick, finished):
+        """Input flags for the next tick: tagged flaps land on their tick (or the next one, if late)."""
+        flags = FLAP if self.flap else 0
+        self.flap = False
+        for flap in [f for f in self.due if finished or f[1] <= next_tick]:
+            self.due.remove(flap)
+            fid, _, self.last_slack = flap
+            self.last_input = max(self.last_input, fid)
+            flags |= FLAP
+        return flags
+
+class Room:
+    def __init__(self, code, players=2, public=False, seed=None):
+        self.code = code
+        self.public = public
+        self.match = Match(players, random.getrandbits(32) if seed is None else seed)
+        self.quantizer = Quantizer()
+        self.seats = [None] * players
+        self.started = False
+        self.out_for = 0          # ticks since everyone went out
+        self.ticks = 0
+        self.cpu = 0.0            # seconds of CPU spent on this room
+        self.worst = 0.0          # most CPU one tick took
+
+    @property
+    def players(self):
+        return sum(seat is not None for seat in self.seats)
+
+    @property
+    def open(self):
+        return not self.started and None in self.seats
+
+    def join(self, conn):
+        i = self.seats.index(None)
+        seat = self.seats[i] = Seat(conn, i, len(self.seats), self.quantizer)
+        return seat
+
+    def leave(self, seat):
+        self.seats[seat.index] = None
+        if self.started:
+            self.match.over[seat.index] = True   # out of this round; the others play on
+
+    def charge(self, since):
+        """Add the CPU time since `since` (time.thread_time()) to this room."""
+        spent = time.thread_time() - since
+        self.cpu += spent
+        return spent
+
+    def tick(self):
+        since = time.thread_time()
+        match = self.match
+        if self.started:
+            next_tick = match.tick + 1
+            flags = [seat.take(next_tick, match.finished) if seat else 0 for seat in self.seats]
+            if match.finished:
+                self.out_for += 1
+                if self.out_for >= RESTART_AFTER:
+                    self.out_for = 0
+                    flags[0] |= RESTART
+                    # Back to waiting if someone left during the round
+                    self.started = None not in self.seats
+            match.step(flags)
+        elif None not in self.seats:
+            self.started = True
+        self.ticks += 1
+        self.send()
+        self.worst = max(self.worst, self.charge(since))
+
+    def send(self):
+        match = self.match
+        frame = None
+        for seat in self.seats:
+            if seat is None:
+                continue
+            conn = seat.conn
+            if seat.delta:
+                if frame is None:
+                    players = [(b.x, b.y, b.tilt, not out, score, b.vel)
+                               for b, out, score in zip(match.birds, match.over, match.scores)]
+                    frame = self.quantizer.frame(match.tick, players, match.pipes, Pipe.VEL)
+                tick, players, pipes = frame
+                conn.send(seat.encoder.encode((tick, [players[i] for i in seat.order], pipes),
+                                              last_input=seat.last_input, slack=seat.last_slack))
+            elif conn.binary or self.ticks % JSON_SEND_EVERY == 0:
+                conn.send(match.state(seat.order))
+            conn.flush()
+
+class MatchServer:
+    def __init__(self, host="0.0.0.0", port=50007, tick_rate=TICK_RATE, max_rooms=MAX_ROOMS):
+        self.tick_rate = tick_rate
+        self.max_rooms = max_rooms
+        self.rooms = {}           # code -> Room
+        self.pending = []         # [conn, connected at] not in a room yet
+        self.seats = {}           # conn -> (Room, Seat)
+        self.listener = AsyncServer(host, port, backlog=128)
+        self.stats = {"ticks": 0, "late": 0, "skipped": 0, "joined": 0, "refused": 0}
+        self.tick_time = 0.0      # wall time of the ticks since the last report
+        self.tick_worst = 0.0
+        self.reported = (time.monotonic(), 0)
+
+    # -------------------------
+    # Rooms
+    # -------------------------
+
+    def new_code(self):
+        while True:
+            code = "".join(random.choice(CODE_CHARS) for _ in range(CODE_LENGTH))
+            if code not in self.rooms:
+                return code
+
+    def refuse(self, conn, reason):
+        self.stats["refused"] += 1
+        conn.send({"type": "close", "reason": reason})
+        conn.close()
+
+    def join(self, conn, code=None, players=2):
+        """Seat conn in room `code` (opened if new), or in a public room if code is None."""
+        if code is None:
+            room = next((r for r in self.rooms.values() if r.public and r.open and len(r.seats) == players), None)
+        else:
+            room = self.rooms.get(code)
+            if room is not None and not room.open:
+                return self.refuse(conn, f"room {code} is full")
+        if room is None:
+            if len(self.rooms) >= self.max_rooms:
+                return self.refuse(conn, "server full")
+            room = Room(code or self.new_code(), players, public=code is None)
+            self.rooms[room.code] = room
+            print(f"[SERVER] Room {room.code} opened ({players} players)")
+        seat = room.join(conn)
+        self.seats[conn] = (room, seat)
+        self.stats["joined"] += 1
+        conn.send({"type": "joined", "room": room.code, "you": seat.index, "players": len(room.seats)})
+
+    def close_room(self, room):
+        del self.rooms[room.code]
+        load = room.cpu / room.ticks * 1000 if room.ticks else 0.0
+        print(f"[SERVER] Room {room.code} closed after {room.ticks} ticks, "
+              f"CPU {load:.3f} ms/tick (worst {room.worst * 1000:.2f} ms)")
+
+    # -------------------------
+    # Network (all on the loop thread)
+    # -------------------------
+
+    def on_msg(self, conn, msg):
+        if protocol.handle_handshake(conn, msg):
+            return
+        entry = self.seats.get(conn)
+        if entry is not None:
+            room, seat = entry
+            since = time.thread_time()
+            seat.handle(msg, room.match.tick + 1)
+            room.charge(since)
+        elif msg.get("type") == "join" and any(p[0] is conn for p in self.pending):
+            self.pending = [p for p in self.pending if p[0] is not conn]
+            code = str(msg.get("room") or "").strip().upper()[:CODE_LENGTH * 2] or None
+            players = msg.get("players", 2)
+            players = max(2, min(MAX_PLAYERS, players if isinstance(players, int) else 2))
+            self.join(conn, code, players)
+            conn.flush()
+
+    def accept(self):
+        now = time.monotonic()
+        while True:
+            conn = self.listener.accept()
+            if conn is None:
+                break
+            conn.start_reader(lambda msg, conn=conn: self.on_msg(conn, msg))
+            self.pending.append([conn, now])
+        # No "join" in time: quick match
+        for entry in [p for p in self.pending if now - p[1] >= JOIN_WAIT or p[0].closed]:
+            self.pending.remove(entry)
+            if not entry[0].closed:
+                self.join(entry[0])
+
+    def drop_closed(self):
+        for conn in [c for c in self.seats if c.closed]:
+            room, seat = self.seats.pop(conn)
+            room.leave(seat)
+            if not room.players:
+                self.close_room(room)
+
+    # -------------------------
+    # Tick loop
+    # -------------------------
+
+    def step(self):
+        start = time.perf_counter()
+        self.accept()
+        self.drop_closed()
+        for room in list(self.rooms.values()):
+            room.tick()
+        self.stats["ticks"] += 1
+        spent = time.perf_counter() - start
+        self.tick_time += spent
+        self.tick_worst = max(self.tick_worst, spent)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        period = 1.0 / self.tick_rate
+        due = loop.time()
+        while True:
+            self.step()
+            due += period
+            delay = due - loop.time()
+            if delay < 0:
+                self.stats["late"] += 1
+                if delay < -MAX_BEHIND * period:
+                    # Too far behind to catch up: drop the missed ticks
+                    self.stats["skipped"] += int(-delay / period)
+                    due = loop.time()
+            if time.monotonic() - self.reported[0] >= REPORT_EVERY:
+                self.report()
+            await asyncio.sleep(max(0.0, delay))
+
+    def report(self):
+        now = time.monotonic()
+        since, ticks_then = self.reported
+        ticks = self.stats["ticks"] - ticks_then
+        self.reported = (now, self.stats["ticks"])
+        avg = self.tick_time / ticks * 1000 if ticks else 0.0
+        playing = sum(r.started for r in self.rooms.values())
+        players = sum(r.players for r in self.rooms.values())
+        line = (f"[SERVER] {len(self.rooms)} rooms ({playing} playing), {players} players, "
+                f"tick {avg:.2f} ms avg / {self.tick_worst * 1000:.2f} ms max of {1000 / self.tick_rate:.1f} ms, "
+                f"{self.stats['late']} late, {self.stats['skipped']} skipped")
+        if self.rooms:
+            busiest = max(self.rooms.values(), key=lambda r: r.cpu / max(1, r.ticks))
+            line += f"; busiest {busiest.code} {busiest.cpu / max(1, busiest.ticks) * 1000:.3f} ms/tick"
+        print(line)
+        self.tick_time = self.tick_worst = 0.0
+
+    def close(self):
+        self.listener.close()
+        for conn, _ in self.pending:
+            conn.close()
+        for conn in list(self.seats):
+            self.refuse(conn, "server shutting down")
+
+# -------------------------
+# Benchmark
+# -------------------------
+
+def bench(rooms=300, players=2, ticks=600, flap_chance=0.03):
+    """CPU per tick for `rooms` full rooms of protocol 4 clients that ack every snapshot (no sockets)."""
+
+    class _Client:
+        # Encodes what a connection would send and acks snapshots right away
+        version = protocol.VERSION
+        binary = True
+        closed = False
+
+        def __init__(self):
+            self.seat = None
+            self.bytes = 0
+
+        def send(self, msg):
+            self.bytes += len(protocol.CODEC.encode(msg))
+            if msg["type"] == "snap":
+                self.seat.encoder.ack(msg["seq"])
+
+        def flush(self):
+            pass
+
+    all_rooms = []
+    clients = []
+    for r in range(rooms):
+        room = Room(f"B{r}", players, seed=r)
+        for _ in range(players):
+            client = _Client()
+            client.seat = room.join(client)
+            clients.append(client)
+        all_rooms.append(room)
+
+    rng = random.Random(0)
+    start_cpu, start = time.process_time(), time.perf_counter()
+    for _ in range(ticks):
+        for client in clients:
+            if rng.random() < flap_chance:
+                client.seat.flap = True
+        for room in all_rooms:
+            room.tick()
+    cpu = (time.process_time() - start_cpu) / ticks
+    wall = (time.perf_counter() - start) / ticks
+    sent = sum(c.bytes for c in clients) / ticks / len(clients)
+    return {"rooms": rooms, "players": players, "ms_per_tick": cpu * 1000, "wall_ms_per_tick": wall * 1000,
+            "room_ms_per_tick": sum(r.cpu for r in all_rooms) / ticks / rooms * 1000,
+            "bytes_per_client_tick": sent, "rooms_per_core": int(rooms * (1.0 / TICK_RATE) / cpu) if cpu else 0}
+
+def main(host="0.0.0.0", port=50007, tick_rate=TICK_RATE, max_rooms=MAX_ROOMS):
+    server = MatchServer(host, port, tick_rate, max_rooms)
+    print(f"[SERVER] Listening on {host}:{port}, {tick_rate} ticks/s, up to {max_rooms} rooms")
+    try:
+        backend().run(server.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        backend().call(server.close)
+        time.sleep(0.2)   # let the close messages out
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Headless Flappy Bird match server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=50007)
+    parser.add_argument("--tick-rate", type=int, default=TICK_RATE)
+    parser.add_argument("--max-rooms", type=int, default=MAX_ROOMS)
+    parser.add_argument("--bench", type=int, metavar="ROOMS", help="measure ROOMS full rooms without sockets, then exit")
+    parser.add_argument("--players", type=int, default=2, help="players per room for --bench")
+    args = parser.parse_args()
+    if args.bench:
+        result = bench(args.bench, args.players)
+        print(f"{result['rooms']} rooms of {result['players']}: {result['ms_per_tick']:.2f} ms CPU per tick "
+              f"({result['room_ms_per_tick']:.3f} ms per room), {result['bytes_per_client_tick']:.0f} B per client "
+              f"per tick; about {result['rooms_per_core']} rooms per core at {TICK_RATE} ticks/s")
+    else:
+        main(args.host, args.port, args.tick_rate, args.max_rooms)
@@ -0,0 +1,198 @@
+# snapshots.py
+#
+# Delta-compressed world snapshots for LAN play (protocol version 5).
+#
+# The host keeps the snapshots it sent; the client acks each one it applied.
+# Every new snapshot is encoded against the newest acked one (its base):
+# only the bird fields that changed since the base, the pipes that appeared
+# (spawn: id, tick, x, velocity, top, bottom, from which the client works out
+# x for any later tick) and the ids of the pipes that went away. Until the
+# client acks a snapshot it is not a base, so nothing depends on a message
+# that may not have arrived. A keyframe (everything, no base) goes out first,
+# every KEYFRAME_EVERY snapshots, when the base got too old and whenever the
+# client asks for one because it doesn't have the base a delta refers to.
+#
+# Values are compared and sent in protocol fixed point, so "changed" means
+# changed on the wire. Each snapshot also carries the host's clock in ms, which
+# the client's jitter buffer (interpolation.py) places it on, and the id and
+# slack of the newest flap applied, which prediction.py reconciles against.
+import time
+
+from .protocol import FIXED, FIXED_MIN, FIXED_MAX, VEL_FIXED, PLAYER_KEYS, GAME_OVER_KEYS
+
+KEYFRAME_EVERY = 300     # snapshots (5 s at 60 Hz)
+MAX_AGE = 255            # a base older than this many snapshots is not used
+SEQ_MOD = 1 << 16        # seq wraps as a uint16
+PLAYER_FIELDS = ("x", "y", "tilt", "alive", "score", "vel")
+
+def _fx(v, scale=FIXED):
+    return max(FIXED_MIN, min(FIXED_MAX, round(v * scale)))
+
+class Quantizer:
+    """
+    The world in protocol fixed point, with an id per pipe. Encoders sharing
+    one (the seats of a server room) quantize each tick once between them.
+    """
+
+    def __init__(self):
+        self.pipe_ids = {}          # Pipe -> (id, tick, x, vel, top, bottom)
+        self.next_pipe_id = 0
+
+    def frame(self, tick, players, pipes, pipe_vel):
+        """(tick, players, pipes) in fixed point; arguments as for SnapshotEncoder.snapshot()."""
+        players = [(_fx(x), _fx(y), _fx(tilt), int(bool(alive)), int(score), _fx(vel, VEL_FIXED))
+                   for x, y, tilt, alive, score, vel in players]
+        return tick, players, self._pipes(tick, pipes, pipe_vel)
+
+    def _pipes(self, tick, pipes, vel):
+        """id -> (tick, x, vel, top, bottom) for the pipes on screen."""
+        out = {}
+        ids = {}
+        fvel = _fx(vel)
+        for pipe in pipes:
+            x, top, bottom = _fx(pipe.x), _fx(pipe.top), _fx(pipe.bottom)
+            rec = self.pipe_ids.get(pipe)
+            # A pipe that didn't follow its spawn trajectory (or moved its gap) is re-sent as a new one
+            if rec is None or rec[2] - rec[3] * (tick - rec[1]) != x or rec[4:] != (top, bottom):
+                rec = (self.next_pipe_id, tick, x, fvel, top, bottom)
+                self.next_pipe_id = (self.next_pipe_id + 1) % SEQ_MOD
+            ids[pipe] = rec
+            out[rec[0]] = rec[1:]
+        self.pipe_ids = ids
+        return out
+
+class SnapshotEncoder:
+    """Host side, one per client connection."""
+
+    def __init__(self, keyframe_every=KEYFRAME_EVERY, quantizer=None):
+        self.keyframe_every = keyframe_every
+        self.quantizer = quantizer if quantizer is not None else Quantizer()
+        self.seq = 0
+        self.sent = {}              # seq -> (tick, players, pipes) not yet superseded by an ack
+        self.acked = None           # newest seq the client applied
+        self.keyframe_wanted = True
+        self.since_keyframe = 0
+        self.stats = {"keyframes": 0, "deltas": 0, "requests": 0}
+
+    # Called from the reader thread
+    def ack(self, seq):
+        # Acks can arrive late or twice; the base only moves forward
+        if seq in self.sent and (self.acked is None or 0 < (seq - self.acked) % SEQ_MOD < SEQ_MOD // 2):
+            self.acked = seq
+
+    def request_keyframe(self):
+        self.keyframe_wanted = True
+        self.stats["requests"] += 1
+
+    def snapshot(self, tick, players, pipes, pipe_vel, now=None, last_input=0, slack=0):
+        """
+        The next "snap" message. players: [(x, y, tilt, alive, score, vel)]
+        in world units; pipes: objects with x / top / bottom moving left by
+        pipe_vel per tick; now: host clock in seconds (default: monotonic);
+        last_input / slack: newest client flap applied and how many ticks
+        early it arrived.
+        """
+        return self.encode(self.quantizer.frame(tick, players, pipes, pipe_vel), now, last_input, slack)
+
+    def encode(self, snap, now=None, last_input=0, slack=0):
+        """The next "snap" message for a Quantizer.frame() (players in the order this client sees them)."""
+        self.seq = (self.seq + 1) % SEQ_MOD
+        tick, players, _ = snap
+
+        base = self.sent.get(self.acked) if self.acked is not None else None
+        age = (self.seq - self.acked) % SEQ_MOD if base is not None else 0
+        self.since_keyframe += 1
+        if (base is None or age > MAX_AGE or self.keyframe_wanted
+                or self.since_keyframe >= self.keyframe_every or len(base[1]) != len(players)):
+            base, age = None, 0
+            self.keyframe_wanted = False
+            self.since_keyframe = 0
+            self.stats["keyframes"] += 1
+        else:
+            self.stats["deltas"] += 1
+
+        now = time.monotonic() if now is None else now
+        msg = {"type": "snap", "seq": self.seq, "age": age, "tick": tick, "ms": int(now * 1000) & 0xFFFFFFFF,
+               "input": last_input, "slack": max(-128, min(127, slack))}
+        if base is None:
+            msg["players"] = [dict(zip(PLAYER_FIELDS, p)) for p in players]
+            msg["spawn"] = [(pid,) + rec for pid, rec in snap[2].items()]
+            msg["despawn"] = []
+        else:
+            msg["players"] = [{f: v for f, v, old in zip(PLAYER_FIELDS, p, q) if v != old}
+                              for p, q in zip(players, base[1])]
+            msg["spawn"] = [(pid,) + rec for pid, rec in snap[2].items() if pid not in base[2]]
+            msg["despawn"] = [pid for pid in base[2] if pid not in snap[2]]
+
+        # Keep the acked base and everything newer
+        self.sent[self.seq] = snap
+        if self.acked is not None:
+            keep = (self.seq - self.acked) % SEQ_MOD
+            for seq in [s for s in self.sent if (self.seq - s) % SEQ_MOD > keep]:
+                del self.sent[seq]
+        if len(self.sent) > MAX_AGE + 1:   # no acks coming back: forget the oldest
+            del self.sent[next(iter(self.sent))]
+        return msg
+
+class SnapshotDecoder:
+    """Client side: rebuilds full states from "snap" messages."""
+
+    def __init__(self):
+        self.received = {}          # seq -> (tick, players, pipes), last MAX_AGE + 1
+        self.newest = None          # newest seq applied
+        self.waiting_keyframe = False
+        self.stats = {"keyframes": 0, "deltas": 0, "missing_base": 0, "stale": 0}
+
+    def apply(self, msg):
+        """
+        (state, reply) for a snap message: the full "state" dict, or None if
+        its base is unknown, and the message to send back: an ack, a keyframe
+        request (once until the keyframe arrives) or None.
+        """
+        seq, age = msg["seq"], msg["age"]
+        if self.newest is not None and not 0 < (seq - self.newest) % SEQ_MOD < SEQ_MOD // 2:
+            # Older than what is on screen (reordered, or TCP and UDP overlapping)
+            self.stats["stale"] += 1
+            return None, None
+        if age == 0:
+            players = [tuple(p[f] for f in PLAYER_FIELDS) for p in msg["players"]]
+            pipes = {}
+            self.waiting_keyframe = False
+            self.stats["keyframes"] += 1
+        else:
+            base = self.received.get((seq - age) % SEQ_MOD)
+            if base is None:
+                self.stats["missing_base"] += 1
+                if self.waiting_keyframe:
+                    return None, None
+                self.waiting_keyframe = True
+                return None, {"type": "keyframe"}
+            players = [tuple(p.get(f, old) for f, old in zip(PLAYER_FIELDS, q))
+                       for p, q in zip(msg["players"], base[1])]
+            pipes = dict(base[2])
+            for pid in msg["despawn"]:
+                pipes.pop(pid, None)
+            self.stats["deltas"] += 1
+        for pid, *rec in msg["spawn"]:
+            pipes[pid] = tuple(rec)
+
+        tick = msg["tick"]
+        self.newest = seq
+        self.received[seq] = (tick, players, pipes)
+        self.received.pop((seq - MAX_AGE - 1) % SEQ_MOD, None)
+        state = to_state(tick, players, pipes)
+        state["time"] = msg["ms"] / 1000
+        state["input"], state["slack"] = msg["input"], msg["slack"]
+        return state, {"type": "ack", "seq": seq}
+
+def to_state(tick, players, pipes):
+    """The JSON-era "state" dict (world units) for a snapshot."""
+    msg = {"type": "state", "tick": tick}
+    for k, (x, y, tilt, alive, score, vel) in enumerate(players):
+        msg[PLAYER_KEYS[k]] = {"x": x / FIXED, "y": y / FIXED, "tilt": tilt / FIXED,
+                               "alive": alive == 1, "score": score, "vel": vel / VEL_FIXED}
+        msg[GAME_OVER_KEYS[k]] = alive == 0
+    msg["pipes"] = [{"id": pid, "x": (x0 - vel * (tick - t0)) / FIXED, "top": top / FIXED, "bottom": bottom / FIXED,
+                     "vel": vel / FIXED}
+                    for pid, (t0, x0, vel, top, bottom) in sorted(pipes.items(), key=lambda item: item[1])]
+    return msg
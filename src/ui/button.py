@@ -1,6 +1,7 @@
 import pygame
 import math
-from ..core.assets import SCORE_ORANGE, SCORE_OUTLINE, SCORE_FILL
+from collections import OrderedDict
+from ..core.assets import SCORE_ORANGE, SCORE_OUTLINE, SCORE_FILL, get_font
 
 # Button properties with improved color scheme
 BUTTON_COLOR = (52, 152, 219)  # Modern blue
@@ -44,89 +45,149 @@ def draw_shadow(surface, rect, shadow_color, offset=3, blur=2):
             pygame.draw.rect(shadow_surface, shadow_color, (0, 0, shadow_rect.width, shadow_rect.height), border_radius=10)
             surface.blit(shadow_surface, shadow_rect)
 
+# -------------------------
+# Outlined text cache
+# -------------------------
+
+OUTLINE_OFFSETS = [(-2, -2), (-2, 2), (2, -2), (2, 2), (-2, 0), (2, 0), (0, -2), (0, 2)]
+OUTLINE_WIDTH = 2
+TEXT_CACHE_SIZE = 256  # composited strings kept (least recently used dropped first)
+
+_TEXT_CACHE = OrderedDict()
+_TEXT_STATS = {"hits": 0, "misses": 0}
+
+def _outlined_surface(text, font, text_color, outline_color, fill_color):
+    """Outline, fill and text composited once into one transparent surface."""
+    w, h = font.size(text)
+    pad = OUTLINE_WIDTH
+    surf = pygame.Surface((w + 2 * pad, h + 2 * pad), pygame.SRCALPHA)
+    outline = font.render(text, True, outline_color)
+    for dx, dy in OUTLINE_OFFSETS:
+        surf.blit(outline, (pad + dx, pad + dy))
+    surf.blit(font.render(text, True, fill_color), (pad, pad))
+    surf.blit(font.render(text, True, text_color), (pad, pad))
+    if pygame.display.get_surface() is not None:
+        surf = surf.convert_alpha()
+    return surf
+
+def outlined_text(text, font, text_color, outline_color, fill_color):
+    """Cached surface for render_outlined_text (keyed by text, font and colors)."""
+    key = (text, font, tuple(text_color), tuple(outline_color), tuple(fill_color))
+    surf = _TEXT_CACHE.get(key)
+    if surf is not None:
+        _TEXT_STATS["hits"] += 1
+        _TEXT_CACHE.move_to_end(key)
+        return surf
+    _TEXT_STATS["misses"] += 1
+    surf = _TEXT_CACHE[key] = _outlined_surface(text, font, text_color, outline_color, fill_color)
+    if len(_TEXT_CACHE) > TEXT_CACHE_SIZE:
+        _TEXT_CACHE.popitem(last=False)
+    return surf
+
+def text_cache_info():
+    """{"hits", "misses", "size", "max_size"} of the outlined text cache."""
+    return dict(_TEXT_STATS, size=len(_TEXT_CACHE), max_size=TEXT_CACHE_SIZE)
+
+def clear_text_cache():
+    _TEXT_CACHE.clear()
+    _TEXT_STATS["hits"] = _TEXT_STATS["misses"] = 0
+
 # Function to render outlined text with special styling
 def render_outlined_text(surface, text, font, pos, text_color, outline_color, fill_color):
-    # Render the outline by offsetting the text in multiple directions
-    outline_positions = [(-2, -2), (-2, 2), (2, -2), (2, 2), (-2, 0), (2, 0), (0, -2), (0, 2)]
-    x, y = pos
-    
-    # First render the outline
-    for dx, dy in outline_positions:
-        outline_text = font.render(text, True, outline_color)
-        outline_rect = outline_text.get_rect(center=(x + dx, y + dy))
-        surface.blit(outline_text, outline_rect)
-    
-    # Then render the fill
-    fill_text = font.render(text, True, fill_color)
-    fill_rect = fill_text.get_rect(center=(x, y))
-    surface.blit(fill_text, fill_rect)
-    
-    # Finally render the colored text
-    text_surface = font.render(text, True, text_color)
-    text_rect = text_surface.get_rect(center=(x, y))
-    surface.blit(text_surface, text_rect)
+    # Outline (text offset in eight directions), fill and colored text, composited
+    # once per distinct string and reused from the cache afterwards
+    surf = outlined_text(text, font, text_color, outline_color, fill_color)
+    surface.blit(surf, surf.get_rect(center=pos))
+
+# -------------------------
+# Button surfaces
+# -------------------------
+
+# Room around the button rect for the hover glow (2 px) and the shadow (4 px)
+GLOW_MARGIN = 2
+SHADOW_OFFSET = 4
+BUTTON_CACHE_SIZE = 64  # pre-rendered button appearances kept
+
+_BUTTON_CACHE = OrderedDict()
 
 class Button:
     def __init__(self, x, y, width, height, text, font_size=36):
         self.rect = pygame.Rect(x, y, width, height)
         self.text = text
-        self.font = pygame.font.Font(None, font_size)
+        self.font_size = font_size
+        self.font = get_font(font_size)
         self.color = BUTTON_COLOR
         self.hover_color = BUTTON_HOVER_COLOR
         self.active_color = BUTTON_ACTIVE_COLOR
         self.is_hovered = False
         self.is_clicked_state = False
         self.animation_time = 0
-        
-    def draw(self, surface):
-        # Draw shadow
-        draw_shadow(surface, self.rect, BUTTON_SHADOW_COLOR, offset=4, blur=3)
-        
-        # Determine button color based on state
+
+    def state_color(self):
         if self.is_clicked_state:
-            color = self.active_color
-        elif self.is_hovered:
-            color = self.hover_color
-        else:
-            color = self.color
-        
+            return self.active_color
+        if self.is_hovered:
+            return self.hover_color
+        return self.color
+
+    def render_state(self, color, glow):
+        """
+        The button drawn at (GLOW_MARGIN, GLOW_MARGIN) on a transparent surface
+        big enough for its glow and shadow: shadow, gradient, border, highlight,
+        glow (if glow) and text.
+        """
+        w, h = self.rect.size
+        canvas = pygame.Surface((w + GLOW_MARGIN + SHADOW_OFFSET, h + GLOW_MARGIN + SHADOW_OFFSET),
+                                pygame.SRCALPHA)
+        rect = pygame.Rect(GLOW_MARGIN, GLOW_MARGIN, w, h)
+
+        # Draw shadow
+        draw_shadow(canvas, rect, BUTTON_SHADOW_COLOR, offset=SHADOW_OFFSET, blur=3)
+
         # Create gradient colors
         color_dark = tuple(max(0, c - 30) for c in color)
         color_light = tuple(min(255, c + 20) for c in color)
-        
+
         # Draw gradient background
-        draw_gradient_rect(surface, self.rect, color_light, color_dark, vertical=True)
-        
+        draw_gradient_rect(canvas, rect, color_light, color_dark, vertical=True)
+
         # Draw border with rounded corners
-        pygame.draw.rect(surface, BUTTON_BORDER_COLOR, self.rect, 2, border_radius=12)
-        
+        pygame.draw.rect(canvas, BUTTON_BORDER_COLOR, rect, 2, border_radius=12)
+
         # Add inner highlight
-        inner_rect = pygame.Rect(self.rect.x + 2, self.rect.y + 2, self.rect.width - 4, self.rect.height - 4)
+        inner_rect = pygame.Rect(rect.x + 2, rect.y + 2, rect.width - 4, rect.height - 4)
         highlight_color = tuple(min(255, c + 40) for c in color)
-        pygame.draw.rect(surface, highlight_color, inner_rect, 1, border_radius=10)
-        
+        pygame.draw.rect(canvas, highlight_color, inner_rect, 1, border_radius=10)
+
         # Add subtle glow effect when hovered
-        if self.is_hovered:
-            glow_rect = pygame.Rect(self.rect.x - 2, self.rect.y - 2, self.rect.width + 4, self.rect.height + 4)
+        if glow:
+            glow_rect = rect.inflate(2 * GLOW_MARGIN, 2 * GLOW_MARGIN)
             glow_surface = pygame.Surface((glow_rect.width, glow_rect.height), pygame.SRCALPHA)
             glow_surface.set_alpha(30)
             pygame.draw.rect(glow_surface, color, (0, 0, glow_rect.width, glow_rect.height), border_radius=14)
-            surface.blit(glow_surface, glow_rect)
-        
-        # Render button text with improved styling
-        text_color = TEXT_COLOR
-        if self.is_clicked_state:
-            text_color = (255, 255, 255)  # Bright white for active state
-        
-        render_outlined_text(
-            surface,
-            self.text,
-            self.font,
-            self.rect.center,
-            text_color,
-            SCORE_OUTLINE,
-            SCORE_FILL
-        )
+            canvas.blit(glow_surface, glow_rect)
+
+        # Render button text (white in every state)
+        render_outlined_text(canvas, self.text, self.font, rect.center,
+                             TEXT_COLOR, SCORE_OUTLINE, SCORE_FILL)
+
+        if pygame.display.get_surface() is not None:
+            canvas = canvas.convert_alpha()
+        return canvas
+
+    def draw(self, surface):
+        # Each appearance (text, size, font, state) is rendered once and then
+        # blitted; buttons rebuilt every frame by pause menus share the cache
+        color = tuple(self.state_color())
+        key = (self.text, self.rect.size, self.font_size, color, self.is_hovered)
+        canvas = _BUTTON_CACHE.get(key)
+        if canvas is None:
+            canvas = _BUTTON_CACHE[key] = self.render_state(color, self.is_hovered)
+            if len(_BUTTON_CACHE) > BUTTON_CACHE_SIZE:
+                _BUTTON_CACHE.popitem(last=False)
+        else:
+            _BUTTON_CACHE.move_to_end(key)
+        surface.blit(canvas, (self.rect.x - GLOW_MARGIN, self.rect.y - GLOW_MARGIN))
     
     def check_hover(self, mouse_pos):
         self.is_hovered = self.rect.collidepoint(mouse_pos)
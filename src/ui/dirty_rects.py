@@ -0,0 +1,120 @@
+# dirty_rects.py
+#
+# Dirty-rectangle drawing for the gameplay screens. Instead of blitting the
+# whole background and updating the whole window every frame, the renderer
+# erases what it drew last frame (by copying the background back over those
+# rects), the frame draws through it, and only the old + new rects are passed
+# to pygame.display.update. When the dirty area is a large part of the window
+# (or after something else drew on it, e.g. a pause menu) it falls back to one
+# full update.
+#
+# The renderer has blit() and blits() like a Surface, so Bird.draw, Pipe.draw,
+# render_outlined_text and PopulationRenderer.draw can draw through it as is:
+#
+#   screen.begin()
+#   for pipe in pipes:
+#       pipe.draw(screen)
+#   bird.draw(screen)
+#   screen.present()
+from itertools import zip_longest
+
+import pygame
+
+FULL_UPDATE_FRACTION = 0.5  # update the whole window above this dirty fraction
+MAX_RECTS = 64              # more rects than this are merged into their bounding box
+
+class DirtyRenderer:
+    """
+    Draws on the display surface over a static background. Anything drawn on
+    the window outside begin() / present() must be followed by invalidate().
+    """
+
+    def __init__(self, background, full_fraction=FULL_UPDATE_FRACTION, max_rects=MAX_RECTS):
+        self.source = background
+        self.full_fraction = full_fraction
+        self.max_rects = max_rects
+        self.screen = None
+        self.background = None
+        self.rects = []        # drawn this frame
+        self.previous = []     # drawn last frame, erased by begin()
+        self.full = True
+        self.stats = {"frames": 0, "full": 0, "dirty_pixels": 0}
+
+    def invalidate(self):
+        """Redraw and update the whole window on the next frame."""
+        self.full = True
+
+    def _attach(self, screen):
+        # Background copied once at window size, in the display's pixel format
+        self.screen = screen
+        self.background = pygame.Surface(screen.get_size()).convert()
+        self.background.blit(self.source, (0, 0))
+        self.full = True
+
+    # -------------------------
+    # Frame
+    # -------------------------
+
+    def begin(self):
+        screen = pygame.display.get_surface()
+        if screen is not self.screen or screen.get_size() != self.background.get_size():
+            self._attach(screen)
+        if self.full:
+            screen.blit(self.background, (0, 0))
+        else:
+            for rect in self.previous:
+                screen.blit(self.background, rect, rect)
+        self.rects = []
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        rect = self.screen.blit(source, dest, area, special_flags)
+        self.rects.append(rect)
+        return rect
+
+    def blits(self, blit_sequence, doreturn=True):
+        rects = self.screen.blits(blit_sequence, doreturn=True)
+        if rects:
+            # One batch (e.g. a population of birds) is tracked as its bounding box
+            self.rects.append(rects[0].unionall(rects[1:]))
+        return rects if doreturn else None
+
+    def mark(self, *rects):
+        """Track rects drawn directly on the screen (pygame.draw etc.)."""
+        self.rects.extend(pygame.Rect(r) for r in rects)
+
+    def set_clip(self, rect):
+        # Blits return their clipped rect, so clipping also trims what is tracked
+        self.screen.set_clip(rect)
+
+    def get_size(self):
+        return self.screen.get_size()
+
+    def present(self):
+        """pygame.display.update for this frame; returns True if it was a full update."""
+        bounds = self.screen.get_rect()
+        # Draw order is stable between frames, so a sprite's old and new rects
+        # usually sit at the same index; overlapping pairs become one rect
+        dirty = []
+        for old, new in zip_longest(self.previous, self.rects):
+            if old is not None and new is not None and old.colliderect(new):
+                dirty.append(old.union(new))
+            else:
+                dirty.extend(r for r in (old, new) if r is not None)
+        dirty = [r.clip(bounds) for r in dirty]
+        dirty = [r for r in dirty if r.width and r.height]
+        if len(dirty) > self.max_rects:
+            dirty = [dirty[0].unionall(dirty[1:])]
+        area = sum(r.width * r.height for r in dirty)
+
+        full = self.full or area > self.full_fraction * bounds.width * bounds.height
+        if full:
+            pygame.display.update()
+            area = bounds.width * bounds.height
+            self.stats["full"] += 1
+        else:
+            pygame.display.update(dirty)
+        self.stats["frames"] += 1
+        self.stats["dirty_pixels"] += area
+        self.previous = self.rects
+        self.full = False
+        return full
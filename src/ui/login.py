@@ -4,7 +4,7 @@ from typing import Optional, Tuple, Dict, Any
 import os
 import requests
 
-from ..core.assets import BG_IMG, SCORE_ORANGE, SCORE_OUTLINE, SCORE_FILL
+from ..core.assets import SCORE_ORANGE, SCORE_OUTLINE, SCORE_FILL, get_font, image
 from .button import Button, render_outlined_text
 
 API_BASE = "http://127.0.0.1:8001"
@@ -102,10 +102,10 @@ def run_login() -> Optional[Dict[str, Any]]:
     pygame.display.set_caption("Log In")
 
     clock = pygame.time.Clock()
-    title_font = pygame.font.Font(None, 80)
-    label_font = pygame.font.Font(None, 36)
-    input_font = pygame.font.Font(None, 40)
-    hint_font = pygame.font.Font(None, 28)
+    title_font = get_font(80)
+    label_font = get_font(36)
+    input_font = get_font(40)
+    hint_font = get_font(28)
 
     form_w = 520
     form_x = (win_w - form_w) // 2
@@ -168,7 +168,7 @@ def run_login() -> Optional[Dict[str, Any]]:
             return None
 
         # Draw
-        screen.blit(BG_IMG, (0, 0))
+        screen.blit(image("bg"), (0, 0))
         overlay = pygame.Surface((win_w, win_h), pygame.SRCALPHA)
         overlay.fill((0, 0, 0, 90))
         screen.blit(overlay, (0, 0))
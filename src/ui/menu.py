@@ -3,8 +3,9 @@ import sys
 import os
 import math
 import random
-from ..core.assets import BG_IMG, SCORE_ORANGE, SCORE_OUTLINE, SCORE_FILL, PIPE_IMG, BIRD_IMGS
+from ..core.assets import SCORE_ORANGE, SCORE_OUTLINE, SCORE_FILL, get_font, image
 from .button import Button, render_outlined_text
+from .dirty_rects import DirtyRenderer
 from .registration import run_registration, register_user_to_mongo
 from .login import run_login
 from ..multiplayer.leaderboard_client import fetch_top10, submit_score, fetch_user_best, run_leaderboard_screen  # <-- added screen
@@ -41,26 +42,32 @@ class AnimatedElement:
             self.y = self.original_y + math.sin(self.angle * 0.5) * 10
 
 # ---------- Tiny UI helpers for left-side chips ----------
+# (label, dot color) -> finished chip surface; a chip is only rebuilt when its
+# label changes (e.g. the user chip after a login)
+_CHIPS = {}
+
+def _chip_surface(label, dot_color=None):
+    key = (label, dot_color)
+    s = _CHIPS.get(key)
+    if s is None:
+        chip_h = 36
+        txt = get_font(24).render(label, True, (255, 255, 255))
+        left_pad = 28 if dot_color else 12
+        s = pygame.Surface((left_pad + txt.get_width() + 12, chip_h), pygame.SRCALPHA)
+        pygame.draw.rect(s, (0, 0, 0, 140), s.get_rect(), border_radius=18)
+        pygame.draw.rect(s, (255, 255, 255, 180), s.get_rect(), width=1, border_radius=18)
+        if dot_color:
+            pygame.draw.circle(s, dot_color, (16, chip_h // 2), 6)
+        s.blit(txt, (left_pad, (chip_h - txt.get_height()) // 2))
+        if pygame.display.get_surface() is not None:
+            s = s.convert_alpha()
+        _CHIPS[key] = s
+    return s
+
 def _draw_left_chip(surface, label, y, dot_color=None):
     """Generic left-side chip; returns its rect."""
-    pad_x = 12
-    chip_h = 36
-    font = pygame.font.Font(None, 24)
-    txt = font.render(label, True, (255, 255, 255))
-    left_pad = 28 if dot_color else 12
-    chip_w = left_pad + txt.get_width() + 12
-    chip_rect = pygame.Rect(pad_x, y, chip_w, chip_h)
-
-    s = pygame.Surface((chip_rect.w, chip_rect.h), pygame.SRCALPHA)
-    pygame.draw.rect(s, (0, 0, 0, 140), s.get_rect(), border_radius=18)
-    pygame.draw.rect(s, (255, 255, 255, 180), s.get_rect(), width=1, border_radius=18)
-    if dot_color:
-        pygame.draw.circle(s, dot_color, (16, chip_h // 2), 6)
-        s.blit(txt, (28, (chip_h - txt.get_height()) // 2))
-    else:
-        s.blit(txt, (12, (chip_h - txt.get_height()) // 2))
-    surface.blit(s, chip_rect.topleft)
-    return chip_rect
+    s = _chip_surface(label, dot_color)
+    return surface.blit(s, (12, y))
 
 def draw_leaderboard_chip(surface) -> pygame.Rect:
     return _draw_left_chip(surface, "Leaderboard", 12, (255, 200, 0))
@@ -74,30 +81,15 @@ def draw_join_chip(surface, y_start) -> pygame.Rect:
 def draw_user_chip(surface, label: str | None) -> pygame.Rect:
     win_w, _ = surface.get_size()
     pad = 12
-    chip_h = 36
-    font = pygame.font.Font(None, 24)
-    text = "Sign in" if not label else label
-    txt = font.render(text, True, (255, 255, 255))
-    left_pad = 12 if not label else 28
-    chip_w = left_pad + txt.get_width() + 12
-    chip_rect = pygame.Rect(win_w - chip_w - pad, pad, chip_w, chip_h)
-    s = pygame.Surface((chip_rect.w, chip_rect.h), pygame.SRCALPHA)
-    pygame.draw.rect(s, (0, 0, 0, 140), s.get_rect(), border_radius=18)
-    pygame.draw.rect(s, (255, 255, 255, 180), s.get_rect(), width=1, border_radius=18)
-    if label:
-        pygame.draw.circle(s, (40, 200, 90), (16, chip_h // 2), 6)
-        s.blit(txt, (28, (chip_h - txt.get_height()) // 2))
-    else:
-        s.blit(txt, (12, (chip_h - txt.get_height()) // 2))
-    surface.blit(s, chip_rect.topleft)
-    return chip_rect
+    s = _chip_surface(label, (40, 200, 90)) if label else _chip_surface("Sign in")
+    return surface.blit(s, (win_w - s.get_width() - pad, pad))
 
 # ---------- Minimal text input overlay (kept here if you need later) ----------
 def prompt_text(surface, title, initial_text="", placeholder="", max_len=64):
     """Very small modal text prompt. Returns text or None if canceled."""
     clock = pygame.time.Clock()
-    font_title = pygame.font.Font(None, 36)
-    font = pygame.font.Font(None, 28)
+    font_title = get_font(36)
+    font = get_font(28)
     text = list(initial_text)
     cursor_visible = True
     blink = 0
@@ -134,7 +126,7 @@ def prompt_text(surface, title, initial_text="", placeholder="", max_len=64):
         pygame.draw.rect(surface, (50, 50, 50), box, 2, border_radius=10)
 
         # Title
-        title_surf = pygame.font.Font(None, 36).render(title, True, (20, 20, 20))
+        title_surf = get_font(36).render(title, True, (20, 20, 20))
         surface.blit(title_surf, (box.centerx - title_surf.get_width()//2, box.y + 16))
 
         # Input line
@@ -167,11 +159,53 @@ def create_background_elements():
         x = random.randint(-100, WIN_WIDTH + 100)
         y = random.randint(300, 600)
         speed = random.uniform(20, 40)
-        elements.append(AnimatedElement(x, y, speed, PIPE_IMG))
+        elements.append(AnimatedElement(x, y, speed, image("pipe")))
     return elements
 
+# The menu is drawn under a 30-alpha black overlay. Pre-multiplying it into the
+# background and the moving sprites gives the same picture without blending a
+# full-window surface every frame.
+OVERLAY_ALPHA = 30
+_DIM = (255 - OVERLAY_ALPHA,) * 3
+_MENU_SPRITES = {}
+
+def _dimmed(surf):
+    """Copy of surf as it looks under the menu overlay."""
+    out = surf.copy()
+    out.fill(_DIM, special_flags=pygame.BLEND_RGB_MULT)
+    return out
+
+def menu_background():
+    """Background image with the overlay applied (the menu's static layer)."""
+    bg = _MENU_SPRITES.get("bg")
+    if bg is None:
+        bg = _MENU_SPRITES["bg"] = _dimmed(image("bg"))
+    return bg
+
+def cloud_sprite(size=30):
+    """(surface, (ox, oy)): a cloud drawn once; blit at (x - ox, y - oy)."""
+    key = ("cloud", size)
+    hit = _MENU_SPRITES.get(key)
+    if hit is None:
+        ox, oy = int(size * 1.5) + 1, int(size * 1.1) + 1
+        surf = pygame.Surface((2 * ox + 1, oy + size + 1), pygame.SRCALPHA)
+        draw_cloud(surf, ox, oy, size)
+        if pygame.display.get_surface() is not None:
+            surf = surf.convert_alpha()
+        hit = _MENU_SPRITES[key] = (_dimmed(surf), (ox, oy))
+    return hit
+
+def menu_sprite(img):
+    """Dimmed copy of a moving element's image."""
+    key = ("image", img)
+    surf = _MENU_SPRITES.get(key)
+    if surf is None:
+        surf = _MENU_SPRITES[key] = _dimmed(img)
+    return surf
+
 def draw_cloud(surface, x, y, size=30):
-    cloud_color = (255, 255, 255, 180)
+    # Opaque: the window has no per-pixel alpha, so the 180 never showed
+    cloud_color = (255, 255, 255)
     pygame.draw.circle(surface, cloud_color, (int(x), int(y)), size)
     pygame.draw.circle(surface, cloud_color, (int(x + size*0.7), int(y)), int(size*0.8))
     pygame.draw.circle(surface, cloud_color, (int(x - size*0.7), int(y)), int(size*0.8))
@@ -184,9 +218,13 @@ def run_menu():
     pygame.display.set_caption("Flappy Bird Menu")
     
     clock = pygame.time.Clock()
-    title_font = pygame.font.Font(None, 80)
-    subtitle_font = pygame.font.Font(None, 32)
+    title_font = get_font(80)
+    subtitle_font = get_font(32)
     background_elements = create_background_elements()
+    screen = DirtyRenderer(menu_background())
+    cloud, (cloud_ox, cloud_oy) = cloud_sprite(25)
+    subtitle_surface = subtitle_font.render("Choose Your Adventure!", True, (255, 255, 255)).convert_alpha()
+    subtitle_rect = subtitle_surface.get_rect(center=(WIN_WIDTH // 2, 200))
 
     current_user = None
 
@@ -206,11 +244,17 @@ def run_menu():
     last_time = pygame.time.get_ticks()
 
     running = True
+    mouse_click = False
     while running:
         current_time = pygame.time.get_ticks()
         dt = (current_time - last_time) / 1000.0
         last_time = current_time
 
+        # A click may have opened another screen (a game, login, the
+        # leaderboard...) that drew over the window
+        if mouse_click:
+            screen.invalidate()
+
         mouse_pos = pygame.mouse.get_pos()
         mouse_click = False
         
@@ -230,35 +274,25 @@ def run_menu():
         for element in background_elements:
             element.update(dt)
         
-        WIN.blit(BG_IMG, (0, 0))
+        screen.begin()
         for element in background_elements:
             if element.image is None:
-                draw_cloud(WIN, element.x, element.y, 25)
+                screen.blit(cloud, (int(element.x) - cloud_ox, int(element.y) - cloud_oy))
             else:
-                WIN.blit(element.image, (element.x, element.y))
-        
-        overlay = pygame.Surface((WIN_WIDTH, WIN_HEIGHT))
-        overlay.set_alpha(30)
-        overlay.fill((0, 0, 0))
-        WIN.blit(overlay, (0, 0))
+                screen.blit(menu_sprite(element.image), (element.x, element.y))
         
         title_y = 120 + math.sin(title_bounce) * 5
-        render_outlined_text(WIN, "Flappy Bird", title_font, (WIN_WIDTH // 2, title_y),
+        render_outlined_text(screen, "Flappy Bird", title_font, (WIN_WIDTH // 2, title_y),
                              SCORE_ORANGE, SCORE_OUTLINE, SCORE_FILL)
         
-        subtitle_alpha = int(128 + 127 * math.sin(subtitle_fade))
-        subtitle_text = subtitle_font.render("Choose Your Adventure!", True, (255, 255, 255))
-        subtitle_rect = subtitle_text.get_rect(center=(WIN_WIDTH // 2, 200))
-        subtitle_surface = pygame.Surface(subtitle_text.get_size(), pygame.SRCALPHA)
-        subtitle_surface.blit(subtitle_text, (0, 0))
-        subtitle_surface.set_alpha(subtitle_alpha)
-        WIN.blit(subtitle_surface, subtitle_rect)
+        subtitle_surface.set_alpha(int(128 + 127 * math.sin(subtitle_fade)))
+        screen.blit(subtitle_surface, subtitle_rect)
         
         # ----- Center buttons -----
         for i, button in enumerate(buttons):
             button.check_hover(mouse_pos)
             button.update(dt)
-            button.draw(WIN)
+            button.draw(screen)
             
             if button.is_clicked(mouse_pos, mouse_click):
                 if i == 0:
@@ -316,12 +350,12 @@ def run_menu():
 
         # ----- Chips -----
         user_label = current_user.get("username") if current_user else None
-        user_chip_rect = draw_user_chip(WIN, user_label)
-        lb_chip_rect = draw_leaderboard_chip(WIN)
+        user_chip_rect = draw_user_chip(screen, user_label)
+        lb_chip_rect = draw_leaderboard_chip(screen)
         # Position host/join chips stacked below leaderboard
         next_y = lb_chip_rect.bottom + 8
-        host_chip_rect = draw_host_chip(WIN, next_y)
-        join_chip_rect = draw_join_chip(WIN, host_chip_rect.bottom + 8)
+        host_chip_rect = draw_host_chip(screen, next_y)
+        join_chip_rect = draw_join_chip(screen, host_chip_rect.bottom + 8)
 
         # user chip
         if mouse_click and user_chip_rect.collidepoint(mouse_pos):
@@ -358,7 +392,7 @@ def run_menu():
                 print("Failed to join:", e)
             continue
 
-        pygame.display.update()
+        screen.present()
         clock.tick(60)
 
 if __name__ == "__main__":
@@ -0,0 +1,59 @@
+# population_renderer.py
+#
+# Draws a whole population of birds with one Surface.blits call, using the
+# rotated-sprite cache. Above `cull_above` birds only the top_k best-ranked
+# ones are drawn, and a heat strip next to the birds shows how all of them
+# are spread vertically, so the frame cost stays flat from 50 to 5,000 birds.
+import numpy as np
+import pygame
+
+from ..core.sprites import rotated
+
+CULL_ABOVE = 150    # draw every bird up to this many
+TOP_K = 100         # birds drawn above it
+
+class PopulationRenderer:
+    def __init__(self, bird_imgs, bird_x, height, cull_above=CULL_ABOVE, top_k=TOP_K,
+                 strip_x=None, strip_width=10, bins=200):
+        self.bird_imgs = bird_imgs
+        self.bird_x = round(bird_x)
+        self.height = height
+        self.cull_above = cull_above
+        self.top_k = top_k
+        self.strip_x = strip_x if strip_x is not None else self.bird_x - 3 * strip_width
+        self.strip_width = strip_width
+        self.bins = bins
+        self.culled = False    # True when the last draw() only drew top_k birds
+
+    def heat_strip(self, ys):
+        """Vertical histogram of ys as a surface (transparent where empty)."""
+        counts, _ = np.histogram(ys, bins=self.bins, range=(0, self.height))
+        heat = counts / max(counts.max(), 1)
+        rgb = np.zeros((1, self.bins, 3), dtype=np.uint8)
+        rgb[0, :, 0] = np.where(counts > 0, 120 + 135 * heat, 0)
+        rgb[0, :, 1] = np.where(counts > 0, 200 * (1 - heat), 0)
+        strip = pygame.surfarray.make_surface(rgb)
+        strip.set_colorkey((0, 0, 0))
+        strip.set_alpha(200)
+        return pygame.transform.scale(strip, (self.strip_width, self.height))
+
+    def draw(self, surface, birds, rank=None):
+        """
+        birds: (n, 3) rows of y / tilt / wing frame (0 or 1). rank: optional
+        (n,) scores; the highest are kept when culling (default: list order).
+        """
+        birds = np.asarray(birds, dtype=np.float64).reshape(-1, 3)
+        self.culled = len(birds) > self.cull_above
+        if self.culled:
+            surface.blit(self.heat_strip(birds[:, 0]), (self.strip_x, 0))
+            if rank is None:
+                keep = np.arange(self.top_k)
+            else:
+                keep = np.argpartition(-np.asarray(rank), self.top_k - 1)[:self.top_k]
+            birds = birds[keep]
+
+        blits = []
+        for y, tilt, wing in birds.tolist():
+            surf, (dx, dy) = rotated(self.bird_imgs[int(wing)], tilt)
+            blits.append((surf, (self.bird_x + dx, round(y) + dy)))
+        surface.blits(blits, doreturn=False)
@@ -0,0 +1,73 @@
+# viewport.py
+#
+# Draws a world (pipes + birds in game coordinates) into a rectangle of the
+# window at a vertical scale, e.g. each half of the Man vs Machine split screen
+# at 0.5. The pipe sprites are scaled once per scale and the bird frames go
+# through the rotation cache, so drawing a frame builds no objects and resizes
+# nothing.
+import pygame
+
+from ..core.assets import image
+from ..core.sprites import rotated
+
+# (scale, bird frame names) -> SpriteSet
+_SPRITE_SETS = {}
+
+class SpriteSet:
+    """Pipe sprites squashed to `scale` (height only, like the world) and the bird frames."""
+
+    def __init__(self, scale, bird_names):
+        self.scale = scale
+        top, bottom = image("pipe_top"), image("pipe")
+        self.pipe_top = pygame.transform.scale(top, (top.get_width(), max(1, int(top.get_height() * scale))))
+        self.pipe_bottom = pygame.transform.scale(bottom, (bottom.get_width(), max(1, int(bottom.get_height() * scale))))
+        # Birds keep their on-screen size (a squashed bird reads badly)
+        self.birds = [image(name) for name in bird_names]
+
+def sprite_set(scale, bird_names):
+    key = (scale, tuple(bird_names))
+    sprites = _SPRITE_SETS.get(key)
+    if sprites is None:
+        sprites = _SPRITE_SETS[key] = SpriteSet(scale, bird_names)
+    return sprites
+
+class Viewport:
+    """
+    rect: where on the window the world is drawn; scale: world -> screen
+    factor for y (x is unscaled); bird_names: the two wing frames to use.
+    """
+
+    def __init__(self, rect, scale, bird_names=("bird1", "bird2")):
+        self.rect = pygame.Rect(rect)
+        self.scale = scale
+        self.bird_names = tuple(bird_names)
+
+    def draw(self, target, pipes, birds):
+        """
+        Draw pipes and birds clipped to the viewport. target: a Surface or a
+        DirtyRenderer. Counts each bird's wing frame down like Bird.draw does.
+        """
+        sprites = sprite_set(self.scale, self.bird_names)
+        ox, oy = self.rect.topleft
+        scale = self.scale
+        target.set_clip(self.rect)
+
+        for pipe in pipes:
+            top_height = int(pipe.height * scale)
+            bottom_y = top_height + int(pipe.GAP * scale)
+            target.blit(sprites.pipe_top, (ox + pipe.x, oy + top_height - sprites.pipe_top.get_height()))
+            target.blit(sprites.pipe_bottom, (ox + pipe.x, oy + bottom_y))
+
+        blits = []
+        for bird in birds:
+            if bird.jump_frame > 0:
+                img = sprites.birds[1]
+                bird.jump_frame -= 1
+            else:
+                img = sprites.birds[0]
+            surf, (dx, dy) = rotated(img, bird.tilt)
+            blits.append((surf, (ox + round(bird.x) + dx, oy + int(bird.y * scale) + dy)))
+        if blits:
+            target.blits(blits, doreturn=False)
+
+        target.set_clip(None)
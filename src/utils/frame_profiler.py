@@ -0,0 +1,193 @@
+# frame_profiler.py
+#
+# Where a frame's time goes. The game loops mark phase boundaries with lap()
+# and time work nested inside a phase (per-bird AI inference, collision
+# checks) with phase(); the nested time is taken out of the surrounding lap,
+# so the phases add up to the frame's work. F3 toggles an overlay with the
+# rolling breakdown, a frame-time graph and percentiles; F4 writes the
+# recorded frames to data/profiles/ as CSV for later comparison.
+#
+#   PROFILER.begin_frame()
+#   ... events ...                  PROFILER.lap("input")
+#   with PROFILER.phase("ai"): ...  (inside the simulation)
+#   ... simulation ...              PROFILER.lap("sim")
+#   ... drawing ...                 PROFILER.lap("render"); PROFILER.draw(win)
+#   win.present()                   PROFILER.lap("flip")
+import os
+import csv
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pygame
+
+from ..core.assets import get_font
+
+PHASES = ("input", "sim", "ai", "collision", "render", "flip", "overlay")
+PHASE_COLORS = {
+    "input": (200, 200, 200),
+    "sim": (80, 160, 255),
+    "ai": (190, 110, 255),
+    "collision": (255, 150, 60),
+    "render": (90, 220, 120),
+    "flip": (255, 220, 70),
+    "overlay": (120, 120, 120),
+}
+TOGGLE_KEY = pygame.K_F3
+DUMP_KEY = pygame.K_F4
+FRAME_BUDGET_MS = 1000 / 60
+PROFILE_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "profiles")
+
+class FrameProfiler:
+    """Per-phase timings of the last `window` frames (ms), plus the F3 overlay."""
+
+    def __init__(self, label, window=300, refresh=15):
+        self.label = label
+        self.window = window
+        self.refresh = refresh        # overlay text is rebuilt every this many frames
+        self.visible = False
+        self.columns = ("interval",) + PHASES
+        self.frames = np.zeros((window, len(self.columns)))
+        self.count = 0                # frames recorded so far
+        self.current = None           # phase -> seconds, for the open frame
+        self.frame_start = None
+        self.last_lap = None
+        self.nested = 0.0             # phase() time since the last lap
+        self.panel = None
+
+    # -------------------------
+    # Hooks for the game loops
+    # -------------------------
+
+    def begin_frame(self):
+        """Close the previous frame (if any) and start timing a new one."""
+        now = time.perf_counter()
+        if self.current is not None:
+            row = self.frames[self.count % self.window]
+            row[0] = (now - self.frame_start) * 1000
+            for i, name in enumerate(PHASES, 1):
+                row[i] = self.current.get(name, 0.0) * 1000
+            self.count += 1
+        self.current = {}
+        self.frame_start = self.last_lap = now
+        self.nested = 0.0
+
+    def add(self, name, seconds):
+        if self.current is not None:
+            self.current[name] = self.current.get(name, 0.0) + seconds
+            self.nested += seconds
+
+    def lap(self, name):
+        """Charge the time since the previous lap (minus nested phases) to name."""
+        if self.current is None:
+            return
+        now = time.perf_counter()
+        self.current[name] = self.current.get(name, 0.0) + (now - self.last_lap) - self.nested
+        self.last_lap = now
+        self.nested = 0.0
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block nested inside a lap (e.g. one bird's network activation)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def handle_event(self, event):
+        """F3 toggles the overlay, F4 dumps the timings. True if the event was used."""
+        if event.type != pygame.KEYDOWN:
+            return False
+        if event.key == TOGGLE_KEY:
+            self.visible = not self.visible
+            self.panel = None
+            return True
+        if event.key == DUMP_KEY:
+            print("[PROFILE] Saved:", self.dump())
+            return True
+        return False
+
+    # -------------------------
+    # Statistics
+    # -------------------------
+
+    def recorded(self):
+        """(n, 1 + len(PHASES)) array of the recorded frames, oldest first (ms)."""
+        n = min(self.count, self.window)
+        if self.count <= self.window:
+            return self.frames[:n]
+        start = self.count % self.window
+        return np.concatenate([self.frames[start:], self.frames[:start]])
+
+    def summary(self):
+        """Mean ms per column plus work-time percentiles over the window."""
+        rows = self.recorded()
+        if len(rows) == 0:
+            return None
+        work = rows[:, 1:].sum(axis=1)
+        stats = {name: float(rows[:, i].mean()) for i, name in enumerate(self.columns)}
+        stats["work"] = float(work.mean())
+        for p in (50, 95, 99):
+            stats[f"p{p}"] = float(np.percentile(work, p))
+        stats["fps"] = 1000 / stats["interval"] if stats["interval"] > 0 else 0.0
+        return stats
+
+    def dump(self, path=None):
+        """Write the recorded frames as CSV (ms per column); returns the path."""
+        if path is None:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            path = os.path.join(PROFILE_DIR, f"{self.label}-{stamp}.csv")
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.columns)
+            writer.writerows(np.round(self.recorded(), 4).tolist())
+        return os.path.abspath(path)
+
+    # -------------------------
+    # Overlay
+    # -------------------------
+
+    def build_panel(self, width=260, graph_height=60):
+        stats = self.summary()
+        font = get_font(20)
+        lines = [f"{self.label}  F3 hide  F4 dump"]
+        if stats is None:
+            lines.append("collecting...")
+        else:
+            lines.append(f"{stats['fps']:5.1f} fps  frame {stats['interval']:5.2f} ms  work {stats['work']:5.2f} ms")
+            lines.append(f"p50 {stats['p50']:5.2f}  p95 {stats['p95']:5.2f}  p99 {stats['p99']:5.2f} ms")
+            lines += [f"{name:<9} {stats[name]:6.2f} ms" for name in PHASES]
+        line_h = font.get_linesize()
+        panel = pygame.Surface((width, 8 + line_h * len(lines) + graph_height + 8), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        for i, text in enumerate(lines):
+            color = PHASE_COLORS.get(text.split(" ")[0], (255, 255, 255))
+            panel.blit(font.render(text, True, color), (8, 4 + i * line_h))
+
+        # Stacked bars of the last frames' phases, with the 60 FPS budget as a line
+        rows = self.recorded()[-(width - 16):]
+        top = 8 + line_h * len(lines)
+        scale = graph_height / (2 * FRAME_BUDGET_MS)
+        for x, row in enumerate(rows):
+            y = top + graph_height
+            for i, name in enumerate(PHASES, 1):
+                h = row[i] * scale
+                if h >= 1:
+                    pygame.draw.line(panel, PHASE_COLORS[name], (8 + x, y), (8 + x, max(top, y - h)))
+                y -= h
+        budget_y = top + graph_height - FRAME_BUDGET_MS * scale
+        pygame.draw.line(panel, (255, 80, 80), (8, budget_y), (width - 8, budget_y))
+        return panel
+
+    def draw(self, surface, pos=None):
+        """Blit the overlay (when visible) at pos, default top-right corner."""
+        if not self.visible:
+            return
+        with self.phase("overlay"):
+            if self.panel is None or self.count % self.refresh == 0:
+                self.panel = self.build_panel()
+            if pos is None:
+                pos = (surface.get_size()[0] - self.panel.get_width() - 10, 10)
+            surface.blit(self.panel, pos)